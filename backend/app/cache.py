@@ -0,0 +1,96 @@
+"""In-process caches of serialized responses, invalidated through changes.bump."""
+import threading
+
+from . import changes
+
+
+class ResponseCache:
+    """Serialized bodies keyed by caller-supplied keys, with hit/miss counters.
+
+    Callers include the data version in the key: a body built while a write
+    lands is stored under the old version and can never be served again.
+    """
+
+    def __init__(self, name: str, max_entries: int = 16):
+        self.name = name
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: dict = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        with self._lock:
+            body = self._entries.get(key)
+            if body is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return body
+
+    def put(self, key, body: bytes):
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._entries.pop(next(iter(self._entries)))
+            self._entries[key] = body
+
+    def invalidate(self, room_id: int | None = None):
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+            }
+
+
+class RoomScopedCache(ResponseCache):
+    """Cache whose keys start with a room id (None = all rooms).
+
+    A write to one room only drops that room's entries and the all-rooms ones.
+    generation(room_id) only moves when that room (or everything) changes, so
+    callers put it in keys and ETags instead of the global data version and
+    writes to other rooms leave them valid. In multi-worker mode it is the
+    shared changes.room_version, so every worker hands out the same ETags.
+    """
+
+    def __init__(self, name: str, max_entries: int = 64):
+        super().__init__(name, max_entries)
+        self._tick = 0
+        self._all_tick = 0
+        self._room_tick: dict[int, int] = {}
+
+    def generation(self, room_id: int | None) -> int:
+        if changes.shared():
+            return changes.room_version(room_id)
+        with self._lock:
+            if room_id is None:
+                return self._tick
+            return max(self._room_tick.get(room_id, 0), self._all_tick)
+
+    def invalidate(self, room_id: int | None = None):
+        with self._lock:
+            self._tick += 1
+            self.invalidations += 1
+            if room_id is None:
+                self._all_tick = self._tick
+                self._entries.clear()
+                return
+            self._room_tick[room_id] = self._tick
+            for key in [k for k in self._entries if k[0] in (room_id, None)]:
+                del self._entries[key]
+
+
+# /rooms/weekly: every room is on the board, so any booking or room write drops it
+weekly = ResponseCache("weekly")
+changes.subscribe(weekly.invalidate)
+
+# iCalendar feeds: per room plus the all-rooms feed
+ics = RoomScopedCache("ics")
+changes.subscribe(ics.invalidate)
@@ -0,0 +1,129 @@
+"""Monotonic data version bumped by every crud write path.
+
+Read endpoints turn the version into an ETag so unchanged data can be answered
+with 304 without querying the database. The boot token keeps ETags from an
+earlier process (whose counter also started at 0) from matching.
+
+In-process caches register with `subscribe` and are told which room changed
+(None = anything may have changed).
+
+With MULTI_WORKER=true the version is not a local counter but the shared one
+in the data_version table (multiworker.py): `committed` records this worker's
+own writes, `apply_remote` those of other workers found by multiworker.sync.
+The version then means the same data in every worker, so the boot token is a
+constant and `room_version` replaces per-process generations in ETags.
+"""
+import threading
+import uuid
+
+_BOOT = uuid.uuid4().hex[:8]
+_lock = threading.Lock()
+_version = 0
+_listeners = []
+_remote_listeners = []
+_shared = False
+_room_versions: dict[int, int] = {}
+_all_version = 0
+
+
+def current() -> int:
+    return _version
+
+
+def shared() -> bool:
+    return _shared
+
+
+def subscribe(listener):
+    """Register listener(room_id) to run after every bump."""
+    _listeners.append(listener)
+    return listener
+
+
+def subscribe_remote(listener):
+    """Register listener(room_id) for writes made by other workers only."""
+    _remote_listeners.append(listener)
+    return listener
+
+
+def unsubscribe_remote(listener):
+    _remote_listeners.remove(listener)
+
+
+def bump(room_id: int | None = None) -> int:
+    """Record a committed write; returns the new version."""
+    global _version
+    with _lock:
+        if not _shared:  # shared: committed() already took the version from the table
+            _version += 1
+        version = _version
+    for listener in list(_listeners):
+        listener(room_id)
+    return version
+
+
+def etag(*parts, version: int | None = None) -> str:
+    if version is None:
+        version = _version
+    tag = ".".join([_BOOT, str(version), *(str(p) for p in parts)])
+    return f'"{tag}"'
+
+
+def use_shared(version: int):
+    """Switch to the data_version table's counter (multiworker.install)."""
+    global _shared, _BOOT, _version, _room_versions, _all_version
+    with _lock:
+        _shared, _BOOT = True, "shared"
+        _version, _all_version, _room_versions = version, version, {}
+
+
+def use_local():
+    global _shared, _BOOT, _room_versions, _all_version
+    with _lock:
+        _shared, _BOOT = False, uuid.uuid4().hex[:8]
+        _room_versions, _all_version = {}, 0
+
+
+def room_version(room_id: int | None) -> int:
+    """Shared version of the last write to room_id or to everything."""
+    with _lock:
+        if room_id is None:
+            return _version
+        return max(_room_versions.get(room_id, 0), _all_version)
+
+
+def _record_locked(version: int, rooms):
+    global _all_version
+    for room_id in rooms:
+        if room_id is None:
+            _all_version = max(_all_version, version)
+        else:
+            _room_versions[room_id] = max(_room_versions.get(room_id, 0), version)
+
+
+def committed(version: int, increments: int, rooms):
+    """This worker committed `increments` shared bumps ending at `version`.
+
+    Only catches up when nothing else was committed in between; otherwise the
+    next sync picks up both (ours again, harmlessly).
+    """
+    global _version
+    with _lock:
+        _record_locked(version, rooms)
+        if _version + increments == version:
+            _version = version
+
+
+def apply_remote(version: int, rooms) -> bool:
+    """Other workers' writes up to `version` touched `rooms`; returns False if already seen."""
+    global _version
+    with _lock:
+        if version <= _version:
+            return False
+        _record_locked(version, rooms)
+        _version = version
+    targets = [None] if None in rooms or not rooms else sorted(rooms)
+    for room_id in targets:
+        for listener in list(_listeners) + list(_remote_listeners):
+            listener(room_id)
+    return True
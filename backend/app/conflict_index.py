@@ -0,0 +1,192 @@
+"""Optional in-memory interval index used for booking conflict detection.
+
+Controlled by the CONFLICT_INDEX environment variable:
+  off   (default) -> crud always asks the database
+  on              -> overlap queries are answered from the index once warmed
+  check           -> the index is queried *and* compared against SQL; any
+                     disagreement is logged and the SQL result is used
+
+The database stays authoritative: the index is rebuilt from it at startup
+(`warm`), and a positive lookup is re-read from the database. An empty lookup
+is trusted, so crud only adds bookings while it holds the write lock, right
+before the commit that releases it (crud._commit_indexed); a failed commit
+marks the room stale. Removals (deletes, bulk rejections) may lag behind
+their commit: a stale entry only costs the re-read. With several
+workers (multiworker.py) another process's writes mark rooms stale; crud then
+reloads such a room from the database (`room_stmt` / `load_room`) before
+trusting the index for it again.
+"""
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timedelta
+import logging
+import os
+import threading
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from . import models
+
+logger = logging.getLogger("math_office.conflict_index")
+
+TZ = ZoneInfo("Asia/Taipei")
+MODE = os.getenv("CONFLICT_INDEX", "off").strip().lower()
+
+
+def enabled() -> bool:
+    return MODE in ("on", "check")
+
+
+def check_mode() -> bool:
+    return MODE == "check"
+
+
+class RoomIntervals:
+    """Bookings of one room kept sorted by start time.
+
+    Non-rejected bookings of a room normally do not overlap, but rows written
+    outside crud can, so lookups widen the scan by the longest interval seen
+    instead of assuming disjointness: candidates start in
+    (start - max_len, end), found with two bisects.
+    """
+    __slots__ = ("keys", "ends", "max_len")
+
+    def __init__(self):
+        self.keys: list[tuple[datetime, int]] = []  # (start, booking_id), sorted
+        self.ends: dict[int, datetime] = {}
+        self.max_len = timedelta(0)
+
+    def add(self, booking_id: int, start: datetime, end: datetime):
+        insort(self.keys, (start, booking_id))
+        self.ends[booking_id] = end
+        if end - start > self.max_len:
+            self.max_len = end - start
+
+    def remove(self, booking_id: int, start: datetime):
+        i = bisect_left(self.keys, (start, booking_id))
+        if i < len(self.keys) and self.keys[i] == (start, booking_id):
+            del self.keys[i]
+        self.ends.pop(booking_id, None)
+
+    def overlapping(self, start: datetime, end: datetime) -> list[int]:
+        lo = bisect_right(self.keys, (start - self.max_len, float("inf")))
+        hi = bisect_left(self.keys, (end, -1))
+        return [bid for _, bid in self.keys[lo:hi] if self.ends[bid] > start]
+
+
+def _key(dt: datetime) -> datetime:
+    # match the DB representation: naive Asia/Taipei wall time
+    return dt if dt.tzinfo is None else dt.astimezone(TZ).replace(tzinfo=None)
+
+
+def room_stmt(room_id: int):
+    """Every non-rejected booking of one room (reloading a stale room)."""
+    return select(models.Booking.id, models.Booking.start_time, models.Booking.end_time).where(
+        models.Booking.room_id == room_id, models.Booking.status != models.BookingStatus.rejected
+    )
+
+
+class ConflictIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rooms: dict[int, RoomIntervals] = {}
+        self._by_id: dict[int, tuple[int, datetime]] = {}  # booking_id -> (room_id, start)
+        self._stale: set[int] = set()
+        self._all_stale = False
+        self._reloaded: set[int] = set()  # rooms reloaded since everything went stale
+        self.ready = False
+
+    def warm(self, db: Session):
+        rows = db.execute(
+            select(models.Booking.id, models.Booking.room_id, models.Booking.start_time, models.Booking.end_time)
+            .where(models.Booking.status != models.BookingStatus.rejected)
+        ).all()
+        with self._lock:
+            self._rooms = {}
+            self._by_id = {}
+            self._stale, self._all_stale, self._reloaded = set(), False, set()
+            for bid, room_id, st, et in rows:
+                self._add_locked(bid, room_id, _key(st), _key(et))
+            self.ready = True
+        logger.info("conflict_index_warm bookings=%d rooms=%d mode=%s", len(rows), len(self._rooms), MODE)
+
+    def clear(self):
+        with self._lock:
+            self._rooms = {}
+            self._by_id = {}
+            self._stale, self._all_stale, self._reloaded = set(), False, set()
+            self.ready = False
+
+    def invalidate(self, room_id: int | None = None):
+        """Stop trusting room_id (None = every room) until crud reloads it.
+
+        Used when another worker wrote to it, or when a commit whose bookings
+        were already staged in the index failed.
+        """
+        if not self.ready:
+            return
+        with self._lock:
+            if room_id is None:
+                self._rooms, self._by_id = {}, {}
+                self._stale, self._all_stale, self._reloaded = set(), True, set()
+                return
+            self._drop_room_locked(room_id)
+            self._stale.add(room_id)
+            self._reloaded.discard(room_id)
+
+    def fresh(self, room_id: int) -> bool:
+        with self._lock:
+            if self._all_stale and room_id not in self._reloaded:
+                return False
+            return room_id not in self._stale
+
+    def load_room(self, room_id: int, rows):
+        """Replace a room's intervals with rows from room_stmt."""
+        with self._lock:
+            self._drop_room_locked(room_id)
+            for bid, st, et in rows:
+                self._add_locked(bid, room_id, _key(st), _key(et))
+            self._stale.discard(room_id)
+            if self._all_stale:
+                self._reloaded.add(room_id)
+
+    def _drop_room_locked(self, room_id):
+        room = self._rooms.pop(room_id, None)
+        if room is not None:
+            for bid in room.ends:
+                self._by_id.pop(bid, None)
+
+    def _add_locked(self, booking_id, room_id, start, end):
+        self._rooms.setdefault(room_id, RoomIntervals()).add(booking_id, start, end)
+        self._by_id[booking_id] = (room_id, start)
+
+    def _discard_locked(self, booking_id):
+        prev = self._by_id.pop(booking_id, None)
+        if prev is not None:
+            room_id, start = prev
+            self._rooms[room_id].remove(booking_id, start)
+
+    def add(self, booking_id: int, room_id: int, start: datetime, end: datetime):
+        """Reflect a newly committed (non-rejected) booking."""
+        if not self.ready:
+            return
+        with self._lock:
+            self._discard_locked(booking_id)
+            self._add_locked(booking_id, room_id, _key(start), _key(end))
+
+    def discard(self, booking_id: int):
+        if not self.ready:
+            return
+        with self._lock:
+            self._discard_locked(booking_id)
+
+    def overlapping(self, room_id: int, start: datetime, end: datetime) -> list[int]:
+        with self._lock:
+            room = self._rooms.get(room_id)
+            if room is None:
+                return []
+            return room.overlapping(_key(start), _key(end))
+
+
+index = ConflictIndex()
@@ -1,14 +1,32 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import select, and_, or_
-from datetime import datetime, timedelta
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy import select, update, exists, and_, or_
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import aliased
+from datetime import date, datetime, timedelta
 from zoneinfo import ZoneInfo
-from . import models, schemas
+from . import models, schemas, conflict_index, changes, feed, metrics, multiworker
+from .database import IS_SQLITE
+import base64
+import binascii
 import logging
+import os
+import time
 
 logger = logging.getLogger("math_office.crud")
 
 TZ = ZoneInfo("Asia/Taipei")
 MAX_SEMESTER_WEEKS = 40  # safety guard to prevent runaway loops
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+# GET /bookings ?order= columns ("-" prefix = descending); each has a (column, id) index
+BOOKING_ORDERS = ("start_time", "requested_at")
+DEFAULT_BOOKING_ORDER = "-start_time"
+ROOM_BOOKINGS_DEFAULT_DAYS = 28
+ROOM_BOOKINGS_DEFAULT_LIMIT = 200
+# attempts to take the SQLite write lock after busy_timeout ran out (see _begin_write)
+WRITE_LOCK_RETRIES = int(os.getenv("BOOKING_WRITE_LOCK_RETRIES", "3"))
+WRITE_LOCK_BACKOFF = 0.05  # seconds, doubled per attempt
 
 # Rooms
 
@@ -18,39 +36,87 @@ def get_rooms(db: Session):
 def get_room(db: Session, room_id: int):
     return db.get(models.Room, room_id)
 
+def get_room_with_bookings(
+    db: Session,
+    room_id: int,
+    *,
+    date_from: datetime | None = None,
+    date_to: datetime | None = None,
+    limit: int = ROOM_BOOKINGS_DEFAULT_LIMIT,
+):
+    """Room plus its bookings intersecting [date_from, date_to), bounded in SQL.
+
+    Defaults to start of today .. +ROOM_BOOKINGS_DEFAULT_DAYS so the payload does
+    not grow with the room's history.
+    """
+    room = db.get(models.Room, room_id)
+    if not room:
+        return None
+    stmt = _room_bookings_stmt(room_id, date_from, date_to, limit)
+    set_committed_value(room, "bookings", list(db.scalars(stmt)))
+    return room
+
+def _room_bookings_stmt(room_id: int, date_from: datetime | None, date_to: datetime | None, limit: int):
+    if date_from is None:
+        date_from = datetime.now(TZ).replace(hour=0, minute=0, second=0, microsecond=0)
+    if date_to is None:
+        date_to = date_from + timedelta(days=ROOM_BOOKINGS_DEFAULT_DAYS)
+    return (
+        select(models.Booking)
+        .where(
+            models.Booking.room_id == room_id,
+            _overlapping(date_from, date_to),
+        )
+        .order_by(models.Booking.start_time, models.Booking.id)
+        .limit(limit)
+    )
+
 def create_room(db: Session, room_in: schemas.RoomCreate):
     room = models.Room(name=room_in.name, description=room_in.description)
     db.add(room)
     db.commit()
+    changes.bump()
     db.refresh(room)
     return room
 
+def _to_local(dt: datetime) -> datetime:
+    return dt.replace(tzinfo=TZ) if dt.tzinfo is None else dt.astimezone(TZ)
+
+def _overlapping(start: datetime, end: datetime, booking=models.Booking):
+    """Canonical overlap of booking rows with [start, end): start_min < end AND end_min > start.
+
+    Compared on the epoch-minute columns, so naive (Asia/Taipei) and aware bounds
+    need no normalizing and the *_end_start_min indexes serve it as a range scan.
+    """
+    return and_(booking.start_min < models.epoch_minute(end, ceil=True), booking.end_min > models.epoch_minute(start))
+
 def get_rooms_weekly(db: Session):
+    rooms = db.scalars(select(models.Room).order_by(models.Room.id)).all()
+    bookings = db.scalars(_weekly_bookings_stmt()).all()
+    return _attach_weekly(rooms, bookings)
+
+def _weekly_bookings_stmt():
     now = datetime.now(TZ)
     # Use start-of-today as lower bound so earlier-today finished bookings still appear
     start_of_today = now.replace(hour=0, minute=0, second=0, microsecond=0)
     window_end = start_of_today + timedelta(days=7)
-    rooms = db.scalars(select(models.Room).order_by(models.Room.id)).all()
+    # One windowed query for all rooms. No ORDER BY so SQLite can drive the scan
+    # from the (end_min, start_min) index; the handful of rows in the window are
+    # sorted per room in _attach_weekly.
+    return select(models.Booking).where(_overlapping(start_of_today, window_end))
+
+def _attach_weekly(rooms, bookings):
+    by_room: dict[int, list[models.Booking]] = {r.id: [] for r in rooms}
+    for b in bookings:
+        kept = by_room.get(b.room_id)
+        if kept is not None:
+            kept.append(b)
     for r in rooms:
-        # ensure attribute exists even if empty
-        if not hasattr(r, 'bookings') or r.bookings is None:
-            r.bookings = []
-        kept: list[models.Booking] = []
-        for b in list(r.bookings):
-            st = b.start_time
-            et = b.end_time
-            if not st or not et:
-                continue
-            # normalize to TZ
-            st = st.replace(tzinfo=TZ) if st.tzinfo is None else st.astimezone(TZ)
-            et = et.replace(tzinfo=TZ) if et.tzinfo is None else et.astimezone(TZ)
-            # condition: booking intersects [start_of_today, window_end)
-            if st < window_end and et > start_of_today:
-                b.start_time = st
-                b.end_time = et
-                kept.append(b)
-        kept.sort(key=lambda x: x.start_time)
-        r.bookings = kept
+        kept = by_room[r.id]
+        # rows keep their stored values; schemas.WeeklyBooking adds the +08:00 offset on output
+        kept.sort(key=lambda x: x.start_min)
+        # populate the relationship as loaded so serialization does not lazy-load history
+        set_committed_value(r, "bookings", kept)
     return rooms
 
 def _validate_time_window(category_name: str, start: datetime, end: datetime) -> bool:
@@ -68,26 +134,149 @@ def _validate_time_window(category_name: str, start: datetime, end: datetime) ->
     end_minutes = end_local.hour * 60 + end_local.minute
     if end_minutes <= start_minutes:
         return False
-    # category windows (local) in minutes from midnight
-    cat = (category_name.value if hasattr(category_name, 'value') else str(category_name))
-    # normalize
-    cat = (cat or '').lower()
-    if cat in ("activity", "course"):
-        window_start = 5 * 60  # 05:00 earliest
-        window_end = 22 * 60   # 22:00 latest end
-    elif cat == "meeting":
-        window_start = 5 * 60
-        window_end = 17 * 60   # 17:00 latest end
-    else:
+    window = _category_window(category_name)
+    if window is None:
         return False
+    window_start, window_end = window
     return window_start <= start_minutes < window_end and window_start < end_minutes <= window_end
 
+# category windows (local) in minutes from midnight: (earliest start, latest end)
+CATEGORY_WINDOWS = {
+    "activity": (5 * 60, 22 * 60),  # 05:00 - 22:00
+    "course": (5 * 60, 22 * 60),
+    "meeting": (5 * 60, 17 * 60),   # 17:00 latest end
+}
+
+def _category_window(category_name) -> tuple[int, int] | None:
+    cat = (category_name.value if hasattr(category_name, 'value') else str(category_name))
+    return CATEGORY_WINDOWS.get((cat or '').lower())
+
 def _is_half_hour(dt: datetime) -> bool:
     return dt.minute in (0,30) and dt.second == 0 and dt.microsecond == 0
 
+# Availability
+
+SLOT_MINUTES = 30
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+MAX_AVAILABILITY_DAYS = 190  # one semester plus margin
+
+def get_availability(
+    db: Session,
+    date_from: date,
+    date_to: date,
+    category,
+    duration_minutes: int,
+    room_id: int | None = None,
+):
+    """Free half-hour-aligned runs of at least duration_minutes per room, date_to inclusive.
+
+    One range query loads (room_id, start_min, end_min) of every non-rejected booking in
+    the span; each room/day becomes a 48-bit occupancy bitmap (bit i = slot
+    starting i*30 min after midnight) and free runs are read off
+    window & ~occupied. Raises ValueError on an invalid request.
+    """
+    window = _category_window(category)
+    if window is None:
+        raise ValueError("不支援的類別")
+    if duration_minutes <= 0 or duration_minutes % SLOT_MINUTES:
+        raise ValueError("時長需為 30 分鐘的倍數")
+    if date_to < date_from:
+        raise ValueError("結束日期不可早於開始日期")
+    days = (date_to - date_from).days + 1
+    if days > MAX_AVAILABILITY_DAYS:
+        raise ValueError(f"查詢區間不可超過 {MAX_AVAILABILITY_DAYS} 天")
+
+    rooms_stmt = select(models.Room).order_by(models.Room.id)
+    if room_id is not None:
+        rooms_stmt = rooms_stmt.where(models.Room.id == room_id)
+    rooms = db.scalars(rooms_stmt).all()
+    if not rooms:
+        return []
+
+    span_start = datetime.combine(date_from, datetime.min.time())  # naive local, like stored rows
+    span_end = span_start + timedelta(days=days)
+    span_min = models.epoch_minute(span_start)
+    stmt = select(models.Booking.room_id, models.Booking.start_min, models.Booking.end_min).where(
+        models.Booking.status != models.BookingStatus.rejected,
+        _overlapping(span_start, span_end),
+    )
+    if room_id is not None:
+        stmt = stmt.where(models.Booking.room_id == room_id)
+
+    occupied: dict[tuple[int, int], int] = {}
+    for rid, start_min, end_min in db.execute(stmt):
+        # absolute slot numbers from span_start; partial slots count as occupied
+        lo = max(0, (start_min - span_min) // SLOT_MINUTES)
+        hi = min(days * SLOTS_PER_DAY, -((span_min - end_min) // SLOT_MINUTES))
+        while lo < hi:
+            day, first = divmod(lo, SLOTS_PER_DAY)
+            last = min(hi - day * SLOTS_PER_DAY, SLOTS_PER_DAY)
+            key = (rid, day)
+            occupied[key] = occupied.get(key, 0) | (((1 << last) - 1) ^ ((1 << first) - 1))
+            lo = (day + 1) * SLOTS_PER_DAY
+
+    win_lo, win_hi = window[0] // SLOT_MINUTES, window[1] // SLOT_MINUTES
+    window_mask = ((1 << win_hi) - 1) ^ ((1 << win_lo) - 1)
+    need = duration_minutes // SLOT_MINUTES
+    slot = timedelta(minutes=SLOT_MINUTES)
+    result = []
+    for room in rooms:
+        free_slots = []
+        for day in range(days):
+            day_start = (span_start + timedelta(days=day)).replace(tzinfo=TZ)
+            for first, length in _free_runs(window_mask & ~occupied.get((room.id, day), 0), need):
+                free_slots.append({
+                    "start_time": day_start + first * slot,
+                    "end_time": day_start + (first + length) * slot,
+                })
+        result.append({"id": room.id, "name": room.name, "description": room.description, "free_slots": free_slots})
+    return result
+
+def _free_runs(free: int, need: int):
+    """Yield (first_slot, length) of each maximal run of set bits at least need long."""
+    while free:
+        first = (free & -free).bit_length() - 1
+        run = free >> first
+        length = (~run & (run + 1)).bit_length() - 1
+        if length >= need:
+            yield first, length
+        free &= ~(((1 << length) - 1) << first)
+
 # Bookings
 
-def create_booking(db: Session, booking_in: schemas.BookingCreate, *, is_semester: bool = False):
+def _conflict_stmt(room_id: int, start: datetime, end: datetime):
+    return select(models.Booking).where(
+        models.Booking.room_id == room_id,
+        models.Booking.status != models.BookingStatus.rejected,
+        _overlapping(start, end),
+    )
+
+def _find_conflicts(db: Session, room_id: int, start: datetime, end: datetime):
+    if not (conflict_index.enabled() and conflict_index.index.ready):
+        return db.scalars(_conflict_stmt(room_id, start, end)).all()
+    if not conflict_index.index.fresh(room_id):  # another worker wrote to it
+        conflict_index.index.load_room(room_id, db.execute(conflict_index.room_stmt(room_id)).all())
+    ids = conflict_index.index.overlapping(room_id, start, end)
+    if conflict_index.check_mode():
+        conflicts = db.scalars(_conflict_stmt(room_id, start, end)).all()
+        _check_index_result(room_id, start, end, ids, conflicts)
+        return conflicts
+    if not ids:
+        return []
+    # only reached on a conflict: re-check those rows against the DB (a removal may not
+    # have reached the index yet) and load them for the log details
+    return db.scalars(_conflict_stmt(room_id, start, end).where(models.Booking.id.in_(ids))).all()
+
+def _check_index_result(room_id: int, start: datetime, end: datetime, ids, conflicts):
+    sql_ids = {c.id for c in conflicts}
+    if sql_ids != set(ids):
+        logger.warning(
+            "conflict_index_mismatch room=%s start=%s end=%s index=%s sql=%s",
+            room_id, start.isoformat(), end.isoformat(), sorted(ids), sorted(sql_ids),
+        )
+
+def _prepare_booking(booking_in: schemas.BookingCreate):
+    """Validate a booking request; returns (start, end, category) in Asia/Taipei or raises ValueError."""
     # validation for category time window and 30-min increments
     start = booking_in.start_time
     end = booking_in.end_time
@@ -106,170 +295,489 @@ def create_booking(db: Session, booking_in: schemas.BookingCreate, *, is_semeste
     cat_in = booking_in.category.value if hasattr(booking_in.category, 'value') else str(booking_in.category)
     if not _validate_time_window(cat_in, start, end):
         raise ValueError("不在允許的時間範圍")
-    # conflict detection
-    conflict_stmt = select(models.Booking).where(
-        models.Booking.room_id == booking_in.room_id,
-        models.Booking.status != models.BookingStatus.rejected,
-        or_(
-            and_(start >= models.Booking.start_time, start < models.Booking.end_time),
-            and_(end > models.Booking.start_time, end <= models.Booking.end_time),
-            and_(start <= models.Booking.start_time, end >= models.Booking.end_time)
-        )
-    )
-    conflicts = db.scalars(conflict_stmt).all()
-    if conflicts:
-        try:
-            details = [
-                {
-                    "id": c.id,
-                    "status": c.status.value if hasattr(c.status, 'value') else str(c.status),
-                    "start": (c.start_time.isoformat() if hasattr(c.start_time, 'isoformat') else str(c.start_time)),
-                    "end": (c.end_time.isoformat() if hasattr(c.end_time, 'isoformat') else str(c.end_time)),
-                }
-                for c in conflicts
-            ]
-        except Exception:
-            details = [getattr(c, 'id', None) for c in conflicts]
-        logger.info(
-            "booking_conflict room=%s start=%s end=%s count=%d details=%s",
-            booking_in.room_id,
-            start.isoformat(),
-            end.isoformat(),
-            len(conflicts),
-            details,
-        )
-        return None
     # Persist actual enum value (DB Enum has course/activity/meeting)
     persist_cat = booking_in.category if isinstance(booking_in.category, models.BookingCategory) else models.BookingCategory(str(cat_in))
-    booking = models.Booking(
+    return start, end, persist_cat
+
+def _new_booking(booking_in: schemas.BookingCreate, start: datetime, end: datetime, category: models.BookingCategory, *, is_semester: bool = False):
+    return models.Booking(
         room_id=booking_in.room_id,
         user_name=booking_in.user_name,
         user_identity=booking_in.user_identity,
         purpose=booking_in.purpose,
-        category=persist_cat,
+        category=category,
         start_time=start,
         end_time=end,
+        status=models.BookingStatus.pending,
         is_semester=is_semester,
         requested_at=datetime.now(TZ),
     )
+
+class WriteLockTimeout(RuntimeError):
+    """The booking write lock could not be taken (the database stayed busy)."""
+
+
+def _is_lock_error(exc: OperationalError) -> bool:
+    message = str(exc.orig).lower()
+    return "locked" in message or "busy" in message
+
+def _write_lock_stmt(room_ids):
+    # non-SQLite: lock the rooms' rows; writers to other rooms don't wait
+    return select(models.Room.id).where(models.Room.id.in_(sorted(set(room_ids)))).with_for_update()
+
+def _begin_write(db: Session, room_ids) -> None:
+    """Open the transaction for a conflict check + insert on `room_ids`.
+
+    The check and the insert must not interleave with another writer's, in
+    this process or another worker. SQLite: BEGIN IMMEDIATE (database/_sqlite_begin)
+    takes the write lock before the SELECT; waiting is bounded by busy_timeout,
+    then retried WRITE_LOCK_RETRIES times. Other databases: SELECT ... FOR UPDATE
+    on the room rows. A transaction the session already had open is ended
+    first (SQLite can't upgrade it to IMMEDIATE): rolled back when it only
+    read, committed if it has pending changes.
+    Callers must commit or roll back promptly: the lock is held until then.
+    In multi-worker mode the other workers' writes are applied once the lock
+    is held (multiworker.sync), before the conflict index is consulted.
+    """
+    if db.in_transaction():
+        db.commit() if (db.new or db.dirty or db.deleted) else db.rollback()
+    if not IS_SQLITE:
+        db.execute(_write_lock_stmt(room_ids))
+    else:
+        _begin_immediate(db)
+    if multiworker.active():
+        multiworker.sync(db.connection())
+
+def _begin_immediate(db: Session) -> None:
+    for attempt in range(WRITE_LOCK_RETRIES + 1):
+        try:
+            db.connection(execution_options={"sqlite_begin": "IMMEDIATE"})
+            return
+        except OperationalError as exc:
+            db.rollback()
+            if not _is_lock_error(exc):
+                raise
+            if attempt == WRITE_LOCK_RETRIES:
+                raise WriteLockTimeout(str(exc.orig)) from exc
+            logger.warning("booking_write_lock_retry attempt=%d error=%s", attempt + 1, exc.orig)
+            time.sleep(WRITE_LOCK_BACKOFF * 2 ** attempt)
+
+def create_booking(db: Session, booking_in: schemas.BookingCreate, *, is_semester: bool = False):
+    start, end, persist_cat = _prepare_booking(booking_in)
+    _begin_write(db, [booking_in.room_id])
+    # conflict detection
+    conflicts = _find_conflicts(db, booking_in.room_id, start, end)
+    if conflicts:
+        _log_conflict(booking_in.room_id, start, end, conflicts)
+        db.rollback()  # release the write lock
+        return None
+    booking = _new_booking(booking_in, start, end, persist_cat, is_semester=is_semester)
     db.add(booking)
-    db.commit()
+    db.flush()
+    _commit_indexed(db, [_index_row(booking)])
+    changes.bump(booking_in.room_id)
     db.refresh(booking)
+    _booking_created(booking)
+    return booking
+
+def _index_row(booking: models.Booking):
+    return booking.id, booking.room_id, booking.start_time, booking.end_time, booking.status
+
+def _stage_index(rows):
+    """Show flushed bookings ((id, room, start, end, status) rows) in the conflict index."""
+    for booking_id, room_id, start, end, status in rows:
+        if status == models.BookingStatus.rejected:
+            conflict_index.index.discard(booking_id)
+        else:
+            conflict_index.index.add(booking_id, room_id, start, end)
+
+def _unstage_index(rows):
+    # the commit failed: drop what we staged and reload those rooms on their next check
+    for room_id in {row[1] for row in rows}:
+        conflict_index.index.invalidate(room_id)
+
+def _commit_indexed(db: Session, rows) -> None:
+    """Commit with the conflict index already showing `rows` (see _stage_index).
+
+    Runs while the write lock (_begin_write) is held: updating the index after
+    commit would let another thread of this worker take the lock in between,
+    check an index without these bookings and insert a duplicate.
+    """
+    if not conflict_index.index.ready:
+        db.commit()
+        return
+    _stage_index(rows)
+    try:
+        db.commit()
+    except Exception:
+        _unstage_index(rows)
+        raise
+
+def _log_conflict(room_id: int, start: datetime, end: datetime, conflicts):
+    metrics.booking_conflicts.inc()
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    # plain-value snapshot; formatting happens on the log listener thread (logsetup.py)
+    details = tuple((c.id, getattr(c.status, 'value', c.status), c.start_time, c.end_time) for c in conflicts)
+    logger.info(
+        "booking_conflict room=%s start=%s end=%s count=%d details=%s",
+        room_id,
+        start,
+        end,
+        len(conflicts),
+        details,
+    )
+
+def _booking_created(booking: models.Booking):
+    """Post-commit hooks for a single created booking (feed, metrics, log); the index is updated before commit."""
+    feed.hub.publish("created", booking)
+    metrics.bookings_created.inc("semester" if booking.is_semester else "single")
     logger.info(
         "booking_created id=%s room=%s start=%s end=%s status=%s",
         booking.id,
         booking.room_id,
-        booking.start_time.isoformat(),
-        booking.end_time.isoformat(),
-        booking.status.value if hasattr(booking.status, 'value') else str(booking.status),
+        booking.start_time,
+        booking.end_time,
+        getattr(booking.status, 'value', booking.status),
     )
-    return booking
 
-def list_bookings(db: Session, room_id: int | None = None, status: models.BookingStatus | None = None, is_semester: bool | None = None):
-    stmt = select(models.Booking).order_by(models.Booking.start_time.desc())
+def encode_cursor(sort_value: datetime, booking_id: int) -> str:
+    raw = f"{_to_local(sort_value).replace(tzinfo=None).isoformat()}|{booking_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        value_iso, booking_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(value_iso), int(booking_id)
+    except (ValueError, UnicodeDecodeError, binascii.Error):
+        raise ValueError("無效的分頁游標")
+
+def list_bookings(
+    db: Session,
+    room_id: int | None = None,
+    status: models.BookingStatus | None = None,
+    is_semester: bool | None = None,
+    *,
+    date_from: datetime | None = None,
+    date_to: datetime | None = None,
+    limit: int | None = None,
+    cursor: str | None = None,
+    order: str = DEFAULT_BOOKING_ORDER,
+):
+    stmt = _list_bookings_stmt(
+        room_id, status, is_semester, date_from=date_from, date_to=date_to, limit=limit, cursor=cursor, order=order,
+    )
+    return db.scalars(stmt).all()
+
+def _list_bookings_stmt(
+    room_id: int | None = None,
+    status: models.BookingStatus | None = None,
+    is_semester: bool | None = None,
+    *,
+    date_from: datetime | None = None,
+    date_to: datetime | None = None,
+    limit: int | None = None,
+    cursor: str | None = None,
+    order: str = DEFAULT_BOOKING_ORDER,
+):
+    # (column, id) in either direction matches ix_bookings_start_id / ix_bookings_requested_id,
+    # so keyset pages are index range scans
+    descending = order.startswith("-")
+    column = getattr(models.Booking, order.lstrip("-"))
+    if descending:
+        stmt = select(models.Booking).order_by(column.desc(), models.Booking.id.desc())
+    else:
+        stmt = select(models.Booking).order_by(column, models.Booking.id)
     if room_id:
         stmt = stmt.where(models.Booking.room_id == room_id)
     if status:
         stmt = stmt.where(models.Booking.status == status)
     if is_semester is not None:
         stmt = stmt.where(models.Booking.is_semester == is_semester)
-    return db.scalars(stmt).all()
+    if date_from is not None:
+        stmt = stmt.where(models.Booking.start_time >= _to_local(date_from).replace(tzinfo=None))
+    if date_to is not None:
+        stmt = stmt.where(models.Booking.start_time < _to_local(date_to).replace(tzinfo=None))
+    if cursor:
+        cur_value, cur_id = decode_cursor(cursor)
+        if descending:
+            stmt = stmt.where(or_(column < cur_value, and_(column == cur_value, models.Booking.id < cur_id)))
+        else:
+            stmt = stmt.where(or_(column > cur_value, and_(column == cur_value, models.Booking.id > cur_id)))
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return stmt
+
+def list_bookings_page(db: Session, *, limit: int = DEFAULT_PAGE_SIZE, order: str = DEFAULT_BOOKING_ORDER, **filters):
+    """Return (bookings, next_cursor); next_cursor is None on the last page."""
+    return _page(list_bookings(db, limit=limit + 1, order=order, **filters), limit, order)
+
+def _page(rows, limit: int, order: str = DEFAULT_BOOKING_ORDER):
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        return rows[:limit], encode_cursor(getattr(last, order.lstrip("-")), last.id)
+    return rows, None
 
 def update_booking_status(db: Session, booking_id: int, status: models.BookingStatus):
     booking = db.get(models.Booking, booking_id)
     if not booking:
         return None
+    # un-rejecting puts the booking back in the index: do it under the write lock
+    _begin_write(db, [booking.room_id])
+    booking = db.get(models.Booking, booking_id)  # re-read under the lock
+    if not booking:
+        db.rollback()
+        return None
     booking.status = status
-    db.commit()
+    db.flush()
+    _commit_indexed(db, [_index_row(booking)])
+    changes.bump(booking.room_id)
     db.refresh(booking)
+    feed.hub.publish("status_changed", booking)
     return booking
 
+def bulk_update_booking_status(db: Session, ids: list[int], status: models.BookingStatus, *, reject_overlapping: bool = False):
+    """Set status on many bookings in one transaction, under the write lock of their rooms.
+
+    Approving never creates a double booking inside the batch: ids are taken in
+    the given order and one overlapping an earlier approved id in the same room
+    is rejected instead. With reject_overlapping, every other pending booking in
+    the same room overlapping an approved one is rejected by the same set-based
+    UPDATE. Returns (updated_ids, rejected_ids, not_found_ids).
+    """
+    ids = list(dict.fromkeys(ids))
+    rooms = db.scalars(select(models.Booking.room_id).where(models.Booking.id.in_(ids)).distinct()).all()
+    if not rooms:
+        db.rollback()
+        return [], [], ids
+    _begin_write(db, rooms)
+    found = {
+        row.id: row
+        for row in db.execute(
+            select(models.Booking.id, models.Booking.room_id, models.Booking.start_min, models.Booking.end_min)
+            .where(models.Booking.id.in_(ids))
+        )
+    }
+    chosen, losers = [i for i in ids if i in found], []
+    if status == models.BookingStatus.approved:
+        chosen, losers = _first_without_overlap([found[i] for i in chosen])
+    returned = (models.Booking.id, models.Booking.room_id, models.Booking.start_time, models.Booking.end_time)
+    updated = db.execute(
+        update(models.Booking)
+        .where(models.Booking.id.in_(chosen))
+        .values(status=status)
+        .returning(*returned)
+        .execution_options(synchronize_session=False)
+    ).all() if chosen else []
+    to_reject = None
+    if reject_overlapping and status == models.BookingStatus.approved and chosen:
+        approved = aliased(models.Booking)
+        to_reject = and_(
+            or_(models.Booking.status == models.BookingStatus.pending, models.Booking.id.in_(losers)),
+            models.Booking.id.not_in(chosen),
+            exists().where(
+                approved.id.in_(chosen),
+                approved.room_id == models.Booking.room_id,
+                approved.start_min < models.Booking.end_min,
+                approved.end_min > models.Booking.start_min,
+            ),
+        )
+    elif losers:
+        to_reject = models.Booking.id.in_(losers)
+    rejected = db.execute(
+        update(models.Booking)
+        .where(to_reject)
+        .values(status=models.BookingStatus.rejected)
+        .returning(*returned)
+        .execution_options(synchronize_session=False)
+    ).all() if to_reject is not None else []
+    _commit_indexed(db, [(*row, status) for row in updated] + [(*row, models.BookingStatus.rejected) for row in rejected])
+    updated_ids, rejected_ids = [row.id for row in updated], [row.id for row in rejected]
+    for room_id in sorted({row.room_id for row in (*updated, *rejected)}):
+        changes.bump(room_id)
+    if feed.hub.subscriber_count():
+        for booking in db.scalars(select(models.Booking).where(models.Booking.id.in_([*updated_ids, *rejected_ids]))):
+            feed.hub.publish("status_changed", booking)
+    logger.info(
+        "booking_bulk_status status=%s updated=%d auto_rejected=%d",
+        getattr(status, "value", status),
+        len(updated_ids),
+        len(rejected_ids),
+    )
+    return sorted(updated_ids), sorted(rejected_ids), [i for i in ids if i not in found]
+
+def _first_without_overlap(rows):
+    """Split rows (id, room_id, start_min, end_min) into (kept, dropped) ids: a row is
+    dropped when it overlaps an earlier kept one in the same room."""
+    kept, dropped, taken = [], [], {}
+    for row in rows:
+        windows = taken.setdefault(row.room_id, [])
+        if any(start < row.end_min and end > row.start_min for start, end in windows):
+            dropped.append(row.id)
+        else:
+            windows.append((row.start_min, row.end_min))
+            kept.append(row.id)
+    return kept, dropped
+
 def delete_booking(db: Session, booking_id: int):
     booking = db.get(models.Booking, booking_id)
     if not booking:
         return False
+    room_id = booking.room_id
+    payload = feed.serialize(booking) if feed.hub.subscriber_count() else None
     db.delete(booking)
     db.commit()
+    changes.bump(room_id)
+    conflict_index.index.discard(booking_id)
+    feed.hub.publish("deleted", payload=payload)
     return True
 
-def create_semester_bookings(db: Session, payload: schemas.SemesterBookingCreate):
+def _semester_occurrences(payload: schemas.SemesterBookingCreate):
+    """Yield (week_index, start_dt, end_dt) every 7 days from start_date, capped at MAX_SEMESTER_WEEKS."""
+    hh_s, mm_s = map(int, payload.start_time_hm.split(':'))
+    hh_e, mm_e = map(int, payload.end_time_hm.split(':'))
+    current = payload.start_date
+    week_index = 0
+    while current <= payload.end_date and week_index < MAX_SEMESTER_WEEKS:
+        start_dt = datetime(current.year, current.month, current.day, hh_s, mm_s, tzinfo=TZ)
+        end_dt = datetime(current.year, current.month, current.day, hh_e, mm_e, tzinfo=TZ)
+        yield week_index, start_dt, end_dt
+        current += timedelta(days=7)
+        week_index += 1
+
+def _semester_booking_in(payload: schemas.SemesterBookingCreate, start_dt: datetime, end_dt: datetime):
+    return schemas.BookingCreate(
+        room_id=payload.room_id,
+        user_name=payload.user_name,
+        user_identity=payload.user_identity,
+        purpose=payload.purpose,
+        category=payload.category,
+        start_time=start_dt,
+        end_time=end_dt,
+    )
+
+def create_semester_bookings(db: Session, payload: schemas.SemesterBookingCreate, *, bulk: bool = True):
+    """Create one booking per week; conflicting or invalid weeks are skipped.
+
+    bulk=True (default) validates every occurrence, loads all potentially
+    conflicting bookings of the room in one query, resolves conflicts in
+    memory and inserts the survivors in a single transaction. bulk=False
+    keeps the original one-create_booking-per-week path.
+    """
     created_ids = []
     skipped = []
     if payload.end_date < payload.start_date:
         return created_ids, skipped
-    # derive weekday from start_date
-    target_weekday = payload.start_date.weekday()
-    current = payload.start_date
-    weeks_processed = 0
     logger.info(
         "semester_create_begin room=%s user=%s identity=%s category=%s start_date=%s end_date=%s start_hm=%s end_hm=%s weekday=%d",
         payload.room_id,
         payload.user_name,
         payload.user_identity,
         payload.category.value if hasattr(payload.category, 'value') else str(payload.category),
-        payload.start_date.isoformat(),
-        payload.end_date.isoformat(),
+        payload.start_date,
+        payload.end_date,
         getattr(payload, 'start_time_hm', None),
         getattr(payload, 'end_time_hm', None),
-        target_weekday,
+        payload.start_date.weekday(),
     )
-    # iterate weekly (every 7 days from start_date)
-    while current <= payload.end_date and weeks_processed < MAX_SEMESTER_WEEKS:
-        if current.weekday() != target_weekday:
-            # safety; should not happen
-            current += timedelta(days=1)
-            continue
-        # Use provided start_time_hm
-        hh_s, mm_s = map(int, payload.start_time_hm.split(':'))
-        hh_e, mm_e = map(int, payload.end_time_hm.split(':'))
-        start_dt = datetime(current.year, current.month, current.day, hh_s, mm_s, tzinfo=TZ)
-        end_dt = datetime(current.year, current.month, current.day, hh_e, mm_e, tzinfo=TZ)
-        logger.info(
-            "semester_try room=%s start=%s end=%s week_index=%d",
-            payload.room_id,
-            start_dt.isoformat(),
-            end_dt.isoformat(),
-            weeks_processed,
-        )
-        try:
-            booking_in = schemas.BookingCreate(
-                room_id=payload.room_id,
-                user_name=payload.user_name,
-                user_identity=payload.user_identity,
-                purpose=payload.purpose,
-                category=payload.category,
-                start_time=start_dt,
-                end_time=end_dt,
-            )
-            b = create_booking(db, booking_in, is_semester=True)
+    if bulk:
+        created_ids, skipped = _create_semester_bulk(db, payload)
+    else:
+        for week_index, start_dt, end_dt in _semester_occurrences(payload):
+            logger.info("semester_try room=%s start=%s end=%s week_index=%d", payload.room_id, start_dt, end_dt, week_index)
+            try:
+                b = create_booking(db, _semester_booking_in(payload, start_dt, end_dt), is_semester=True)
+            except ValueError as ve:
+                skipped.append(start_dt.isoformat())
+                metrics.semester_skipped.inc("invalid")
+                logger.info("semester_skip_invalid start=%s end=%s error=%s", start_dt, end_dt, ve)
+                continue
             if b:
                 created_ids.append(b.id)
-                logger.info(
-                    "semester_created booking_id=%s start=%s end=%s",
-                    b.id,
-                    start_dt.isoformat(),
-                    end_dt.isoformat(),
-                )
+                logger.info("semester_created booking_id=%s start=%s end=%s", b.id, start_dt, end_dt)
             else:
                 skipped.append(start_dt.isoformat())
-                logger.info(
-                    "semester_skip_conflict start=%s end=%s",
-                    start_dt.isoformat(),
-                    end_dt.isoformat(),
-                )
-        except ValueError as ve:
-            skipped.append(start_dt.isoformat())
-            logger.info(
-                "semester_skip_invalid start=%s end=%s error=%s",
-                start_dt.isoformat(),
-                end_dt.isoformat(),
-                str(ve),
-            )
-        current += timedelta(days=7)
-        weeks_processed += 1
+                metrics.semester_skipped.inc("conflict")
+                logger.info("semester_skip_conflict start=%s end=%s", start_dt, end_dt)
     logger.info(
         "semester_create_end created=%d skipped=%d",
         len(created_ids),
         len(skipped),
     )
     return created_ids, skipped
+
+def _create_semester_bulk(db: Session, payload: schemas.SemesterBookingCreate):
+    skipped: list[tuple[int, str]] = []
+    valid = []
+    for week_index, start_dt, end_dt in _semester_occurrences(payload):
+        logger.info("semester_try room=%s start=%s end=%s week_index=%d", payload.room_id, start_dt, end_dt, week_index)
+        booking_in = _semester_booking_in(payload, start_dt, end_dt)
+        try:
+            start, end, category = _prepare_booking(booking_in)
+        except ValueError as ve:
+            skipped.append((week_index, start_dt.isoformat()))
+            metrics.semester_skipped.inc("invalid")
+            logger.info("semester_skip_invalid start=%s end=%s error=%s", start_dt, end_dt, ve)
+            continue
+        valid.append((week_index, booking_in, start, end, category))
+    if not valid:
+        return [], [iso for _, iso in skipped]
+
+    _begin_write(db, [payload.room_id])
+    # one query for every booking that could collide with any occurrence
+    span_start = min(v[2] for v in valid)
+    span_end = max(v[3] for v in valid)
+    rows = db.execute(
+        select(models.Booking.id, models.Booking.start_time, models.Booking.end_time).where(
+            models.Booking.room_id == payload.room_id,
+            models.Booking.status != models.BookingStatus.rejected,
+            _overlapping(span_start, span_end),
+        )
+    ).all()
+    occupied = conflict_index.RoomIntervals()
+    for bid, st, et in rows:
+        occupied.add(bid, st, et)
+
+    new: list[tuple[models.Booking, datetime, datetime]] = []
+    for week_index, booking_in, start, end, category in valid:
+        key_start, key_end = start.replace(tzinfo=None), end.replace(tzinfo=None)
+        if occupied.overlapping(key_start, key_end):
+            skipped.append((week_index, start.isoformat()))
+            metrics.semester_skipped.inc("conflict")
+            logger.info("semester_skip_conflict start=%s end=%s", start, end)
+            continue
+        # accepted occurrences also block later ones in the same series
+        occupied.add(-(len(new) + 1), key_start, key_end)
+        new.append((_new_booking(booking_in, start, end, category, is_semester=True), start, end))
+
+    created_ids = _insert_bookings(db, new)
+    for bid, (_, start, end) in zip(created_ids, new):
+        logger.info("semester_created booking_id=%s start=%s end=%s", bid, start, end)
+    skipped.sort()
+    return created_ids, [iso for _, iso in skipped]
+
+def _insert_bookings(db: Session, new: list[tuple[models.Booking, datetime, datetime]]) -> list[int]:
+    """Insert pre-checked bookings in one transaction (index updated under the lock) and run the post-commit hooks.
+
+    Ends the caller's write transaction (_begin_write) even when there is nothing to insert.
+    """
+    if not new:
+        db.rollback()
+        return []
+    db.add_all([b for b, _, _ in new])
+    db.flush()
+    created = [(b.id, b.room_id, start, end) for b, start, end in new]
+    semester = sum(1 for b, _, _ in new if b.is_semester)
+    # serialize before commit expires the rows (only if someone is listening)
+    events = [feed.serialize(b) for b, _, _ in new] if feed.hub.subscriber_count() else []
+    _commit_indexed(db, [(*row, b.status) for row, (b, _, _) in zip(created, new)])
+    for room_id in dict.fromkeys(room_id for _, room_id, _, _ in created):
+        changes.bump(room_id)
+    for event_payload in events:
+        feed.hub.publish("created", payload=event_payload)
+    if semester:
+        metrics.bookings_created.inc("semester", amount=semester)
+    if semester < len(new):
+        metrics.bookings_created.inc("single", amount=len(new) - semester)
+    return [bid for bid, _, _, _ in created]
@@ -0,0 +1,124 @@
+"""AsyncSession versions of the hot crud paths (used when DB_ASYNC=true).
+
+Statements, validation and post-commit hooks are shared with crud.py; only the
+I/O is awaited here. Relationships are attached with set_committed_value in the
+shared helpers, so serialization never triggers a lazy load on an AsyncSession.
+"""
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+from datetime import datetime
+import asyncio
+from . import models, schemas, conflict_index, changes, crud, multiworker
+from .database import IS_SQLITE
+
+
+async def get_rooms(db: AsyncSession):
+    return (await db.scalars(select(models.Room).order_by(models.Room.id))).all()
+
+
+async def get_rooms_weekly(db: AsyncSession):
+    rooms = (await db.scalars(select(models.Room).order_by(models.Room.id))).all()
+    bookings = (await db.scalars(crud._weekly_bookings_stmt())).all()
+    return crud._attach_weekly(rooms, bookings)
+
+
+async def get_room_with_bookings(
+    db: AsyncSession,
+    room_id: int,
+    *,
+    date_from: datetime | None = None,
+    date_to: datetime | None = None,
+    limit: int = crud.ROOM_BOOKINGS_DEFAULT_LIMIT,
+):
+    room = await db.get(models.Room, room_id)
+    if not room:
+        return None
+    stmt = crud._room_bookings_stmt(room_id, date_from, date_to, limit)
+    set_committed_value(room, "bookings", list(await db.scalars(stmt)))
+    return room
+
+
+async def list_bookings(db: AsyncSession, room_id=None, status=None, is_semester=None, **options):
+    return (await db.scalars(crud._list_bookings_stmt(room_id, status, is_semester, **options))).all()
+
+
+async def list_bookings_page(
+    db: AsyncSession, *, limit: int = crud.DEFAULT_PAGE_SIZE, order: str = crud.DEFAULT_BOOKING_ORDER, **filters
+):
+    return crud._page(await list_bookings(db, limit=limit + 1, order=order, **filters), limit, order)
+
+
+async def _find_conflicts(db: AsyncSession, room_id: int, start: datetime, end: datetime):
+    stmt = crud._conflict_stmt(room_id, start, end)
+    if not (conflict_index.enabled() and conflict_index.index.ready):
+        return (await db.scalars(stmt)).all()
+    if not conflict_index.index.fresh(room_id):
+        conflict_index.index.load_room(room_id, (await db.execute(conflict_index.room_stmt(room_id))).all())
+    ids = conflict_index.index.overlapping(room_id, start, end)
+    if conflict_index.check_mode():
+        conflicts = (await db.scalars(stmt)).all()
+        crud._check_index_result(room_id, start, end, ids, conflicts)
+        return conflicts
+    if not ids:
+        return []
+    return (await db.scalars(stmt.where(models.Booking.id.in_(ids)))).all()
+
+
+async def _begin_write(db: AsyncSession, room_ids) -> None:
+    """See crud._begin_write."""
+    if db.in_transaction():
+        await (db.commit() if (db.new or db.dirty or db.deleted) else db.rollback())
+    if not IS_SQLITE:
+        await db.execute(crud._write_lock_stmt(room_ids))
+    else:
+        await _begin_immediate(db)
+    if multiworker.active():
+        await db.run_sync(lambda s: multiworker.sync(s.connection()))
+
+
+async def _begin_immediate(db: AsyncSession) -> None:
+    for attempt in range(crud.WRITE_LOCK_RETRIES + 1):
+        try:
+            await db.connection(execution_options={"sqlite_begin": "IMMEDIATE"})
+            return
+        except OperationalError as exc:
+            await db.rollback()
+            if not crud._is_lock_error(exc):
+                raise
+            if attempt == crud.WRITE_LOCK_RETRIES:
+                raise crud.WriteLockTimeout(str(exc.orig)) from exc
+            crud.logger.warning("booking_write_lock_retry attempt=%d error=%s", attempt + 1, exc.orig)
+            await asyncio.sleep(crud.WRITE_LOCK_BACKOFF * 2 ** attempt)
+
+
+async def create_booking(db: AsyncSession, booking_in: schemas.BookingCreate, *, is_semester: bool = False):
+    start, end, persist_cat = crud._prepare_booking(booking_in)
+    await _begin_write(db, [booking_in.room_id])
+    conflicts = await _find_conflicts(db, booking_in.room_id, start, end)
+    if conflicts:
+        crud._log_conflict(booking_in.room_id, start, end, conflicts)
+        await db.rollback()
+        return None
+    booking = crud._new_booking(booking_in, start, end, persist_cat, is_semester=is_semester)
+    db.add(booking)
+    await db.flush()
+    await _commit_indexed(db, [crud._index_row(booking)])
+    changes.bump(booking_in.room_id)
+    await db.refresh(booking)
+    crud._booking_created(booking)
+    return booking
+
+
+async def _commit_indexed(db: AsyncSession, rows) -> None:
+    """See crud._commit_indexed."""
+    if not conflict_index.index.ready:
+        await db.commit()
+        return
+    crud._stage_index(rows)
+    try:
+        await db.commit()
+    except Exception:
+        crud._unstage_index(rows)
+        raise
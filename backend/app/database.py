@@ -1,17 +1,160 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, declarative_base
+import logging
 import os
 
+logger = logging.getLogger("math_office.database")
+
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./app.db")
+IS_SQLITE = DATABASE_URL.startswith("sqlite")
+IS_SQLITE_MEMORY = IS_SQLITE and (DATABASE_URL in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in DATABASE_URL)
+
+# SQLite profile, applied to every pooled connection (see _apply_sqlite_pragmas)
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL").upper()
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL").upper()  # NORMAL is durable enough under WAL
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-16000"))  # negative = KiB per connection
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(128 * 1024 * 1024)))
+SQLITE_TEMP_STORE = os.getenv("SQLITE_TEMP_STORE", "MEMORY").upper()
+
+# Pool sizing; keep pool_size + max_overflow at or below the worker threadpool (40 by default)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+
+_CHOICES = {
+    "SQLITE_JOURNAL_MODE": (SQLITE_JOURNAL_MODE, {"WAL", "DELETE", "TRUNCATE", "PERSIST", "MEMORY", "OFF"}),
+    "SQLITE_SYNCHRONOUS": (SQLITE_SYNCHRONOUS, {"OFF", "NORMAL", "FULL", "EXTRA"}),
+    "SQLITE_TEMP_STORE": (SQLITE_TEMP_STORE, {"DEFAULT", "FILE", "MEMORY"}),
+}
+for _name, (_value, _allowed) in _CHOICES.items():
+    if _value not in _allowed:
+        raise ValueError(f"{_name}={_value!r} is not one of {sorted(_allowed)}")
 
-connect_args = {"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
-engine = create_engine(DATABASE_URL, echo=False, future=True, connect_args=connect_args)
+engine_kwargs = {}
+if IS_SQLITE:
+    connect_args = {"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000}
+    if not IS_SQLITE_MEMORY:
+        engine_kwargs = dict(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT)
+else:
+    connect_args = {}
+    engine_kwargs = dict(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT, pool_pre_ping=True)
+engine = create_engine(DATABASE_URL, echo=False, future=True, connect_args=connect_args, **engine_kwargs)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
 Base = declarative_base()
 
+
+def _sqlite_pragmas() -> list[str]:
+    pragmas = [
+        f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}",
+        f"PRAGMA cache_size={SQLITE_CACHE_SIZE}",
+        f"PRAGMA temp_store={SQLITE_TEMP_STORE}",
+        f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}",
+    ]
+    if not IS_SQLITE_MEMORY:
+        pragmas += [f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}", f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}"]
+    return pragmas
+
+
+if IS_SQLITE:
+    @event.listens_for(engine, "connect")
+    def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in _sqlite_pragmas():
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+    @event.listens_for(engine, "begin")
+    def _sqlite_begin(conn):
+        """BEGIN IMMEDIATE for transactions opened with sqlite_begin="IMMEDIATE".
+
+        The driver only BEGINs implicitly before the first INSERT/UPDATE, so a
+        SELECT-then-INSERT ran its SELECT outside the transaction and two
+        writers (threads or worker processes) could both pass a conflict check.
+        Writers that check-then-insert (crud._begin_write) take the write lock
+        up front instead and queue on busy_timeout. Other transactions keep the
+        driver's behaviour. Sent on the raw cursor, like the driver's own BEGIN,
+        so statement counts (metrics, sqlprofile) are unchanged.
+        """
+        if conn.get_execution_options().get("sqlite_begin") != "IMMEDIATE":
+            return
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+        finally:
+            cursor.close()
+
+
+def log_database_settings() -> dict:
+    """Log the effective settings read back from a live connection (called at startup).
+
+    Returns them as {pragma: value}; empty when the database is not SQLite.
+    """
+    pool = engine.pool
+    pool_desc = f"{type(pool).__name__} size={getattr(pool, 'size', lambda: '-')()} max_overflow={DB_MAX_OVERFLOW}"
+    effective = {}
+    if IS_SQLITE:
+        names = ("journal_mode", "synchronous", "busy_timeout", "cache_size", "mmap_size", "temp_store")
+        with engine.connect() as conn:
+            effective = {n: conn.exec_driver_sql(f"PRAGMA {n}").scalar() for n in names}
+    logger.info(
+        "database url=%s pool=%s%s",
+        engine.url.render_as_string(hide_password=True),
+        pool_desc,
+        "".join(f" {k}={v}" for k, v in effective.items()),
+    )
+    return effective
+
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+# -------------------- ASYNC PATH (DB_ASYNC=true) --------------------
+# The hot read endpoints and POST /bookings switch to AsyncSession (aiosqlite for
+# SQLite). ASYNC_DATABASE_URL defaults to DATABASE_URL with the async driver.
+DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() == "true"
+_ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+
+def _async_url(url: str) -> str:
+    scheme, sep, rest = url.partition("://")
+    return _ASYNC_DRIVERS.get(scheme, scheme) + sep + rest
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or _async_url(DATABASE_URL)
+async_engine = None
+AsyncSessionLocal = None
+
+if DB_ASYNC:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+    from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+    # aiosqlite defaults to NullPool for file databases: a new connection, thread and
+    # PRAGMA round per session. Pool them like the sync engine (DB_POOL_SIZE/DB_MAX_OVERFLOW).
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        echo=False,
+        connect_args={"timeout": SQLITE_BUSY_TIMEOUT_MS / 1000} if IS_SQLITE else {},
+        **(dict(poolclass=AsyncAdaptedQueuePool, **engine_kwargs) if engine_kwargs else {}),
+    )
+    if IS_SQLITE:
+        event.listen(async_engine.sync_engine, "connect", _apply_sqlite_pragmas)
+        event.listen(async_engine.sync_engine, "begin", _sqlite_begin)
+    AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=True)
+
+
+def all_engines():
+    """Sync engines to attach cursor/pool events to (includes the async engine's sync facade)."""
+    return [engine] + ([async_engine.sync_engine] if async_engine is not None else [])
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,103 @@
+"""Booking change feed pushed to browsers over Server-Sent Events.
+
+crud publishes after each committed booking write (created, status_changed,
+deleted). Publishing happens on request worker threads, so events are handed
+to each subscriber's event loop with call_soon_threadsafe; every subscriber is
+just an asyncio.Queue consumed by an async generator, so idle connections cost
+no threads.
+"""
+import asyncio
+import json
+import threading
+
+from . import changes, schemas
+
+HEARTBEAT_SECONDS = 15
+QUEUE_SIZE = 100
+
+
+class Subscriber:
+    __slots__ = ("room_id", "queue", "loop", "overflowed")
+
+    def __init__(self, room_id: int | None, loop: asyncio.AbstractEventLoop):
+        self.room_id = room_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.loop = loop
+        self.overflowed = False
+
+    def _deliver(self, event: dict):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # slow consumer: close its stream; EventSource reconnects and re-fetches
+            self.overflowed = True
+            self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+
+class BookingFeed:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: set[Subscriber] = set()
+
+    def subscribe(self, room_id: int | None = None) -> Subscriber:
+        sub = Subscriber(room_id, asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscriber):
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, event_type: str, booking=None, *, payload: dict | None = None):
+        """Send booking (ORM row) to matching subscribers; no-op without listeners.
+
+        payload may be passed pre-serialized when the row is expired or deleted.
+        """
+        if not self._subscribers:
+            return
+        if payload is None:
+            if booking is None:
+                return
+            payload = serialize(booking)
+        event = {"type": event_type, "version": changes.current(), "booking": payload}
+        with self._lock:
+            targets = [s for s in self._subscribers if s.room_id is None or s.room_id == payload["room_id"]]
+        for sub in targets:
+            try:
+                sub.loop.call_soon_threadsafe(sub._deliver, event)
+            except RuntimeError:
+                # loop already closed (server shutting down)
+                self.unsubscribe(sub)
+
+
+def serialize(booking) -> dict:
+    return schemas.Booking.model_validate(booking).model_dump(mode="json")
+
+
+async def sse_stream(room_id: int | None, is_disconnected, heartbeat: float = HEARTBEAT_SECONDS):
+    """Subscribe and yield text/event-stream frames until the client goes away."""
+    sub = hub.subscribe(room_id)
+    try:
+        yield f"retry: 5000\n: connected version={changes.current()}\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(sub.queue.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                if await is_disconnected():
+                    break
+                yield ": keep-alive\n\n"
+                continue
+            if event is None:
+                break
+            data = json.dumps(event["booking"], ensure_ascii=False, separators=(",", ":"))
+            yield f"id: {event['version']}\nevent: {event['type']}\ndata: {data}\n\n"
+    finally:
+        hub.unsubscribe(sub)
+
+
+hub = BookingFeed()
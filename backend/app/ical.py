@@ -0,0 +1,113 @@
+"""iCalendar (RFC 5545) feeds of room bookings for calendar subscriptions.
+
+Feeds cover approved bookings (optionally pending ones, marked TENTATIVE)
+from ICS_LOOKBACK_DAYS before today to ICS_LOOKAHEAD_DAYS after it. Times are
+written in UTC so no VTIMEZONE block is needed.
+"""
+from datetime import datetime, timedelta, timezone
+import os
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from . import crud, models
+
+ICS_LOOKBACK_DAYS = int(os.getenv("ICS_LOOKBACK_DAYS", "30"))
+ICS_LOOKAHEAD_DAYS = int(os.getenv("ICS_LOOKAHEAD_DAYS", "180"))
+UID_DOMAIN = os.getenv("PUBLIC_HOST") or "math-office-booking"
+MEDIA_TYPE = "text/calendar; charset=utf-8"
+
+_CATEGORY_LABELS = {
+    models.BookingCategory.activity: "活動",
+    models.BookingCategory.meeting: "會議",
+    models.BookingCategory.course: "課程",
+}
+
+
+def render_feed(db: Session, room_id: int | None = None, *, include_pending: bool = False) -> bytes | None:
+    """Render the feed for one room (None = all rooms); None if the room does not exist."""
+    rooms_stmt = select(models.Room.id, models.Room.name)
+    if room_id is not None:
+        rooms_stmt = rooms_stmt.where(models.Room.id == room_id)
+    room_names = dict(db.execute(rooms_stmt).all())
+    if room_id is not None and room_id not in room_names:
+        return None
+
+    today = datetime.now(crud.TZ).replace(hour=0, minute=0, second=0, microsecond=0, tzinfo=None)
+    statuses = [models.BookingStatus.approved]
+    if include_pending:
+        statuses.append(models.BookingStatus.pending)
+    stmt = (
+        select(models.Booking)
+        .where(
+            models.Booking.status.in_(statuses),
+            crud._overlapping(today - timedelta(days=ICS_LOOKBACK_DAYS), today + timedelta(days=ICS_LOOKAHEAD_DAYS)),
+        )
+        .order_by(models.Booking.start_time, models.Booking.id)
+    )
+    if room_id is not None:
+        stmt = stmt.where(models.Booking.room_id == room_id)
+
+    name = room_names[room_id] if room_id is not None else "全部教室"
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//math-office//room-booking//ZH-TW",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{_escape(name)}",
+        "X-WR-TIMEZONE:Asia/Taipei",
+        "REFRESH-INTERVAL;VALUE=DURATION:PT15M",
+    ]
+    for b in db.scalars(stmt):
+        lines.extend(_event(b, room_names.get(b.room_id, "")))
+    lines.append("END:VCALENDAR")
+    return "".join(_fold(line) + "\r\n" for line in lines).encode("utf-8")
+
+
+def _event(b: models.Booking, room_name: str) -> list[str]:
+    label = b.purpose or _CATEGORY_LABELS.get(b.category, "借用")
+    summary = f"{label}（{b.user_name}）"
+    pending = b.status == models.BookingStatus.pending
+    if pending:
+        summary = "[待審] " + summary
+    return [
+        "BEGIN:VEVENT",
+        f"UID:booking-{b.id}@{UID_DOMAIN}",
+        f"DTSTAMP:{_utc(b.requested_at or b.created_at)}",
+        f"DTSTART:{_utc(b.start_time)}",
+        f"DTEND:{_utc(b.end_time)}",
+        f"SUMMARY:{_escape(summary)}",
+        f"LOCATION:{_escape(room_name)}",
+        f"STATUS:{'TENTATIVE' if pending else 'CONFIRMED'}",
+        "END:VEVENT",
+    ]
+
+
+def _utc(dt: datetime) -> str:
+    # naive values are Asia/Taipei wall time, like every stored booking time
+    return crud._to_local(dt).astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def _escape(text: str) -> str:
+    return (
+        text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+        .replace("\r\n", "\\n").replace("\n", "\\n")
+    )
+
+
+def _fold(line: str, limit: int = 75) -> str:
+    """Fold to at most `limit` octets per physical line without splitting UTF-8 characters."""
+    if len(line.encode("utf-8")) <= limit:
+        return line
+    parts, current, size = [], [], 0
+    for ch in line:
+        n = len(ch.encode("utf-8"))
+        # continuation lines start with a space, which counts towards the limit
+        if size + n > (limit if not parts else limit - 1):
+            parts.append("".join(current))
+            current, size = [], 0
+        current.append(ch)
+        size += n
+    parts.append("".join(current))
+    return "\r\n ".join(parts)
@@ -0,0 +1,189 @@
+"""Queue-backed logging for the math_office.* loggers.
+
+Request threads only create a LogRecord and put it on a bounded queue
+(QueueHandler); a QueueListener thread formats and writes it. Unlike the stock
+QueueHandler, records are enqueued unformatted, so message interpolation,
+isoformat() calls and JSON encoding all happen on the listener thread. Log
+arguments of math_office loggers must therefore be immutable values
+(ints, strings, datetimes, tuples), never ORM objects. When the queue is full
+the record is dropped and counted in log_records_dropped_total rather than
+blocking the request.
+
+LOG_FORMAT=json (default) writes one object per line. The event name is the
+first word of the message and "key=%s" pairs in the format string become
+fields, so the existing `booking_conflict room=%s ...` calls are structured
+without changing their text:
+
+    {"ts": "...", "level": "INFO", "logger": "math_office.crud", "event": "semester_try", "room": 3, ...}
+
+LOG_SAMPLE="semester_try=0.1,semester_created=0.5" keeps that share of an
+event's lines (deterministically: 0.1 writes every 10th). Sampling happens
+in the handler, so caplog and other handlers still see every record.
+"""
+import atexit
+import copy
+import datetime as _dt
+import enum
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import sys
+import threading
+
+from . import metrics
+
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s - %(message)s"
+
+if LOG_FORMAT not in ("json", "text"):
+    raise ValueError(f"LOG_FORMAT={LOG_FORMAT!r} is not one of ['json', 'text']")
+
+log_records_dropped = metrics.Counter("log_records_dropped_total", "Log records dropped because the log queue was full.")
+
+
+def parse_sample_rates(raw: str | None) -> dict[str, float]:
+    rates = {}
+    for item in (raw or "").split(","):
+        name, sep, value = item.partition("=")
+        if not item.strip():
+            continue
+        if not sep:
+            raise ValueError(f"LOG_SAMPLE entry {item!r} is not event=rate")
+        rate = float(value)
+        if not 0.0 <= rate <= 1.0:
+            raise ValueError(f"LOG_SAMPLE rate for {name.strip()!r} must be between 0 and 1")
+        rates[name.strip()] = rate
+    return rates
+
+
+def event_name(record: logging.LogRecord) -> str:
+    msg = record.msg if isinstance(record.msg, str) else str(record.msg)
+    return msg.split(" ", 1)[0]
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps `rate` of each configured event's records, spread evenly."""
+
+    def __init__(self, rates: dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self._seen: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if not self.rates:
+            return True
+        name = event_name(record)
+        rate = self.rates.get(name)
+        if rate is None or rate >= 1.0:
+            return True
+        with self._lock:
+            n = self._seen.get(name, 0) + 1
+            self._seen[name] = n
+        if int(n * rate) == int((n - 1) * rate):
+            return False
+        record.sample_rate = rate
+        return True
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves formatting to the listener and never blocks."""
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        if record.exc_info:
+            # traceback objects pin frames; render them here while they are valid
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            log_records_dropped.inc()
+
+
+_FIELD = re.compile(r"(\w+)=%[-#0 +]*\d*(?:\.\d+)?[sdrfi]")
+_PLACEHOLDER = re.compile(r"%[-#0 +]*\d*(?:\.\d+)?[sdrfi]")
+_field_cache: dict[str, tuple[str, ...] | None] = {}
+
+
+def _field_names(msg: str) -> tuple[str, ...] | None:
+    """Names for every placeholder of a `event key=%s ...` format, or None."""
+    names = _field_cache.get(msg)
+    if names is None and msg not in _field_cache:
+        found = tuple(_FIELD.findall(msg))
+        names = found if found and len(found) == len(_PLACEHOLDER.findall(msg)) else None
+        if len(_field_cache) < 1024:  # format strings are literals; don't grow on f-strings
+            _field_cache[msg] = names
+    return names
+
+
+def _json_default(value):
+    if isinstance(value, (_dt.datetime, _dt.date, _dt.time)):
+        return value.isoformat()
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    return str(value)
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        out = {
+            "ts": _dt.datetime.fromtimestamp(record.created, _dt.timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+        }
+        msg = record.msg if isinstance(record.msg, str) else str(record.msg)
+        args = record.args if isinstance(record.args, tuple) else ()
+        names = _field_names(msg)
+        if names is not None and len(names) == len(args):
+            out["event"] = msg.split(" ", 1)[0]
+            for name, value in zip(names, args):
+                out.setdefault(name, value)
+        else:
+            out["event"] = event_name(record)
+            out["message"] = record.getMessage()
+        if getattr(record, "sample_rate", None) is not None:
+            out["sample_rate"] = record.sample_rate
+        if record.exc_text:
+            out["exc"] = record.exc_text
+        return json.dumps(out, ensure_ascii=False, default=_json_default)
+
+
+_listener: logging.handlers.QueueListener | None = None
+_handler: DeferredQueueHandler | None = None
+
+
+def configure(logger_name: str = "math_office", *, stream=None) -> DeferredQueueHandler:
+    """Attach the queue handler to `logger_name` and start the listener (idempotent)."""
+    global _listener, _handler
+    logger = logging.getLogger(logger_name)
+    logger.setLevel(LOG_LEVEL)
+    if _handler is not None:
+        return _handler
+    target = logging.StreamHandler(stream or sys.stdout)
+    target.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT))
+    _handler = DeferredQueueHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE))
+    _handler.addFilter(SamplingFilter(parse_sample_rates(os.getenv("LOG_SAMPLE"))))
+    logger.addHandler(_handler)
+    _listener = logging.handlers.QueueListener(_handler.queue, target, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop)
+    return _handler
+
+
+def stop():
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -1,24 +1,21 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, File, HTTPException, Query, Request, Response, UploadFile
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
 import secrets
 import os
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from . import models, schemas, crud
-from .database import engine, Base, get_db
-from sqlalchemy import text
-from datetime import datetime
-import logging
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import schemas, crud, crud_async, conflict_index, changes, cache, feed, analytics, export, ical, timetable, metrics, sqlprofile, logsetup, migrations, multiworker
+from .database import engine, get_db, get_async_db, log_database_settings, DB_ASYNC, all_engines
+from pydantic import TypeAdapter
+from datetime import date, datetime
 
 app = FastAPI(title="教室借用系統 API", docs_url=None, redoc_url=None)
 
-# Basic logging setup for app-specific logs (printed to stdout)
-_app_logger = logging.getLogger("math_office")
-if not _app_logger.handlers:
-    _handler = logging.StreamHandler()
-    _handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s - %(message)s"))
-    _app_logger.addHandler(_handler)
-_app_logger.setLevel(logging.INFO)
+# App logs (math_office.*) go through a queue to a listener thread that writes
+# JSON lines (LOG_FORMAT=text for the old format); see logsetup.py
+logsetup.configure()
 
 # -------------------- ADMIN BASIC AUTH --------------------
 security = HTTPBasic(auto_error=False)
@@ -75,84 +72,307 @@ else:
     app.add_middleware(CORSMiddleware, allow_origins=origins, allow_credentials=True, **cors_common)
 # -----------------------------------------------------
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+# -------------------- MULTI-WORKER --------------------
+# MULTI_WORKER=true (uvicorn --workers N, several containers on one database):
+# each request first applies other workers' writes to the in-process caches,
+# ETag version and conflict index (see multiworker.py). Added before the metrics
+# middleware so its SELECT is counted in the request's DB time. Always mounted:
+# it does nothing until multiworker.install() runs at startup.
+app.add_middleware(multiworker.SyncMiddleware, engine=engine)
 
-# Seed rooms if empty
+# -------------------- METRICS --------------------
+# METRICS_ENABLED=false -> no timing middleware, no DB cursor hooks, no /metrics
+if metrics.ENABLED:
+    # added last = outermost, so latency includes CORS handling
+    app.add_middleware(metrics.MetricsMiddleware)
+    metrics.install_db_timing(all_engines())
+# SQL_PROFILE=true -> per-request statement counts and N+1 warnings (see sqlprofile.py)
+if sqlprofile.ENABLED:
+    app.add_middleware(sqlprofile.SQLProfileMiddleware)
+    sqlprofile.install(all_engines())
+
+# Schema comes from Alembic migrations (app/migrations); when the database is
+# already at head, startup costs one SELECT on alembic_version
 @app.on_event("startup")
-async def seed_rooms():
-    with next(get_db()) as db:
-        # Ensure is_semester column exists for Booking (simple runtime migration for SQLite)
-        try:
-            cols = [r[1] for r in db.execute(text("PRAGMA table_info(bookings)")).fetchall()]
-            if 'is_semester' not in cols:
-                db.execute(text("ALTER TABLE bookings ADD COLUMN is_semester BOOLEAN NOT NULL DEFAULT 0"))
-                db.commit()
-        except Exception:
-            pass
-        # Initial seed if empty
-        if not db.query(models.Room).first():
-            initial_rooms = [
-                ("志希 116", None),
-                ("志希 221（E 化教室）", None),
-                ("志希樓電腦教室", None),
-                ("大智 204", None),
-                ("研討一", None),
-                ("研討二", None),
-            ]
-            for name, desc in initial_rooms:
-                db.add(models.Room(name=name, description=desc))
-            db.commit()
-        else:
-            # Migration: rename legacy names and remove old description
-            changed = False
-            mapping = {
-                "116": "志希 116",
-                "221": "志希 221（E 化教室）",
-                "電腦教室": "志希樓電腦教室",
-                "204": "大智 204",
-            }
-            q = db.query(models.Room).all()
-            for r in q:
-                if r.name in mapping and r.name != mapping[r.name]:
-                    r.name = mapping[r.name]
-                    changed = True
-                if r.name == "志希樓電腦教室" and r.description:
-                    r.description = None
-                    changed = True
-            if changed:
-                db.commit()
-
-@app.get("/rooms/weekly", response_model=list[schemas.WeeklyRoom])
-def list_rooms_weekly(db: Session = Depends(get_db)):
-    return crud.get_rooms_weekly(db)
-
-@app.get("/rooms", response_model=list[schemas.Room])
-def list_rooms(db: Session = Depends(get_db)):
-    return crud.get_rooms(db)
-
-@app.get("/rooms/{room_id}", response_model=schemas.RoomWithBookings)
-def get_room(room_id: int, db: Session = Depends(get_db)):
-    room = crud.get_room(db, room_id)
-    if not room:
-        raise HTTPException(status_code=404, detail="Room not found")
-    return room
-
-@app.post("/bookings", response_model=schemas.Booking)
-def create_booking(booking_in: schemas.BookingCreate, db: Session = Depends(get_db)):
+async def prepare_database():
+    log_database_settings()
+    migrations.ensure_schema(engine)
+    if multiworker.ENABLED:
+        multiworker.install(engine)
+    if conflict_index.enabled():
+        with next(get_db()) as db:
+            conflict_index.index.warm(db)
+
+# -------------------- CONDITIONAL GET --------------------
+# Read endpoints tag responses with the in-memory data version (see changes.py).
+# The ETag is computed before the DB is read, so a write racing the read can only
+# make the tag older than the data (next request re-fetches), never newer.
+def _today_tag() -> str:
+    # day-relative windows (weekly board, room detail default) roll at local midnight
+    return datetime.now(crud.TZ).strftime("%Y%m%d")
+
+def _etag_headers(etag: str) -> dict:
+    return {"ETag": etag, "Cache-Control": "no-cache"}
+
+def _not_modified(request: Request, response: Response, etag: str) -> Response | None:
+    inm = request.headers.get("if-none-match")
+    if inm:
+        candidates = {t.strip().removeprefix("W/") for t in inm.split(",")}
+        if etag in candidates or "*" in candidates:
+            return Response(status_code=304, headers=_etag_headers(etag))
+    response.headers.update(_etag_headers(etag))
+    return None
+# ---------------------------------------------------------
+
+_weekly_adapter = TypeAdapter(list[schemas.WeeklyRoom])
+
+def _weekly_key() -> tuple[tuple[str, int], str]:
+    day = _today_tag()
+    version = changes.current()
+    return (day, version), changes.etag(day, version=version)
+
+def _weekly_cached(key, etag: str) -> Response | None:
+    # serialized JSON cached per (local day, data version); writes clear it via changes.bump
+    body = cache.weekly.get(key)
+    if body is None:
+        return None
+    return Response(content=body, media_type="application/json", headers=_etag_headers(etag))
+
+def _weekly_store(key, etag: str, rooms) -> Response:
+    body = _weekly_adapter.dump_json(_weekly_adapter.validate_python(rooms, from_attributes=True))
+    cache.weekly.put(key, body)
+    return Response(content=body, media_type="application/json", headers=_etag_headers(etag))
+
+def _validate_booking_request(booking_in: schemas.BookingCreate):
     if booking_in.end_time <= booking_in.start_time:
         raise HTTPException(status_code=400, detail="結束時間必須晚於開始時間")
-    try:
-        booking = crud.create_booking(db, booking_in)
-    except ValueError as ve:
-        raise HTTPException(status_code=400, detail=str(ve))
+
+@app.exception_handler(crud.WriteLockTimeout)
+async def _write_lock_timeout(request: Request, exc: crud.WriteLockTimeout):
+    # every write lock attempt timed out: the database is saturated, ask the client to retry
+    return JSONResponse(status_code=503, content={"detail": "系統忙碌中，請稍後再試"}, headers={"Retry-After": "1"})
+
+def _created_or_409(booking):
     if not booking:
         raise HTTPException(status_code=409, detail="時間衝突，請選擇其他時段")
     return booking
 
-@app.get("/bookings", response_model=list[schemas.Booking])
-def list_all_bookings(room_id: int | None = None, status: schemas.BookingStatus | None = None, is_semester: bool | None = None, db: Session = Depends(get_db)):
-    return crud.list_bookings(db, room_id=room_id, status=status, is_semester=is_semester)
+def _paged_bookings(response: Response, page) -> list:
+    # Paged mode: newest first by (start_time, id); X-Next-Cursor is absent on the last page
+    items, next_cursor = page
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return items
+
+# Hot endpoints come in two flavours: sync Session (default) or AsyncSession when
+# DB_ASYNC=true (crud_async.py). Both share the helpers above and return the same
+# responses; only one set is registered.
+if DB_ASYNC:
+    @app.get("/rooms/weekly", response_model=list[schemas.WeeklyRoom])
+    async def list_rooms_weekly(request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
+        key, etag = _weekly_key()
+        early = _not_modified(request, response, etag) or _weekly_cached(key, etag)
+        if early:
+            return early
+        return _weekly_store(key, etag, await crud_async.get_rooms_weekly(db))
+
+    @app.get("/rooms", response_model=list[schemas.Room])
+    async def list_rooms(request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
+        not_modified = _not_modified(request, response, changes.etag())
+        if not_modified:
+            return not_modified
+        return await crud_async.get_rooms(db)
+else:
+    @app.get("/rooms/weekly", response_model=list[schemas.WeeklyRoom])
+    def list_rooms_weekly(request: Request, response: Response, db: Session = Depends(get_db)):
+        key, etag = _weekly_key()
+        early = _not_modified(request, response, etag) or _weekly_cached(key, etag)
+        if early:
+            return early
+        return _weekly_store(key, etag, crud.get_rooms_weekly(db))
+
+    @app.get("/rooms", response_model=list[schemas.Room])
+    def list_rooms(request: Request, response: Response, db: Session = Depends(get_db)):
+        not_modified = _not_modified(request, response, changes.etag())
+        if not_modified:
+            return not_modified
+        return crud.get_rooms(db)
+
+# free half-hour-aligned runs per room; registered before /rooms/{room_id}
+@app.get("/rooms/availability", response_model=list[schemas.RoomAvailability])
+def room_availability(
+    request: Request,
+    response: Response,
+    date_from: date = Query(..., alias="from"),
+    date_to: date | None = Query(None, alias="to"),
+    category: schemas.BookingCategory = schemas.BookingCategory.activity,
+    duration: int = Query(60, ge=crud.SLOT_MINUTES, description="分鐘，30 的倍數"),
+    room_id: int | None = None,
+    db: Session = Depends(get_db),
+):
+    not_modified = _not_modified(request, response, changes.etag())
+    if not_modified:
+        return not_modified
+    try:
+        return crud.get_availability(db, date_from, date_to or date_from, category, duration, room_id=room_id)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+
+# iCalendar subscriptions, registered before /rooms/{room_id}. Feeds are cached per
+# room and tagged with that room's cache generation, so polling clients keep getting
+# 304 while other rooms change.
+def _ics_response(request: Request, db: Session, room_id: int | None, include_pending: bool) -> Response:
+    day = _today_tag()
+    generation = cache.ics.generation(room_id)
+    etag = changes.etag("ics", "all" if room_id is None else room_id, int(include_pending), day, version=generation)
+    not_modified = _not_modified(request, Response(), etag)  # headers go on the Response built below
+    if not_modified:
+        return not_modified
+    key = (room_id, include_pending, day, generation)
+    body = cache.ics.get(key)
+    if body is None:
+        body = ical.render_feed(db, room_id, include_pending=include_pending)
+        if body is None:
+            raise HTTPException(status_code=404, detail="Room not found")
+        cache.ics.put(key, body)
+    return Response(content=body, media_type=ical.MEDIA_TYPE, headers=_etag_headers(etag))
+
+@app.get("/rooms.ics", response_class=Response)
+def all_rooms_ics(request: Request, include_pending: bool = False, db: Session = Depends(get_db)):
+    return _ics_response(request, db, None, include_pending)
+
+@app.get("/rooms/{room_id}.ics", response_class=Response)
+def room_ics(request: Request, room_id: int, include_pending: bool = False, db: Session = Depends(get_db)):
+    return _ics_response(request, db, room_id, include_pending)
+
+_room_query = dict(
+    date_from=Query(None, alias="from"),
+    date_to=Query(None, alias="to"),
+    limit=Query(crud.ROOM_BOOKINGS_DEFAULT_LIMIT, ge=1, le=crud.MAX_PAGE_SIZE),
+)
+# bookings intersecting [from, to); defaults to today .. +ROOM_BOOKINGS_DEFAULT_DAYS
+if DB_ASYNC:
+    @app.get("/rooms/{room_id}", response_model=schemas.RoomWithBookings)
+    async def get_room(
+        request: Request,
+        response: Response,
+        room_id: int,
+        date_from: datetime | None = _room_query["date_from"],
+        date_to: datetime | None = _room_query["date_to"],
+        limit: int = _room_query["limit"],
+        db: AsyncSession = Depends(get_async_db),
+    ):
+        not_modified = _not_modified(request, response, changes.etag(_today_tag()))
+        if not_modified:
+            return not_modified
+        room = await crud_async.get_room_with_bookings(db, room_id, date_from=date_from, date_to=date_to, limit=limit)
+        if not room:
+            raise HTTPException(status_code=404, detail="Room not found")
+        return room
+
+    @app.post("/bookings", response_model=schemas.Booking)
+    async def create_booking(booking_in: schemas.BookingCreate, db: AsyncSession = Depends(get_async_db)):
+        _validate_booking_request(booking_in)
+        try:
+            booking = await crud_async.create_booking(db, booking_in)
+        except ValueError as ve:
+            raise HTTPException(status_code=400, detail=str(ve))
+        return _created_or_409(booking)
+else:
+    @app.get("/rooms/{room_id}", response_model=schemas.RoomWithBookings)
+    def get_room(
+        request: Request,
+        response: Response,
+        room_id: int,
+        date_from: datetime | None = _room_query["date_from"],
+        date_to: datetime | None = _room_query["date_to"],
+        limit: int = _room_query["limit"],
+        db: Session = Depends(get_db),
+    ):
+        not_modified = _not_modified(request, response, changes.etag(_today_tag()))
+        if not_modified:
+            return not_modified
+        room = crud.get_room_with_bookings(db, room_id, date_from=date_from, date_to=date_to, limit=limit)
+        if not room:
+            raise HTTPException(status_code=404, detail="Room not found")
+        return room
+
+    @app.post("/bookings", response_model=schemas.Booking)
+    def create_booking(booking_in: schemas.BookingCreate, db: Session = Depends(get_db)):
+        _validate_booking_request(booking_in)
+        try:
+            booking = crud.create_booking(db, booking_in)
+        except ValueError as ve:
+            raise HTTPException(status_code=400, detail=str(ve))
+        return _created_or_409(booking)
+
+_bookings_query = dict(
+    date_from=Query(None, alias="from"),
+    date_to=Query(None, alias="to"),
+    limit=Query(None, ge=1, le=crud.MAX_PAGE_SIZE),
+    order=Query(crud.DEFAULT_BOOKING_ORDER, pattern=rf"^-?({'|'.join(crud.BOOKING_ORDERS)})$"),
+)
+if DB_ASYNC:
+    @app.get("/bookings", response_model=list[schemas.Booking])
+    async def list_all_bookings(
+        request: Request,
+        response: Response,
+        room_id: int | None = None,
+        status: schemas.BookingStatus | None = None,
+        is_semester: bool | None = None,
+        date_from: datetime | None = _bookings_query["date_from"],
+        date_to: datetime | None = _bookings_query["date_to"],
+        limit: int | None = _bookings_query["limit"],
+        cursor: str | None = None,
+        order: str = _bookings_query["order"],
+        db: AsyncSession = Depends(get_async_db),
+    ):
+        not_modified = _not_modified(request, response, changes.etag())
+        if not_modified:
+            return not_modified
+        filters = dict(room_id=room_id, status=status, is_semester=is_semester, date_from=date_from, date_to=date_to, order=order)
+        if limit is None and cursor is None:
+            return await crud_async.list_bookings(db, **filters)
+        try:
+            page = await crud_async.list_bookings_page(db, limit=limit or crud.DEFAULT_PAGE_SIZE, cursor=cursor, **filters)
+        except ValueError as ve:
+            raise HTTPException(status_code=400, detail=str(ve))
+        return _paged_bookings(response, page)
+else:
+    @app.get("/bookings", response_model=list[schemas.Booking])
+    def list_all_bookings(
+        request: Request,
+        response: Response,
+        room_id: int | None = None,
+        status: schemas.BookingStatus | None = None,
+        is_semester: bool | None = None,
+        date_from: datetime | None = _bookings_query["date_from"],
+        date_to: datetime | None = _bookings_query["date_to"],
+        limit: int | None = _bookings_query["limit"],
+        cursor: str | None = None,
+        order: str = _bookings_query["order"],
+        db: Session = Depends(get_db),
+    ):
+        not_modified = _not_modified(request, response, changes.etag())
+        if not_modified:
+            return not_modified
+        filters = dict(room_id=room_id, status=status, is_semester=is_semester, date_from=date_from, date_to=date_to, order=order)
+        if limit is None and cursor is None:
+            return crud.list_bookings(db, **filters)
+        try:
+            page = crud.list_bookings_page(db, limit=limit or crud.DEFAULT_PAGE_SIZE, cursor=cursor, **filters)
+        except ValueError as ve:
+            raise HTTPException(status_code=400, detail=str(ve))
+        return _paged_bookings(response, page)
+
+@app.get("/bookings/stream")
+async def booking_stream(request: Request, room_id: int | None = None):
+    # Server-Sent Events: created / status_changed / deleted with a schemas.Booking payload
+    return StreamingResponse(
+        feed.sse_stream(room_id, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @app.patch("/admin/bookings/{booking_id}", response_model=schemas.Booking, dependencies=[Depends(require_admin)])
 def update_status(booking_id: int, update: schemas.BookingUpdateStatus, db: Session = Depends(get_db)):
@@ -161,6 +381,31 @@ def update_status(booking_id: int, update: schemas.BookingUpdateStatus, db: Sess
         raise HTTPException(status_code=404, detail="Booking not found")
     return booking
 
+@app.patch("/admin/bookings", response_model=schemas.BulkStatusResult, dependencies=[Depends(require_admin)])
+def bulk_update_status(update: schemas.BulkStatusUpdate, db: Session = Depends(get_db)):
+    updated_ids, rejected_ids, not_found_ids = crud.bulk_update_booking_status(
+        db, update.ids, update.status, reject_overlapping=update.reject_overlapping,
+    )
+    return schemas.BulkStatusResult(updated_ids=updated_ids, rejected_ids=rejected_ids, not_found_ids=not_found_ids)
+
+@app.get("/admin/bookings/export", dependencies=[Depends(require_admin)])
+def export_bookings(
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    room_id: int | None = None,
+    status: schemas.BookingStatus | None = None,
+    is_semester: bool | None = None,
+    date_from: datetime | None = _bookings_query["date_from"],
+    date_to: datetime | None = _bookings_query["date_to"],
+):
+    # no db dependency: export.stream opens its own session inside the generator
+    filters = dict(room_id=room_id, status=status, is_semester=is_semester, date_from=date_from, date_to=date_to)
+    filename = f"bookings-{datetime.now(crud.TZ).strftime('%Y%m%d-%H%M')}.{format}"
+    return StreamingResponse(
+        export.stream(format, filters),
+        media_type=export.FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"', "Cache-Control": "no-store"},
+    )
+
 @app.delete("/admin/bookings/{booking_id}", dependencies=[Depends(require_admin)])
 def delete_booking(booking_id: int, db: Session = Depends(get_db)):
     ok = crud.delete_booking(db, booking_id)
@@ -173,6 +418,37 @@ def create_semester(sem_req: schemas.SemesterBookingCreate, db: Session = Depend
     created_ids, skipped = crud.create_semester_bookings(db, sem_req)
     return schemas.SemesterBookingResult(created_ids=created_ids, skipped_conflicts=skipped)
 
+MAX_IMPORT_BYTES = 2 * 1024 * 1024
+
+# CSV (header row) or JSON upload; ?dry_run=true reports without writing
+@app.post("/admin/timetable_import", response_model=schemas.TimetableImportResult, dependencies=[Depends(require_admin)])
+def import_timetable(file: UploadFile = File(...), dry_run: bool = False, db: Session = Depends(get_db)):
+    data = file.file.read(MAX_IMPORT_BYTES + 1)
+    if len(data) > MAX_IMPORT_BYTES:
+        raise HTTPException(status_code=413, detail="檔案過大")
+    try:
+        rows = timetable.parse_upload(data, file.filename)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    return timetable.import_timetable(db, rows, dry_run=dry_run)
+
+@app.get("/admin/analytics/occupancy", response_model=schemas.OccupancyReport, dependencies=[Depends(require_admin)])
+def occupancy_analytics(
+    date_from: date = Query(..., alias="from"),
+    date_to: date = Query(..., alias="to"),
+    room_id: int | None = None,
+    include_pending: bool = False,
+    db: Session = Depends(get_db),
+):
+    try:
+        return analytics.occupancy_report(db, date_from, date_to, room_id=room_id, include_pending=include_pending)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+
+@app.get("/admin/cache_stats", dependencies=[Depends(require_admin)])
+def cache_stats():
+    return {"version": changes.current(), "weekly": cache.weekly.stats(), "ics": cache.ics.stats()}
+
 @app.get("/admin/ping", dependencies=[Depends(require_admin)])
 def admin_ping():
     # auth_enabled True when ADMIN_USER & ADMIN_PASS both set
@@ -181,3 +457,8 @@ def admin_ping():
 @app.get("/healthz")
 def healthz():
     return {"status": "ok", "time": datetime.utcnow().isoformat()}
+
+if metrics.ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    def prometheus_metrics():
+        return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
@@ -0,0 +1,243 @@
+"""Request and domain metrics, exposed at /metrics in Prometheus text format.
+
+MetricsMiddleware is a plain ASGI middleware (no BaseHTTPMiddleware task and
+stream wrapping): per request it does two perf_counter calls, a contextvar set
+and a few dict updates under a lock. Latency is labelled with the matched route
+template (/rooms/{room_id}, not /rooms/7) so the series count stays bounded.
+Streaming routes (STREAM_PATHS, the SSE feed) stay open for minutes: they are
+counted in http_requests_total and http_open_streams but kept out of the
+in-flight gauge and the latency histogram.
+
+DB time is collected with cursor events on every engine (install_db_timing) and
+added to the current request's RequestStats through a contextvar; contextvars
+follow the request into the threadpool (sync endpoints) and into SQLAlchemy's
+greenlets (async endpoints).
+
+Domain counters (bookings created, conflicts, semester skips) are incremented
+by crud next to the corresponding log lines.
+"""
+import bisect
+import contextvars
+import os
+import threading
+import time
+
+from sqlalchemy import event
+
+ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+UNMATCHED_ROUTE = "<unmatched>"
+STREAM_PATHS = frozenset({"/bookings/stream"})
+
+_registry: list = []
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _num(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+        self._values: dict = {}
+        _registry.append(self)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        if not items and not self.labelnames:
+            items = [((), self._zero())]
+        for labelvalues, value in items:
+            lines.extend(self._samples(labelvalues, value))
+        return lines
+
+    def _zero(self):
+        return 0
+
+    def _samples(self, labelvalues, value) -> list[str]:
+        return [f"{self.name}{_labels(self.labelnames, labelvalues)} {_num(value)}"]
+
+    def value(self, *labelvalues):
+        """Current value for one label set (tests and /admin views)."""
+        with self._lock:
+            return self._values.get(labelvalues, self._zero())
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labelvalues, amount=1):
+        self.inc(*labelvalues, amount=-amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def _zero(self):
+        # per-bucket (non-cumulative) counts, the last slot is +Inf; then sum
+        return [[0] * (len(self.buckets) + 1), 0.0]
+
+    def observe(self, value: float, *labelvalues):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labelvalues)
+            if state is None:
+                state = self._values[labelvalues] = self._zero()
+            state[0][i] += 1
+            state[1] += value
+
+    def value(self, *labelvalues):
+        """(count, sum) for one label set."""
+        with self._lock:
+            counts, total = self._values.get(labelvalues, self._zero())
+            return sum(counts), total
+
+    def _samples(self, labelvalues, value) -> list[str]:
+        counts, total = value
+        lines = []
+        cumulative = 0
+        for bound, n in zip(self.buckets + (float("inf"),), counts):
+            cumulative += n
+            le = f'le="{_num(bound)}"'
+            lines.append(f"{self.name}_bucket{_labels(self.labelnames, labelvalues, le)} {cumulative}")
+        labels = _labels(self.labelnames, labelvalues)
+        lines.append(f"{self.name}_sum{labels} {_num(total)}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+def render() -> str:
+    return "\n".join(line for metric in _registry for line in metric.render()) + "\n"
+
+
+# -------------------- metric families --------------------
+http_requests = Counter("http_requests_total", "HTTP requests by route template and status.", ("method", "route", "status"))
+http_latency = Histogram("http_request_duration_seconds", "Request latency until the response is complete.", ("method", "route"))
+http_in_flight = Gauge("http_requests_in_flight", "Requests currently being handled (streams excluded).")
+http_open_streams = Gauge("http_open_streams", "Streaming responses (SSE) currently open.")
+http_db_time = Histogram("http_request_db_seconds", "Time spent in database cursor calls per request.", ("route",), DB_BUCKETS)
+http_db_statements = Counter("http_request_db_statements_total", "SQL statements executed on behalf of requests.", ("route",))
+
+bookings_created = Counter("bookings_created_total", "Bookings inserted, by kind.", ("kind",))
+booking_conflicts = Counter("booking_conflicts_total", "Booking requests rejected for overlapping an existing booking.")
+semester_skipped = Counter("semester_skipped_total", "Semester occurrences skipped, by reason.", ("reason",))
+
+
+# -------------------- per-request state --------------------
+class RequestStats:
+    __slots__ = ("db_seconds", "statements")
+
+    def __init__(self):
+        self.db_seconds = 0.0
+        self.statements = 0
+
+
+_current: contextvars.ContextVar[RequestStats | None] = contextvars.ContextVar("request_stats", default=None)
+
+
+def current() -> RequestStats | None:
+    return _current.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    started = getattr(context, "_metrics_started", None)
+    if stats is None or started is None:
+        return
+    stats.db_seconds += time.perf_counter() - started
+    stats.statements += 1
+
+
+def install_db_timing(engines):
+    for e in engines:
+        if not event.contains(e, "after_cursor_execute", _after_cursor_execute):
+            event.listen(e, "before_cursor_execute", _before_cursor_execute)
+            event.listen(e, "after_cursor_execute", _after_cursor_execute)
+
+
+def _route_label(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500  # if the app raises before starting a response
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        if scope["path"] in STREAM_PATHS:
+            http_open_streams.inc()
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                http_open_streams.dec()
+                http_requests.inc(scope["method"], _route_label(scope), str(status))
+            return
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        http_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            http_in_flight.dec()
+            _current.reset(token)
+            route = _route_label(scope)
+            method = scope["method"]
+            http_requests.inc(method, route, str(status))
+            http_latency.observe(elapsed, method, route)
+            if stats.statements:
+                http_db_time.observe(stats.db_seconds, route)
+                http_db_statements.inc(route, amount=stats.statements)
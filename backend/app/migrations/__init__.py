@@ -0,0 +1,85 @@
+"""Schema migrations (Alembic) and the startup version check.
+
+ensure_schema(engine) runs once at startup. When the database is already at
+the head revision it costs a single SELECT on alembic_version and nothing else.
+Otherwise it upgrades to head (MIGRATE_ON_STARTUP=false refuses to start
+instead). Databases created by the pre-migration create_all path have tables
+but no alembic_version: they get the old is_semester fix-up if needed and are
+stamped at the baseline before upgrading.
+
+From the command line (backend/alembic.ini):
+
+    cd backend
+    alembic upgrade head
+    alembic revision --autogenerate -m "..."
+"""
+import logging
+import os
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import DBAPIError
+
+logger = logging.getLogger("math_office.migrations")
+
+MIGRATE_ON_STARTUP = os.getenv("MIGRATE_ON_STARTUP", "true").lower() == "true"
+BASELINE = "0001"
+SCRIPT_LOCATION = str(Path(__file__).resolve().parent)
+
+
+def alembic_config(connection=None) -> Config:
+    cfg = Config()
+    cfg.set_main_option("script_location", SCRIPT_LOCATION)
+    cfg.attributes["connection"] = connection
+    return cfg
+
+
+def head_revision() -> str:
+    return ScriptDirectory.from_config(alembic_config()).get_current_head()
+
+
+def current_revision(engine) -> str | None:
+    """The stored revision, or None when alembic_version doesn't exist (one statement)."""
+    try:
+        with engine.connect() as conn:
+            return conn.execute(text("SELECT version_num FROM alembic_version")).scalar()
+    except DBAPIError:
+        return None
+
+
+def _adopt_legacy(conn):
+    """Bring a create_all-era database to the baseline and stamp it."""
+    columns = {c["name"] for c in inspect(conn).get_columns("bookings")}
+    if "is_semester" not in columns:
+        conn.execute(text("ALTER TABLE bookings ADD COLUMN is_semester BOOLEAN NOT NULL DEFAULT 0"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_bookings_is_semester ON bookings (is_semester)"))
+    command.stamp(alembic_config(conn), BASELINE)
+    logger.info("migrations_stamped_legacy revision=%s", BASELINE)
+
+
+def upgrade(engine):
+    with engine.begin() as conn:
+        if inspect(conn).has_table("bookings") and not inspect(conn).has_table("alembic_version"):
+            _adopt_legacy(conn)
+        command.upgrade(alembic_config(conn), "head")
+
+
+def ensure_schema(engine, *, migrate: bool | None = None) -> str:
+    """Make sure the database is at head; returns "current" or "upgraded"."""
+    head = head_revision()
+    current = current_revision(engine)
+    if current == head:
+        return "current"
+    if not (MIGRATE_ON_STARTUP if migrate is None else migrate):
+        raise RuntimeError(f"database schema is at {current!r}, expected {head!r}; run `alembic upgrade head`")
+    logger.info("migrations_upgrade from=%s to=%s", current, head)
+    try:
+        upgrade(engine)
+    except DBAPIError:
+        # another worker may have migrated concurrently; fine if it got to head
+        if current_revision(engine) != head:
+            raise
+    return "upgraded"
@@ -0,0 +1,56 @@
+"""baseline: rooms and bookings as created by the original create_all
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 00:00:00
+
+Databases created before migrations existed are stamped at this revision
+(see ensure_schema), so it must describe exactly that schema.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+CATEGORY = sa.Enum("activity", "meeting", "course", name="bookingcategory")
+STATUS = sa.Enum("pending", "approved", "rejected", name="bookingstatus")
+
+
+def upgrade():
+    op.create_table(
+        "rooms",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("description", sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_rooms_id", "rooms", ["id"])
+    op.create_index("ix_rooms_name", "rooms", ["name"], unique=True)
+
+    op.create_table(
+        "bookings",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("room_id", sa.Integer(), nullable=False),
+        sa.Column("user_name", sa.String(), nullable=False),
+        sa.Column("user_identity", sa.String(), nullable=False),
+        sa.Column("purpose", sa.String(), nullable=True),
+        sa.Column("category", CATEGORY, nullable=False),
+        sa.Column("start_time", sa.DateTime(), nullable=False),
+        sa.Column("end_time", sa.DateTime(), nullable=False),
+        sa.Column("status", STATUS, nullable=True),
+        sa.Column("is_semester", sa.Boolean(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("requested_at", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["room_id"], ["rooms.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    for column in ("id", "room_id", "category", "start_time", "end_time", "status", "is_semester"):
+        op.create_index(f"ix_bookings_{column}", "bookings", [column])
+
+
+def downgrade():
+    op.drop_table("bookings")
+    op.drop_table("rooms")
@@ -0,0 +1,40 @@
+"""composite indexes for the booking window, conflict and pagination queries
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 00:00:01
+
+Replaces the single-column start_time/end_time indexes, which SQLite could
+only use for one side of a range, with the composites declared on
+models.Booking. IF [NOT] EXISTS because databases built by create_all after
+the model change already have them.
+"""
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    # weekly window: end_time > :from AND start_time < :to
+    "ix_bookings_end_start": ["end_time", "start_time"],
+    # per-room windows: room detail, conflict checks, semester bulk load
+    "ix_bookings_room_end_start": ["room_id", "end_time", "start_time"],
+    # keyset pagination of GET /bookings by (start_time, id)
+    "ix_bookings_start_id": ["start_time", "id"],
+}
+
+
+def upgrade():
+    for name, columns in INDEXES.items():
+        op.create_index(name, "bookings", columns, if_not_exists=True)
+    op.drop_index("ix_bookings_start_time", table_name="bookings", if_exists=True)
+    op.drop_index("ix_bookings_end_time", table_name="bookings", if_exists=True)
+
+
+def downgrade():
+    op.create_index("ix_bookings_start_time", "bookings", ["start_time"], if_not_exists=True)
+    op.create_index("ix_bookings_end_time", "bookings", ["end_time"], if_not_exists=True)
+    for name in INDEXES:
+        op.drop_index(name, table_name="bookings", if_exists=True)
@@ -0,0 +1,46 @@
+"""default rooms and legacy room names (previously done on every startup)
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 00:00:02
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+rooms = sa.table("rooms", sa.column("id", sa.Integer), sa.column("name", sa.String), sa.column("description", sa.String))
+
+DEFAULT_ROOMS = ["志希 116", "志希 221（E 化教室）", "志希樓電腦教室", "大智 204", "研討一", "研討二"]
+LEGACY_NAMES = {
+    "116": "志希 116",
+    "221": "志希 221（E 化教室）",
+    "電腦教室": "志希樓電腦教室",
+    "204": "大智 204",
+}
+
+
+def upgrade():
+    # written as conditional statements (no reads in Python) so `alembic upgrade --sql` works too
+    names = sa.union_all(*(sa.select(sa.literal(name).label("name")) for name in DEFAULT_ROOMS)).subquery()
+    op.execute(
+        rooms.insert().from_select(
+            ["name"], sa.select(names.c.name).where(~sa.exists(sa.select(rooms.c.id)))
+        )
+    )
+    other = rooms.alias("other")
+    for old, new in LEGACY_NAMES.items():
+        op.execute(
+            rooms.update()
+            .where(rooms.c.name == old, ~sa.exists(sa.select(other.c.id).where(other.c.name == new)))
+            .values(name=new)
+        )
+    op.execute(rooms.update().where(rooms.c.name == "志希樓電腦教室", rooms.c.description.is_not(None)).values(description=None))
+
+
+def downgrade():
+    # data migration: renamed rooms keep their new names
+    pass
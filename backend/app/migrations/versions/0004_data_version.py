@@ -0,0 +1,31 @@
+"""data_version table for cross-worker cache invalidation
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 00:00:03
+
+Rows are created on first write (multiworker upserts them), so the table
+starts empty. Skipped when create_all already built it.
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not context.is_offline_mode() and sa.inspect(op.get_bind()).has_table("data_version"):
+        return
+    op.create_table(
+        "data_version",
+        sa.Column("scope", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("version", sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint("scope"),
+    )
+
+
+def downgrade():
+    op.drop_table("data_version")
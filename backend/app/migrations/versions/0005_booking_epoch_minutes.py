@@ -0,0 +1,119 @@
+"""epoch-minute columns for booking windows and overlap checks
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 00:00:04
+
+Adds bookings.start_min/end_min (UTC minutes since 1970, see
+models.epoch_minute), fills them from the stored Asia/Taipei wall times and
+moves the window indexes onto them. On SQLite the columns keep a DEFAULT 0
+(ADD COLUMN ... NOT NULL needs one); the app always supplies the values.
+Skips adding the columns when create_all already built them.
+SQLite and PostgreSQL backfill with one UPDATE; other databases get the
+values computed in Python, BACKFILL_BATCH rows at a time.
+"""
+from datetime import datetime, timedelta
+
+from alembic import context, op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+OLD_INDEXES = {
+    "ix_bookings_end_start": ["end_time", "start_time"],
+    "ix_bookings_room_end_start": ["room_id", "end_time", "start_time"],
+}
+NEW_INDEXES = {
+    "ix_bookings_end_start_min": ["end_min", "start_min"],
+    "ix_bookings_room_end_start_min": ["room_id", "end_min", "start_min"],
+}
+
+# stored values are naive Asia/Taipei wall time (UTC+8, no DST since 1979)
+MINUTES = {
+    "sqlite": "CAST(strftime('%s', {col}) AS INTEGER) / 60 - 480",
+    "postgresql": "CAST(FLOOR(EXTRACT(EPOCH FROM {col} AT TIME ZONE 'Asia/Taipei') / 60) AS INTEGER)",
+}
+UTC_OFFSET_MIN = 480
+EPOCH = datetime(1970, 1, 1)
+BACKFILL_BATCH = 1000
+
+bookings = sa.table(
+    "bookings",
+    sa.column("id", sa.Integer),
+    sa.column("start_time", sa.DateTime),
+    sa.column("end_time", sa.DateTime),
+    sa.column("start_min", sa.Integer),
+    sa.column("end_min", sa.Integer),
+)
+
+
+def _has_columns() -> bool:
+    if context.is_offline_mode():
+        return False
+    return "start_min" in {c["name"] for c in sa.inspect(op.get_bind()).get_columns("bookings")}
+
+
+def _minute(value: datetime) -> int:
+    return (value.replace(tzinfo=None) - EPOCH) // timedelta(minutes=1) - UTC_OFFSET_MIN
+
+
+def _backfill_in_python():
+    if op.get_context().as_sql:
+        raise RuntimeError(
+            f"offline SQL for the epoch-minute backfill supports {', '.join(MINUTES)}; "
+            f"run this migration online on {op.get_context().dialect.name}"
+        )
+    bind = op.get_bind()
+    row_update = (
+        bookings.update()
+        .where(bookings.c.id == sa.bindparam("row_id"))
+        .values(start_min=sa.bindparam("start"), end_min=sa.bindparam("end"))
+    )
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(bookings.c.id, bookings.c.start_time, bookings.c.end_time)
+            .where(bookings.c.id > last_id)
+            .order_by(bookings.c.id)
+            .limit(BACKFILL_BATCH)
+        ).all()
+        if not rows:
+            return
+        bind.execute(row_update, [
+            {"row_id": row.id, "start": _minute(row.start_time), "end": _minute(row.end_time)} for row in rows
+        ])
+        last_id = rows[-1].id
+
+
+def upgrade():
+    dialect = op.get_context().dialect.name
+    if not _has_columns():
+        for name in ("start_min", "end_min"):
+            op.add_column("bookings", sa.Column(name, sa.Integer(), nullable=False, server_default="0"))
+        if dialect in MINUTES:
+            op.execute(
+                f"UPDATE bookings SET start_min = {MINUTES[dialect].format(col='start_time')}, "
+                f"end_min = {MINUTES[dialect].format(col='end_time')}"
+            )
+        else:
+            _backfill_in_python()
+        if dialect != "sqlite":
+            for name in ("start_min", "end_min"):
+                op.alter_column("bookings", name, server_default=None)
+    for name, columns in NEW_INDEXES.items():
+        op.create_index(name, "bookings", columns, if_not_exists=True)
+    for name in OLD_INDEXES:
+        op.drop_index(name, table_name="bookings", if_exists=True)
+
+
+def downgrade():
+    for name, columns in OLD_INDEXES.items():
+        op.create_index(name, "bookings", columns, if_not_exists=True)
+    for name in NEW_INDEXES:
+        op.drop_index(name, table_name="bookings", if_exists=True)
+    with op.batch_alter_table("bookings") as batch:
+        batch.drop_column("end_min")
+        batch.drop_column("start_min")
@@ -0,0 +1,23 @@
+"""keyset index for listing bookings by submission time
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 00:00:05
+
+GET /bookings?order=-requested_at (the admin table's default order) pages by
+(requested_at, id) like the start_time order does with ix_bookings_start_id.
+"""
+from alembic import op
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index("ix_bookings_requested_id", "bookings", ["requested_at", "id"], if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index("ix_bookings_requested_id", table_name="bookings", if_exists=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Enum, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Enum, ForeignKey, Boolean, Index, event, inspect
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from zoneinfo import ZoneInfo
@@ -15,6 +15,19 @@ class BookingCategory(str, enum.Enum):
     meeting = "meeting"    # 05:00-17:00
     course = "course"      # 05:00-22:00 (same as activity)
 
+TZ = ZoneInfo("Asia/Taipei")
+
+def epoch_minute(dt: datetime, *, ceil: bool = False) -> int:
+    """Minutes since 1970-01-01 UTC; naive values are Asia/Taipei wall time, like stored rows."""
+    seconds = (dt.replace(tzinfo=TZ) if dt.tzinfo is None else dt).timestamp()
+    return -int(-seconds // 60) if ceil else int(seconds // 60)
+
+def _minute_default(column: str):
+    # context-sensitive default: also fills Core and ORM bulk inserts that only pass the datetimes
+    def default(context):
+        return epoch_minute(context.get_current_parameters()[column])
+    return default
+
 class Room(Base):
     __tablename__ = "rooms"
     id = Column(Integer, primary_key=True, index=True)
@@ -30,11 +43,44 @@ class Booking(Base):
     user_identity = Column(String, nullable=False)  # 學號/職稱等
     purpose = Column(String, nullable=True)
     category = Column(Enum(BookingCategory), nullable=False, default=BookingCategory.activity, index=True)
-    start_time = Column(DateTime, nullable=False, index=True)
-    end_time = Column(DateTime, nullable=False, index=True)
+    start_time = Column(DateTime, nullable=False)
+    end_time = Column(DateTime, nullable=False)
+    # the same instants as UTC epoch minutes; window and overlap queries compare these
+    start_min = Column(Integer, nullable=False, default=_minute_default("start_time"))
+    end_min = Column(Integer, nullable=False, default=_minute_default("end_time"))
     status = Column(Enum(BookingStatus), default=BookingStatus.pending, index=True)
     is_semester = Column(Boolean, default=False, nullable=False, index=True)
     created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(ZoneInfo("Asia/Taipei")), nullable=False)
     requested_at = Column(DateTime(timezone=True), default=lambda: datetime.now(ZoneInfo("Asia/Taipei")), nullable=False)  # 申請送出時間 (排序用)
 
     room = relationship("Room", back_populates="bookings")
+
+    __table_args__ = (
+        # serves the all-rooms window queries (end_min > :from AND start_min < :to)
+        Index("ix_bookings_end_start_min", "end_min", "start_min"),
+        # per-room window queries (room detail, conflict checks); end first because
+        # history grows without bound while bookings ending after :from stay few
+        Index("ix_bookings_room_end_start_min", "room_id", "end_min", "start_min"),
+        # keyset pagination order for GET /bookings: (start_time, id) desc
+        Index("ix_bookings_start_id", "start_time", "id"),
+        # same for the admin table's order=-requested_at
+        Index("ix_bookings_requested_id", "requested_at", "id"),
+    )
+
+@event.listens_for(Booking, "before_update")
+def _sync_epoch_minutes(mapper, connection, target):
+    attrs = inspect(target).attrs
+    if attrs.start_time.history.has_changes():
+        target.start_min = epoch_minute(target.start_time)
+    if attrs.end_time.history.has_changes():
+        target.end_min = epoch_minute(target.end_time)
+
+class DataVersion(Base):
+    """Shared write counter for multi-worker deployments (see multiworker.py).
+
+    scope 0 is the global version; scope -1 holds the version of the last write
+    that may have touched everything, scope N that of the last write to room N.
+    """
+    __tablename__ = "data_version"
+    scope = Column(Integer, primary_key=True, autoincrement=False)
+    version = Column(BigInteger, nullable=False)
@@ -0,0 +1,180 @@
+"""Cross-worker invalidation for multi-process deployments (MULTI_WORKER=true).
+
+The caches (cache.py), the ETag version (changes.py) and the conflict index
+live in each worker process, so a write served by one worker used to leave the
+others answering from stale views until they restarted. With MULTI_WORKER=true
+the data_version table is the shared clock:
+
+- every transaction that writes bookings or rooms bumps it in the same
+  transaction (Session after_flush / do_orm_execute hooks below): scope 0 is
+  incremented and the touched rooms' rows (or scope -1 for "anything") are set
+  to the new value, so the bump commits or rolls back with the data;
+- SyncMiddleware runs `SELECT scope, version FROM data_version WHERE version > ?`
+  in the threadpool at the start of every API request (not /metrics, /healthz,
+  the SSE stream or the docs). With no new writes that reads a table of
+  one row per room and returns nothing; otherwise the changed rooms go to
+  changes.apply_remote, which drops the caches and marks the rooms stale in
+  the conflict index;
+- crud._begin_write syncs again once it holds the write lock, so a conflict
+  check never trusts an index entry older than another worker's commit.
+
+No service beyond the database is needed. The SSE feed (feed.py) stays per
+worker: a subscriber only gets events for writes served by its own worker.
+"""
+import logging
+import os
+import time
+from itertools import chain
+
+from sqlalchemy import event, inspect, text
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from . import changes, conflict_index, models
+
+logger = logging.getLogger("math_office.multiworker")
+
+ENABLED = os.getenv("MULTI_WORKER", "false").lower() == "true"
+GLOBAL = 0
+ALL_ROOMS = -1
+_INFO_KEY = "data_version"
+
+_BUMP_GLOBAL = text(
+    "INSERT INTO data_version (scope, version) VALUES (0, :seed) "
+    "ON CONFLICT (scope) DO UPDATE SET version = data_version.version + 1 RETURNING version"
+)
+_SET_SCOPE = text(
+    "INSERT INTO data_version (scope, version) VALUES (:scope, :version) "
+    "ON CONFLICT (scope) DO UPDATE SET version = excluded.version"
+)
+_CHANGED = text("SELECT scope, version FROM data_version WHERE version > :seen")
+_SEED_GLOBAL = text("INSERT INTO data_version (scope, version) VALUES (0, :seed) ON CONFLICT (scope) DO NOTHING")
+_CURRENT = text("SELECT version FROM data_version WHERE scope = 0")
+
+# served without catching up: they read no booking data, or hold a connection open for minutes
+SKIP_PATHS = frozenset({"/metrics", "/healthz", "/bookings/stream", "/docs", "/redoc", "/openapi.json"})
+
+_installed = False
+
+
+def active() -> bool:
+    return _installed
+
+
+def _seed() -> int:
+    # first value of a fresh table: milliseconds, so a recreated database never reuses old ETags
+    return int(time.time() * 1000)
+
+
+def record(conn, rooms, info: dict):
+    """Bump the shared version for `rooms` (None = anything) inside conn's transaction."""
+    version = conn.execute(_BUMP_GLOBAL, {"seed": _seed()}).scalar_one()
+    for room_id in rooms:
+        conn.execute(_SET_SCOPE, {"scope": ALL_ROOMS if room_id is None else room_id, "version": version})
+    pending = info.setdefault(_INFO_KEY, {"version": 0, "increments": 0, "rooms": set()})
+    pending["version"] = version
+    pending["increments"] += 1
+    pending["rooms"].update(rooms)
+
+
+def _flushed_rooms(session: Session) -> set:
+    rooms = set()
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, models.Booking):
+            rooms.add(obj.room_id)
+            rooms.update(inspect(obj).attrs.room_id.history.deleted or ())  # moved from another room
+        elif isinstance(obj, models.Room):
+            rooms.add(None)  # names and the room list appear in every view
+    return rooms
+
+
+def _after_flush(session, flush_context):
+    rooms = _flushed_rooms(session)
+    if rooms:
+        record(session.connection(), rooms, session.info)
+
+
+def _do_orm_execute(state):
+    # bulk UPDATE/DELETE/INSERT statements (status changes, seeding) bypass the flush
+    if not (state.is_update or state.is_delete or state.is_insert):
+        return
+    mapper = state.bind_mapper
+    if mapper is not None and mapper.class_ in (models.Booking, models.Room):
+        record(state.session.connection(), {None}, state.session.info)
+
+
+def _after_commit(session):
+    pending = session.info.pop(_INFO_KEY, None)
+    if pending:
+        changes.committed(pending["version"], pending["increments"], pending["rooms"])
+
+
+def _after_rollback(session):
+    session.info.pop(_INFO_KEY, None)
+
+
+_SESSION_EVENTS = (
+    ("after_flush", _after_flush),
+    ("do_orm_execute", _do_orm_execute),
+    ("after_commit", _after_commit),
+    ("after_rollback", _after_rollback),
+)
+
+
+def sync(conn) -> bool:
+    """Apply other workers' writes newer than changes.current(); True if there were any."""
+    rows = conn.execute(_CHANGED, {"seen": changes.current()}).all()
+    if not rows:
+        return False
+    version = max(v for _, v in rows)
+    rooms = {None if scope == ALL_ROOMS else scope for scope, _ in rows if scope != GLOBAL}
+    if not changes.apply_remote(version, rooms):
+        return False
+    logger.debug("data_version_sync version=%s rooms=%s", version, tuple(sorted(rooms, key=str)))
+    return True
+
+
+def sync_engine(engine) -> bool:
+    with engine.connect() as conn:
+        return sync(conn)
+
+
+def install(engine):
+    """Start sharing versions through data_version (startup, after migrations)."""
+    global _installed
+    if _installed:
+        return
+    with engine.begin() as conn:
+        conn.execute(_SEED_GLOBAL, {"seed": _seed()})
+        version = conn.execute(_CURRENT).scalar_one()
+    for name, fn in _SESSION_EVENTS:
+        event.listen(Session, name, fn)
+    changes.use_shared(version)
+    changes.subscribe_remote(conflict_index.index.invalidate)
+    _installed = True
+    logger.info("multiworker_enabled version=%s", version)
+
+
+def uninstall():
+    global _installed
+    if not _installed:
+        return
+    for name, fn in _SESSION_EVENTS:
+        event.remove(Session, name, fn)
+    changes.unsubscribe_remote(conflict_index.index.invalidate)
+    changes.use_local()
+    _installed = False
+
+
+class SyncMiddleware:
+    """Pure ASGI: catch up with other workers' writes before handling a request."""
+
+    def __init__(self, app, engine):
+        self.app = app
+        self.engine = engine
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and _installed and scope["path"] not in SKIP_PATHS:
+            # blocking driver: keep the SELECT (and a busy-timeout wait) off the event loop
+            await run_in_threadpool(sync_engine, self.engine)
+        await self.app(scope, receive, send)
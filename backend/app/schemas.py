@@ -1,8 +1,11 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_serializer
 from datetime import datetime, date
+from zoneinfo import ZoneInfo
 from enum import Enum
 from typing import Optional, List
 
+TZ = ZoneInfo("Asia/Taipei")
+
 class BookingStatus(str, Enum):
     pending = "pending"
     approved = "approved"
@@ -52,12 +55,58 @@ class BookingWithRoom(Booking):
 class BookingUpdateStatus(BaseModel):
     status: BookingStatus
 
+class BulkStatusUpdate(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=1000)
+    status: BookingStatus
+    reject_overlapping: bool = Field(False, description="核可時一併退回同教室時段重疊的待審申請")
+
+class BulkStatusResult(BaseModel):
+    updated_ids: List[int]
+    rejected_ids: List[int] = []  # bookings auto-rejected because they overlap an approved one (batch or pending)
+    not_found_ids: List[int] = []
+
 class RoomWithBookings(Room):
     bookings: List[Booking] = []
 
 # Weekly view schema
+class WeeklyBooking(Booking):
+    @field_serializer("start_time", "end_time")
+    def _with_offset(self, value: datetime) -> datetime:
+        # stored as naive Asia/Taipei wall time; the board sends it with its +08:00 offset
+        return value.replace(tzinfo=TZ) if value.tzinfo is None else value
+
 class WeeklyRoom(Room):
-    bookings: List[Booking] = []  # bookings limited to next 7 days
+    bookings: List[WeeklyBooking] = []  # bookings limited to next 7 days
+
+# Availability search
+class FreeSlot(BaseModel):
+    start_time: datetime
+    end_time: datetime
+
+class RoomAvailability(Room):
+    free_slots: List[FreeSlot] = []
+
+# Occupancy analytics (admin)
+class RoomOccupancy(BaseModel):
+    room_id: int
+    name: str
+    booked_hours: float
+    utilization: float  # share of all half-hour slots in the range that were booked
+    hours_by_category: dict[str, float]
+    counts: dict[str, int]  # bookings per status
+    approval_rate: Optional[float] = None  # approved / (approved + rejected)
+    heatmap: List[List[float]]  # [weekday 0=Mon][slot 0=00:00] share of those days the slot was booked
+
+class OccupancyReport(BaseModel):
+    date_from: date
+    date_to: date
+    days: int
+    slot_minutes: int
+    include_pending: bool
+    hours_by_category: dict[str, float]
+    counts: dict[str, int]
+    approval_rate: Optional[float] = None
+    rooms: List[RoomOccupancy]
 
 # Semester recurring booking schema
 class SemesterBookingCreate(BaseModel):
@@ -74,3 +123,38 @@ class SemesterBookingCreate(BaseModel):
 class SemesterBookingResult(BaseModel):
     created_ids: List[int]
     skipped_conflicts: List[str]  # ISO start datetimes that were skipped due to conflicts
+
+# Timetable import (admin): one entry per course / one-off booking
+class TimetableEntry(BaseModel):
+    room_id: Optional[int] = None
+    room: Optional[str] = None  # room name, used when room_id is absent
+    category: BookingCategory = BookingCategory.course
+    user_name: str
+    user_identity: str
+    purpose: Optional[str] = None
+    start_date: date
+    end_date: Optional[date] = None  # absent or equal to start_date -> one-off
+    start_time_hm: str = Field(..., pattern=r"^\d{2}:\d{2}$")
+    end_time_hm: str = Field(..., pattern=r"^\d{2}:\d{2}$")
+
+class TimetableConflict(BaseModel):
+    start_time: datetime
+    booking_id: Optional[int] = None  # existing booking it collides with
+    row: Optional[int] = None         # or an earlier row of the same file
+
+class TimetableRowReport(BaseModel):
+    row: int
+    status: str  # accepted | partial | conflict | invalid
+    room_id: Optional[int] = None
+    occurrences: int = 0
+    accepted: List[datetime] = []
+    created_ids: List[int] = []  # empty on dry run
+    conflicts: List[TimetableConflict] = []
+    errors: List[str] = []
+
+class TimetableImportResult(BaseModel):
+    dry_run: bool
+    rows: List[TimetableRowReport]
+    accepted: int
+    skipped: int
+    invalid_rows: int
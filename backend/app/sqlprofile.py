@@ -0,0 +1,158 @@
+"""Opt-in SQL statement profiling with N+1 detection (SQL_PROFILE=true).
+
+Every cursor execute is recorded against the current request's QueryProfile
+(a contextvar set by SQLProfileMiddleware, like metrics.RequestStats): count,
+time and a per-shape counter. A shape is the statement text with IN lists and
+numeric literals collapsed, so `WHERE bookings.room_id = ?` run once per room
+shows up as one shape with a high count - the signature of a lazy load in a
+loop. Shapes seen SQL_PROFILE_REPEAT_THRESHOLD times or more are reported as
+probable N+1s.
+
+Per request the summary goes into an X-SQL-Profile response header and a log
+line on math_office.sql (WARNING when a repeat is found, DEBUG otherwise).
+
+capture() records statements from every thread regardless of request context;
+tests use it through the assert_max_queries fixture in conftest.py.
+"""
+import contextlib
+import contextvars
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+
+from sqlalchemy import event
+
+logger = logging.getLogger("math_office.sql")
+
+ENABLED = os.getenv("SQL_PROFILE", "false").lower() == "true"
+REPEAT_THRESHOLD = int(os.getenv("SQL_PROFILE_REPEAT_THRESHOLD", "5"))
+HEADER = "X-SQL-Profile"
+
+_IN_LIST = re.compile(r"\(\s*(?:\?|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%\(\w+\)s|:\w+))+\s*\)")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_SPACE = re.compile(r"\s+")
+
+
+def shape(statement: str) -> str:
+    """Statement text with parameter lists, numbers and whitespace normalized."""
+    s = _IN_LIST.sub("(?...)", statement)
+    s = _NUMBER.sub("N", s)
+    return _SPACE.sub(" ", s).strip()
+
+
+class QueryProfile:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.statements: list[str] = []
+        self.seconds = 0.0
+        self.shapes: Counter = Counter()
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def record(self, statement: str, seconds: float):
+        with self._lock:
+            self.statements.append(statement)
+            self.seconds += seconds
+            self.shapes[shape(statement)] += 1
+
+    def repeated(self, threshold: int = REPEAT_THRESHOLD) -> list[tuple[str, int]]:
+        """Shapes executed at least `threshold` times, most frequent first."""
+        return [(s, n) for s, n in self.shapes.most_common() if n >= threshold]
+
+    def header(self) -> str:
+        return f"count={self.count} time_ms={self.seconds * 1000:.2f} repeated={len(self.repeated())}"
+
+    def report(self, threshold: int = REPEAT_THRESHOLD) -> str:
+        lines = [f"{self.count} statements, {self.seconds * 1000:.2f} ms"]
+        for s, n in self.repeated(threshold):
+            lines.append(f"  probable N+1 ({n}x): {s}")
+        lines.extend(f"  {i + 1}. {_SPACE.sub(' ', s).strip()}" for i, s in enumerate(self.statements))
+        return "\n".join(lines)
+
+
+_current: contextvars.ContextVar[QueryProfile | None] = contextvars.ContextVar("query_profile", default=None)
+_captures: list[QueryProfile] = []
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._sqlprofile_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current.get()
+    if profile is None and not _captures:
+        return
+    started = getattr(context, "_sqlprofile_started", None)
+    elapsed = time.perf_counter() - started if started is not None else 0.0
+    if profile is not None:
+        profile.record(statement, elapsed)
+    for captured in list(_captures):
+        captured.record(statement, elapsed)
+
+
+def install(engines):
+    for e in engines:
+        if not event.contains(e, "after_cursor_execute", _after_cursor_execute):
+            event.listen(e, "before_cursor_execute", _before_cursor_execute)
+            event.listen(e, "after_cursor_execute", _after_cursor_execute)
+
+
+@contextlib.contextmanager
+def capture(engines=None):
+    """Collect every statement executed inside the block, from any thread."""
+    if engines is None:
+        from .database import all_engines
+        engines = all_engines()
+    install(engines)
+    profile = QueryProfile()
+    _captures.append(profile)
+    try:
+        yield profile
+    finally:
+        _captures.remove(profile)
+
+
+class SQLProfileMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        profile = QueryProfile()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                # queries of a streaming body run after this point and only reach the log line
+                message["headers"] = list(message.get("headers", [])) + [(HEADER.lower().encode(), profile.header().encode())]
+            await send(message)
+
+        token = _current.set(profile)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            _log(scope, profile)
+
+
+def _log(scope, profile: QueryProfile):
+    repeated = profile.repeated()
+    route = getattr(scope.get("route"), "path", scope.get("path"))
+    if repeated:
+        top, n = repeated[0]
+        logger.warning(
+            "sql_n_plus_one method=%s route=%s statements=%d time_ms=%.2f repeated=%d top_count=%d top=%s",
+            scope["method"], route, profile.count, profile.seconds * 1000, len(repeated), n, top[:300],
+        )
+    elif logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "sql_profile method=%s route=%s statements=%d time_ms=%.2f",
+            scope["method"], route, profile.count, profile.seconds * 1000,
+        )
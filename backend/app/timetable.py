@@ -0,0 +1,162 @@
+"""Admin timetable import: many recurring or one-off entries across rooms.
+
+Every row is validated and expanded to weekly occurrences first (same rules
+as /admin/semester_bookings). Conflicts are then resolved in one in-memory
+pass: a single query loads the non-rejected bookings of every referenced room
+over the whole span into per-room RoomIntervals, and accepted occurrences are
+added as they go so later rows see earlier ones. Accepted rows are inserted in
+one transaction unless dry_run is set.
+"""
+import csv
+import io
+import json
+import logging
+
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from . import conflict_index, crud, models, schemas
+
+logger = logging.getLogger("math_office.timetable")
+
+MAX_IMPORT_ROWS = 2000
+
+
+def parse_upload(data: bytes, filename: str | None = None) -> list[dict]:
+    """Decode a CSV (header row) or JSON (list or {"entries": [...]}) upload; raises ValueError."""
+    try:
+        text = data.decode("utf-8-sig")  # Excel writes a BOM
+    except UnicodeDecodeError:
+        raise ValueError("檔案需為 UTF-8 編碼")
+    name = (filename or "").lower()
+    stripped = text.lstrip()
+    if name.endswith(".json") or (not name.endswith(".csv") and stripped[:1] in ("[", "{")):
+        try:
+            doc = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"JSON 格式錯誤：{e.msg}（第 {e.lineno} 行）")
+        rows = doc.get("entries") if isinstance(doc, dict) else doc
+        if not isinstance(rows, list) or not all(isinstance(r, dict) for r in rows):
+            raise ValueError("JSON 需為物件陣列")
+    else:
+        reader = csv.DictReader(io.StringIO(text))
+        # blank cells mean "not given" so schema defaults apply
+        rows = [{k.strip(): v.strip() for k, v in r.items() if k and v and v.strip()} for r in reader]
+    if not rows:
+        raise ValueError("檔案沒有資料列")
+    if len(rows) > MAX_IMPORT_ROWS:
+        raise ValueError(f"一次最多匯入 {MAX_IMPORT_ROWS} 列")
+    return rows
+
+
+def import_timetable(db: Session, rows: list[dict], *, dry_run: bool = False) -> schemas.TimetableImportResult:
+    rooms = dict(db.execute(select(models.Room.name, models.Room.id)).all())
+    room_ids = set(rooms.values())
+    reports: list[schemas.TimetableRowReport] = []
+    planned = []  # (report, [(booking_in, start, end, category)], is_semester)
+
+    for number, raw in enumerate(rows, start=1):
+        report = schemas.TimetableRowReport(row=number, status="invalid")
+        reports.append(report)
+        try:
+            entry = schemas.TimetableEntry.model_validate(raw)
+        except ValidationError as e:
+            report.errors = [f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()]
+            continue
+        room_id = entry.room_id if entry.room_id is not None else rooms.get((entry.room or "").strip())
+        if room_id is None or room_id not in room_ids:
+            report.errors = [f"找不到教室：{entry.room_id if entry.room_id is not None else entry.room}"]
+            continue
+        end_date = entry.end_date or entry.start_date
+        if end_date < entry.start_date:
+            report.errors = ["結束日期不可早於開始日期"]
+            continue
+        report.room_id = room_id
+        payload = schemas.SemesterBookingCreate(
+            room_id=room_id,
+            category=entry.category,
+            user_name=entry.user_name,
+            user_identity=entry.user_identity,
+            purpose=entry.purpose,
+            start_time_hm=entry.start_time_hm,
+            end_time_hm=entry.end_time_hm,
+            start_date=entry.start_date,
+            end_date=end_date,
+        )
+        occurrences = []
+        try:
+            for _, start_dt, end_dt in crud._semester_occurrences(payload):
+                booking_in = crud._semester_booking_in(payload, start_dt, end_dt)
+                occurrences.append((booking_in, *crud._prepare_booking(booking_in)))
+        except ValueError as ve:
+            # every occurrence shares the row's times, so one failure invalidates the row
+            report.errors = [str(ve)]
+            continue
+        report.occurrences = len(occurrences)
+        planned.append((report, occurrences, end_date > entry.start_date))
+
+    new = []
+    if planned:
+        if not dry_run:
+            # occupied rows are read under the write lock so they are still true at insert time
+            crud._begin_write(db, {report.room_id for report, _, _ in planned})
+        occupied = _load_occupied(db, planned)
+        owner: dict[int, int] = {}  # negative interval id -> file row
+        for report, occurrences, is_semester in planned:
+            for booking_in, start, end, category in occurrences:
+                key_start, key_end = start.replace(tzinfo=None), end.replace(tzinfo=None)
+                room = occupied.setdefault(report.room_id, conflict_index.RoomIntervals())
+                hits = room.overlapping(key_start, key_end)
+                if hits:
+                    report.conflicts.extend(
+                        schemas.TimetableConflict(start_time=start, row=owner[h]) if h < 0
+                        else schemas.TimetableConflict(start_time=start, booking_id=h)
+                        for h in sorted(hits)
+                    )
+                    continue
+                interval_id = -(len(owner) + 1)
+                owner[interval_id] = report.row
+                room.add(interval_id, key_start, key_end)
+                report.accepted.append(start)
+                new.append((report, crud._new_booking(booking_in, start, end, category, is_semester=is_semester), start, end))
+            if not report.conflicts:
+                report.status = "accepted"
+            else:
+                report.status = "partial" if report.accepted else "conflict"
+
+    if planned and not dry_run:
+        created_ids = crud._insert_bookings(db, [(b, start, end) for _, b, start, end in new])
+        for (report, _, _, _), bid in zip(new, created_ids):
+            report.created_ids.append(bid)
+
+    accepted = sum(len(r.accepted) for r in reports)
+    skipped = sum(len(r.conflicts) for r in reports)
+    invalid = sum(1 for r in reports if r.status == "invalid")
+    logger.info(
+        "timetable_import rows=%d accepted=%d skipped_conflicts=%d invalid_rows=%d dry_run=%s",
+        len(reports), accepted, skipped, invalid, dry_run,
+    )
+    return schemas.TimetableImportResult(
+        dry_run=dry_run, rows=reports, accepted=accepted, skipped=skipped, invalid_rows=invalid,
+    )
+
+
+def _load_occupied(db: Session, planned) -> dict[int, conflict_index.RoomIntervals]:
+    """One query for every booking that could collide with any planned occurrence."""
+    room_ids = {report.room_id for report, _, _ in planned}
+    starts = [o[1] for _, occ, _ in planned for o in occ]
+    ends = [o[2] for _, occ, _ in planned for o in occ]
+    occupied: dict[int, conflict_index.RoomIntervals] = {}
+    if not starts:
+        return occupied
+    rows = db.execute(
+        select(models.Booking.id, models.Booking.room_id, models.Booking.start_time, models.Booking.end_time).where(
+            models.Booking.room_id.in_(room_ids),
+            models.Booking.status != models.BookingStatus.rejected,
+            crud._overlapping(min(starts), max(ends)),
+        )
+    ).all()
+    for bid, room_id, st, et in rows:
+        occupied.setdefault(room_id, conflict_index.RoomIntervals()).add(bid, st, et)
+    return occupied
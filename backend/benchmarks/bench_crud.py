@@ -0,0 +1,240 @@
+"""Microbenchmarks for the crud hot paths against a scratch SQLite database.
+
+Seeds N rooms x M bookings over a configurable span, then times
+create_booking, get_rooms_weekly, list_bookings (full filter and keyset page),
+create_semester_bookings and the admin occupancy report over the whole span
+directly (no HTTP); --span-days 1095 gives the multi-year report. Each call gets a fresh
+session; statements are counted with a cursor event.
+
+    cd backend
+    python -m benchmarks.bench_crud --rooms 20 --bookings 50000 --out bench.json
+    python -m benchmarks.bench_crud --rooms 20 --bookings 50000 --baseline bench.json
+
+With --baseline the run is compared per benchmark (p50/p95 and queries per
+call); --fail-over 0.2 exits 1 if any p95 regressed by more than 20%.
+"""
+import argparse
+import gc
+import json
+import math
+import os
+import platform
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+BENCHMARKS = (
+    "create_booking", "get_rooms_weekly", "list_bookings", "list_bookings_page", "create_semester_bookings",
+    "occupancy_report",
+)
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, min(len(sorted_values), math.ceil(pct / 100 * len(sorted_values))))
+    return sorted_values[rank - 1]
+
+
+def summarize(times_ms: list[float], queries: list[int]) -> dict:
+    ordered = sorted(times_ms)
+    return {
+        "n": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered), 3),
+        "p50_ms": round(percentile(ordered, 50), 3),
+        "p90_ms": round(percentile(ordered, 90), 3),
+        "p95_ms": round(percentile(ordered, 95), 3),
+        "p99_ms": round(percentile(ordered, 99), 3),
+        "max_ms": round(ordered[-1], 3),
+        "queries_per_call": round(statistics.fmean(queries), 2),
+    }
+
+
+class QueryCounter:
+    def __init__(self, engines):
+        from sqlalchemy import event
+        self.count = 0
+        for e in engines:
+            event.listen(e, "before_cursor_execute", self._before)
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+
+def _cases(dataset: dict):
+    """(name, setup(i) -> args, call(db, args)) for every benchmark."""
+    from app import analytics, crud, models, schemas
+
+    room_ids = dataset["room_ids"]
+    report_from = date.fromisoformat(dataset["first_day"])
+    report_to = report_from + timedelta(days=min(dataset["span_days"], analytics.MAX_REPORT_DAYS) - 1)
+    beyond = datetime.now(crud.TZ).replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=dataset["span_days"] + 7)
+
+    def booking_args(i):
+        # each iteration books a distinct free slot after the seeded span
+        day, slot = divmod(i, 32)
+        start = beyond + timedelta(days=day, hours=6, minutes=30 * slot)
+        return schemas.BookingCreate(
+            room_id=room_ids[i % len(room_ids)], user_name="bench", user_identity="bench", purpose="bench",
+            category=schemas.BookingCategory.activity, start_time=start, end_time=start + timedelta(minutes=30),
+        )
+
+    def semester_args(i):
+        # 18 weekly occurrences in a slot no other iteration uses
+        day, slot = divmod(i, 32)
+        start = beyond + timedelta(days=400 + 7 * 20 * (day // 7) + day % 7)
+        hm = datetime(2000, 1, 1, 6) + timedelta(minutes=30 * slot)
+        return schemas.SemesterBookingCreate(
+            room_id=room_ids[i % len(room_ids)], category=schemas.BookingCategory.course,
+            user_name="bench", user_identity="bench", purpose="bench",
+            start_time_hm=hm.strftime("%H:%M"), end_time_hm=(hm + timedelta(minutes=30)).strftime("%H:%M"),
+            start_date=start.date(), end_date=(start + timedelta(weeks=17)).date(),
+        )
+
+    return {
+        "create_booking": (booking_args, lambda db, a: crud.create_booking(db, a)),
+        "get_rooms_weekly": (lambda i: None, lambda db, a: crud.get_rooms_weekly(db)),
+        "list_bookings": (
+            lambda i: room_ids[i % len(room_ids)],
+            lambda db, room_id: crud.list_bookings(db, room_id=room_id, status=models.BookingStatus.pending),
+        ),
+        "list_bookings_page": (lambda i: None, lambda db, a: crud.list_bookings_page(db, limit=crud.DEFAULT_PAGE_SIZE)),
+        "create_semester_bookings": (semester_args, lambda db, a: crud.create_semester_bookings(db, a)),
+        "occupancy_report": (lambda i: None, lambda db, a: analytics.occupancy_report(db, report_from, report_to)),
+    }
+
+
+def run(args) -> dict:
+    from app import database
+    from . import seed
+
+    started = time.perf_counter()
+    dataset = seed.seed(args.rooms, args.bookings, args.span_days, seed=args.seed)
+    seed_seconds = time.perf_counter() - started
+    counter = QueryCounter(database.all_engines())
+    cases = _cases(dataset)
+    results = {}
+    for name in args.only or BENCHMARKS:
+        setup, call = cases[name]
+        times, queries = [], []
+        for i in range(args.warmup + args.iterations):
+            call_args = setup(i)
+            with database.SessionLocal() as db:
+                counter.count = 0
+                gc.disable()  # like timeit: keep collector pauses out of the samples
+                try:
+                    t0 = time.perf_counter()
+                    call(db, call_args)
+                    elapsed = (time.perf_counter() - t0) * 1000
+                finally:
+                    gc.enable()
+            if i >= args.warmup:
+                times.append(elapsed)
+                queries.append(counter.count)
+        results[name] = summarize(times, queries)
+        print(_format_row(name, results[name]), file=sys.stderr)
+
+    import sqlalchemy
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlalchemy": sqlalchemy.__version__,
+            "sqlite": sqlite3.sqlite_version,
+            "conflict_index": os.getenv("CONFLICT_INDEX", "off"),
+            "rooms": dataset["rooms"],
+            "bookings": dataset["bookings"],
+            "bookings_requested": args.bookings,
+            "span_days": dataset["span_days"],
+            "iterations": args.iterations,
+            "warmup": args.warmup,
+            "seed": args.seed,
+            "seed_seconds": round(seed_seconds, 2),
+        },
+        "results": results,
+    }
+
+
+def _format_row(name: str, r: dict) -> str:
+    return (
+        f"{name:<26} p50 {r['p50_ms']:>9.3f} ms  p95 {r['p95_ms']:>9.3f} ms  "
+        f"p99 {r['p99_ms']:>9.3f} ms  queries {r['queries_per_call']:>6.2f}"
+    )
+
+
+def compare(current: dict, baseline: dict, fail_over: float | None = None) -> list[str]:
+    """Print a comparison table; returns the names whose p95 regressed beyond fail_over."""
+    regressions = []
+    print(f"{'benchmark':<26} {'p50 base':>10} {'p50 now':>10} {'Δ':>7}  {'p95 base':>10} {'p95 now':>10} {'Δ':>7}  queries")
+    for name, now in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            print(f"{name:<26} (not in baseline)")
+            continue
+        d50 = now["p50_ms"] / base["p50_ms"] - 1 if base["p50_ms"] else 0.0
+        d95 = now["p95_ms"] / base["p95_ms"] - 1 if base["p95_ms"] else 0.0
+        flag = ""
+        if fail_over is not None and d95 > fail_over:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(
+            f"{name:<26} {base['p50_ms']:>10.3f} {now['p50_ms']:>10.3f} {d50:>+7.0%}  "
+            f"{base['p95_ms']:>10.3f} {now['p95_ms']:>10.3f} {d95:>+7.0%}  "
+            f"{base['queries_per_call']:g} -> {now['queries_per_call']:g}{flag}"
+        )
+    keys = ("rooms", "bookings", "span_days")
+    if any(current["meta"].get(k) != baseline.get("meta", {}).get(k) for k in keys):
+        print("note: dataset parameters differ from the baseline")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rooms", type=int, default=10)
+    parser.add_argument("--bookings", type=int, default=10_000)
+    parser.add_argument("--span-days", type=int, default=365)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS)
+    parser.add_argument("--db", help="SQLite file to use (default: a temporary file, removed afterwards)")
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--baseline", help="compare against an earlier results JSON")
+    parser.add_argument("--fail-over", type=float, help="exit 1 if any p95 regressed by more than this fraction")
+    args = parser.parse_args(argv)
+
+    tmpdir = None
+    path = args.db
+    if path is None:
+        tmpdir = tempfile.TemporaryDirectory(prefix="bench-")
+        path = os.path.join(tmpdir.name, "bench.db")
+    # must happen before anything imports app.database
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    try:
+        result = run(args)
+    finally:
+        if tmpdir is not None:
+            from app.database import engine
+            engine.dispose()
+            tmpdir.cleanup()
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    else:
+        json.dump(result, sys.stdout, indent=2)
+        print()
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(result, baseline, args.fail_over):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
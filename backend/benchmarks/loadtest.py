@@ -0,0 +1,281 @@
+"""HTTP load test of the whole app: uvicorn + app.main:app + a scratch SQLite file.
+
+For every dataset size the database is reseeded (benchmarks/seed.py) and a
+fresh uvicorn process is started, so in-process caches and the conflict index
+start cold. Each scenario then runs at every concurrency level for a fixed
+duration with that many closed-loop virtual users (async httpx client):
+
+  weekly     RoomsPage: poll /rooms/weekly revalidating with If-None-Match
+  room       RoomDetailPage: GET /rooms/{id} for random rooms
+  burst      many users POST /bookings for the same free slot at once;
+             exactly one may win, the rest must get 409
+  admin      AdminPage: GET /bookings?status=pending&limit=50, approve one
+
+    cd backend
+    python -m benchmarks.loadtest --datasets 10x2000 20x50000 --concurrency 1 8 32 --duration 10
+    python -m benchmarks.loadtest --scenarios weekly burst --out load.json
+
+Extra server settings (DB_ASYNC, CONFLICT_INDEX, ...) are taken from the
+environment; --workers starts uvicorn with several worker processes.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import httpx
+
+from .bench_crud import percentile
+
+BACKEND = Path(__file__).resolve().parent.parent
+SCENARIOS = ("weekly", "room", "burst", "admin")
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: list[float] = []
+        self.statuses: Counter = Counter()
+        self.errors = 0
+        self.notes: Counter = Counter()
+
+    def add(self, started: float, status: int | None):
+        self.latencies.append((time.perf_counter() - started) * 1000)
+        if status is None:
+            self.errors += 1
+        else:
+            self.statuses[status] += 1
+
+    def summary(self, seconds: float) -> dict:
+        ordered = sorted(self.latencies)
+        return {
+            "requests": len(ordered),
+            "rps": round(len(ordered) / seconds, 1) if seconds else 0.0,
+            "p50_ms": round(percentile(ordered, 50), 2),
+            "p95_ms": round(percentile(ordered, 95), 2),
+            "p99_ms": round(percentile(ordered, 99), 2),
+            "max_ms": round(ordered[-1], 2) if ordered else 0.0,
+            "errors": self.errors,
+            "statuses": {str(k): v for k, v in sorted(self.statuses.items())},
+            **({"notes": dict(self.notes)} if self.notes else {}),
+        }
+
+
+async def _request(client: httpx.AsyncClient, rec: Recorder, method: str, url: str, **kwargs):
+    started = time.perf_counter()
+    try:
+        r = await client.request(method, url, **kwargs)
+    except httpx.HTTPError:
+        rec.add(started, None)
+        return None
+    rec.add(started, r.status_code)
+    return r
+
+
+# -------------------- scenarios --------------------
+# each user coroutine loops until the deadline; ctx carries dataset facts
+
+async def weekly_user(client, rec, ctx, deadline):
+    etag = None
+    while time.perf_counter() < deadline:
+        headers = {"If-None-Match": etag} if etag else {}
+        r = await _request(client, rec, "GET", "/rooms/weekly", headers=headers)
+        if r is not None and r.status_code == 200:
+            etag = r.headers.get("etag")
+
+
+async def room_user(client, rec, ctx, deadline):
+    rng = random.Random()
+    while time.perf_counter() < deadline:
+        await _request(client, rec, "GET", f"/rooms/{rng.choice(ctx['room_ids'])}")
+
+
+async def burst_round(client, rec, ctx, concurrency: int):
+    """All users request one fresh slot together; records how many won."""
+    ctx["burst_slot"] += 1
+    day, slot = divmod(ctx["burst_slot"], 32)
+    start = ctx["beyond"] + timedelta(days=day, hours=6, minutes=30 * slot)
+    payload = {
+        "room_id": ctx["room_ids"][0], "user_name": "load", "user_identity": "load", "purpose": "burst",
+        "category": "activity", "start_time": start.isoformat(), "end_time": (start + timedelta(minutes=30)).isoformat(),
+    }
+    responses = await asyncio.gather(*(
+        _request(client, rec, "POST", "/bookings", json=payload) for _ in range(concurrency)
+    ))
+    winners = sum(1 for r in responses if r is not None and r.status_code == 200)
+    rec.notes["rounds"] += 1
+    if winners > 1:
+        rec.notes["double_booked_rounds"] += 1
+    if winners == 0:
+        rec.notes["no_winner_rounds"] += 1
+
+
+async def admin_user(client, rec, ctx, deadline):
+    rng = random.Random()
+    while time.perf_counter() < deadline:
+        r = await _request(client, rec, "GET", "/bookings", params={"status": "pending", "limit": 50})
+        if r is None or r.status_code != 200 or not r.json():
+            continue
+        booking = rng.choice(r.json())
+        await _request(client, rec, "PATCH", f"/admin/bookings/{booking['id']}",
+                       json={"status": rng.choice(["approved", "rejected"])}, auth=ctx["auth"])
+
+
+USERS = {"weekly": weekly_user, "room": room_user, "admin": admin_user}
+
+
+async def run_scenario(base_url: str, name: str, concurrency: int, duration: float, ctx: dict) -> dict:
+    rec = Recorder()
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=30, limits=limits) as client:
+        started = time.perf_counter()
+        deadline = started + duration
+        if name == "burst":
+            while time.perf_counter() < deadline:
+                await burst_round(client, rec, ctx, concurrency)
+        else:
+            await asyncio.gather(*(USERS[name](client, rec, ctx, deadline) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return rec.summary(elapsed)
+
+
+# -------------------- server lifecycle --------------------
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(db_path: str, log_path: str, workers: int = 1, env_extra: dict | None = None) -> tuple[subprocess.Popen, str]:
+    port = _free_port()
+    env = {**os.environ, **(env_extra or {}), "DATABASE_URL": f"sqlite:///{db_path}"}
+    cmd = [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+           "--log-level", "warning", "--no-access-log"]
+    if workers > 1:
+        cmd += ["--workers", str(workers)]
+    # server logs go to a file: an undrained PIPE would block the server once it fills
+    log = open(log_path, "ab")
+    proc = subprocess.Popen(cmd, cwd=BACKEND, env=env, stdout=log, stderr=subprocess.STDOUT)
+    log.close()
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            tail = Path(log_path).read_bytes()[-2000:].decode(errors="replace")
+            raise RuntimeError(f"uvicorn exited:\n{tail}")
+        try:
+            if httpx.get(f"{base_url}/healthz", timeout=1).status_code == 200:
+                return proc, base_url
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("uvicorn did not become healthy within 30s")
+
+
+def stop_server(proc: subprocess.Popen):
+    proc.terminate()
+    try:
+        proc.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+def seed_dataset(db_path: str, rooms: int, bookings: int, span_days: int) -> dict:
+    # seed in a child process: app.database binds DATABASE_URL at import time
+    code = (
+        "import json, sys; from benchmarks import seed; "
+        "print(json.dumps(seed.seed(int(sys.argv[1]), int(sys.argv[2]), int(sys.argv[3]))))"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code, str(rooms), str(bookings), str(span_days)],
+        cwd=BACKEND, env={**os.environ, "DATABASE_URL": f"sqlite:///{db_path}"},
+        check=True, capture_output=True, text=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+# -------------------- driver --------------------
+
+def _dataset(spec: str) -> tuple[int, int]:
+    rooms, _, bookings = spec.lower().partition("x")
+    return int(rooms), int(bookings)
+
+
+def print_table(rows: list[dict]):
+    head = f"{'dataset':<12} {'scenario':<8} {'conc':>5} {'reqs':>7} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'err':>4}  statuses"
+    print(head)
+    print("-" * len(head))
+    for r in rows:
+        s = r["result"]
+        notes = f"  {s['notes']}" if "notes" in s else ""
+        print(
+            f"{r['dataset']:<12} {r['scenario']:<8} {r['concurrency']:>5} {s['requests']:>7} {s['rps']:>8.1f} "
+            f"{s['p50_ms']:>8.2f} {s['p95_ms']:>8.2f} {s['p99_ms']:>8.2f} {s['errors']:>4}  {s['statuses']}{notes}"
+        )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--datasets", nargs="+", default=["10x2000", "20x50000"], help="ROOMSxBOOKINGS")
+    parser.add_argument("--span-days", type=int, default=365)
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 8, 32])
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per scenario x concurrency")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--out", help="write all results as JSON")
+    parser.add_argument("--server-log", help="keep the uvicorn output in this file (default: discarded)")
+    args = parser.parse_args(argv)
+
+    admin_user_env, admin_pass_env = os.getenv("ADMIN_USER"), os.getenv("ADMIN_PASS")
+    rows = []
+    with tempfile.TemporaryDirectory(prefix="load-") as tmp:
+        db_path = os.path.join(tmp, "load.db")
+        for spec in args.datasets:
+            rooms, bookings = _dataset(spec)
+            dataset = seed_dataset(db_path, rooms, bookings, args.span_days)
+            log_path = args.server_log or os.path.join(tmp, "server.log")
+            proc, base_url = start_server(db_path, log_path, args.workers)
+            try:
+                ctx = {
+                    "room_ids": dataset["room_ids"],
+                    "auth": (admin_user_env, admin_pass_env) if admin_user_env and admin_pass_env else None,
+                    "beyond": datetime.fromisoformat(dataset["first_day"]).replace(tzinfo=None)
+                    + timedelta(days=args.span_days + 7),
+                    "burst_slot": 0,
+                }
+                for scenario in args.scenarios:
+                    for concurrency in args.concurrency:
+                        result = asyncio.run(run_scenario(base_url, scenario, concurrency, args.duration, ctx))
+                        row = {"dataset": spec, "bookings": dataset["bookings"], "scenario": scenario,
+                               "concurrency": concurrency, "result": result}
+                        rows.append(row)
+                        print(f"  done {spec} {scenario} c={concurrency}: {result['rps']} rps p95={result['p95_ms']} ms",
+                              file=sys.stderr)
+            finally:
+                stop_server(proc)
+
+    print_table(rows)
+    if args.out:
+        meta = {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "duration": args.duration,
+            "workers": args.workers,
+            "span_days": args.span_days,
+            "env": {k: os.environ[k] for k in ("DB_ASYNC", "CONFLICT_INDEX", "SQLITE_JOURNAL_MODE") if k in os.environ},
+        }
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"meta": meta, "runs": rows}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""Synthetic datasets shared by the benchmark and load-test scripts.
+
+Import this only after DATABASE_URL points at a scratch database: app.database
+creates its engine at import time.
+"""
+from datetime import datetime, timedelta
+import random
+
+from sqlalchemy import insert, select
+
+from app import crud, models
+from app.database import Base, engine, SessionLocal
+
+SLOT = timedelta(minutes=30)
+DAY_FIRST_SLOT = 5 * 2    # 05:00
+DAY_LAST_SLOT = 22 * 2    # bookings end by 22:00
+
+
+def reset_schema():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+
+def seed(rooms: int, bookings: int, span_days: int, *, seed: int = 1, past_days: int | None = None) -> dict:
+    """Create `rooms` rooms and about `bookings` non-overlapping bookings.
+
+    Bookings are spread over span_days starting past_days before today
+    (default: a quarter of the span lies in the past), 30 min - 3 h long,
+    half-hour aligned, inside 05:00-22:00, with a realistic status mix.
+    Returns a summary dict (counts, span, room ids).
+    """
+    rng = random.Random(seed)
+    reset_schema()
+    if past_days is None:
+        past_days = span_days // 4
+    today = datetime.now(crud.TZ).replace(tzinfo=None, hour=0, minute=0, second=0, microsecond=0)
+    first_day = today - timedelta(days=past_days)
+    stamp = today - timedelta(days=past_days + 1)
+    statuses = [models.BookingStatus.approved] * 6 + [models.BookingStatus.pending] * 3 + [models.BookingStatus.rejected]
+    categories = list(models.BookingCategory)
+
+    with SessionLocal() as db:
+        db.execute(insert(models.Room), [{"name": f"Room {i + 1:03d}"} for i in range(rooms)])
+        db.commit()
+        room_ids = db.scalars(select(models.Room.id).order_by(models.Room.id)).all()
+
+        per_room = [bookings // rooms + (1 if i < bookings % rooms else 0) for i in range(rooms)]
+        rows = []
+        for room_id, count in zip(room_ids, per_room):
+            # walk forward through the room's half-hour grid with random gaps
+            day_slots = DAY_LAST_SLOT - DAY_FIRST_SLOT
+            total_slots = span_days * day_slots
+            mean_step = max(2, total_slots // max(count, 1))
+            pos = rng.randrange(mean_step)
+            for _ in range(count):
+                length = rng.randint(1, 6)
+                day, slot = divmod(pos, day_slots)
+                if slot + length > day_slots:
+                    day, slot = day + 1, 0
+                if day >= span_days:
+                    break
+                start = first_day + timedelta(days=day) + (DAY_FIRST_SLOT + slot) * SLOT
+                rows.append({
+                    "room_id": room_id,
+                    "user_name": f"user{rng.randrange(500)}",
+                    "user_identity": "bench",
+                    "purpose": "benchmark",
+                    "category": rng.choice(categories),
+                    "start_time": start,
+                    "end_time": start + length * SLOT,
+                    "status": rng.choice(statuses),
+                    "is_semester": rng.random() < 0.3,
+                    "created_at": stamp,
+                    "requested_at": stamp,
+                })
+                gap = rng.randint(0, max(0, 2 * (mean_step - 3)))  # mean length is 3.5 slots
+                pos = day * day_slots + slot + length + gap
+            if len(rows) >= 50_000:
+                db.execute(insert(models.Booking), rows)
+                rows = []
+        if rows:
+            db.execute(insert(models.Booking), rows)
+        db.commit()
+        total = db.query(models.Booking).count()
+
+    return {
+        "rooms": rooms,
+        "bookings": total,
+        "span_days": span_days,
+        "first_day": first_day.date().isoformat(),
+        "room_ids": room_ids,
+    }
@@ -8,4 +8,38 @@ project_root = backend_dir.parent  # project root containing backend/
 for p in (backend_dir, project_root):
     p_str = str(p)
     if p_str not in sys.path:
-        sys.path.insert(0, p_str)
\ No newline at end of file
+        sys.path.insert(0, p_str)
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def _reset_response_caches():
+    # tests insert rows directly through the ORM, bypassing crud's changes.bump()
+    from app import cache
+    cache.weekly.invalidate()
+    cache.ics.invalidate()
+    yield
+
+
+@pytest.fixture()
+def assert_max_queries():
+    """Query budget for a block: `with assert_max_queries(2): client.get(...)`.
+
+    Fails listing every statement when the block runs more than `limit`, or when
+    a statement shape repeats often enough to look like an N+1 (unless
+    allow_repeats=True).
+    """
+    import contextlib
+    from app import sqlprofile
+
+    @contextlib.contextmanager
+    def check(limit: int, *, allow_repeats: bool = False):
+        with sqlprofile.capture() as profile:
+            yield profile
+        if profile.count > limit:
+            pytest.fail(f"expected at most {limit} queries, got {profile.report()}")
+        if not allow_repeats and profile.repeated():
+            pytest.fail(f"probable N+1: {profile.report()}")
+
+    return check
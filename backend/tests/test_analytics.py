@@ -0,0 +1,122 @@
+import pytest
+from fastapi.testclient import TestClient
+from datetime import datetime, date, timedelta
+
+from app.main import app
+from app.database import Base, engine, SessionLocal
+from app import models, analytics
+
+MONDAY = date(2031, 3, 3)
+
+@pytest.fixture(autouse=True)
+def setup_db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture()
+def client():
+    return TestClient(app)
+
+@pytest.fixture()
+def db():
+    s = SessionLocal()
+    try:
+        yield s
+    finally:
+        s.close()
+
+
+def _at(d, hour, minute=0):
+    return datetime(d.year, d.month, d.day, hour, minute)
+
+
+def seed_room(db, name):
+    r = models.Room(name=name)
+    db.add(r); db.commit(); db.refresh(r)
+    return r
+
+
+def booking(room, start, end, status=models.BookingStatus.approved, category=models.BookingCategory.activity):
+    return models.Booking(
+        room_id=room.id, user_name="u", user_identity="i", purpose="p",
+        category=category, start_time=start, end_time=end, status=status,
+    )
+
+
+def test_occupancy_report_aggregates(client, db):
+    a = seed_room(db, "A101")
+    b = seed_room(db, "B202")
+    db.add_all([
+        booking(a, _at(MONDAY, 9), _at(MONDAY, 11)),                                  # Mon 09:00-11:00
+        booking(a, _at(MONDAY + timedelta(days=7), 9), _at(MONDAY + timedelta(days=7), 10)),
+        booking(a, _at(MONDAY, 14), _at(MONDAY, 15), category=models.BookingCategory.meeting),
+        booking(a, _at(MONDAY, 16), _at(MONDAY, 17), models.BookingStatus.pending),
+        booking(a, _at(MONDAY, 18), _at(MONDAY, 19), models.BookingStatus.rejected),
+        booking(b, _at(MONDAY - timedelta(days=1), 23), _at(MONDAY, 1)),              # clipped at range start
+    ])
+    db.commit()
+
+    r = client.get("/admin/analytics/occupancy", params={
+        "from": MONDAY.isoformat(), "to": (MONDAY + timedelta(days=13)).isoformat(),
+    })
+    assert r.status_code == 200, r.text
+    report = r.json()
+    assert report["days"] == 14
+    assert report["counts"] == {"pending": 1, "approved": 4, "rejected": 1}
+    assert report["approval_rate"] == 0.8
+    assert report["hours_by_category"] == {"activity": 4.0, "meeting": 1.0, "course": 0.0}
+
+    ra, rb = report["rooms"]
+    assert ra["booked_hours"] == 4.0
+    monday = ra["heatmap"][0]
+    assert monday[18] == 1.0 and monday[19] == 1.0     # 09:00-10:00 booked both Mondays
+    assert monday[20] == 0.5 and monday[21] == 0.5     # 10:00-11:00 only the first
+    assert monday[32] == 0.0                           # pending 16:00 not counted by default
+    assert sum(map(sum, ra["heatmap"][1:])) == 0
+    assert rb["booked_hours"] == 1.0
+    assert rb["heatmap"][0][:2] == [0.5, 0.5]
+    assert rb["approval_rate"] == 1.0
+
+    r2 = client.get("/admin/analytics/occupancy", params={
+        "from": MONDAY.isoformat(), "to": MONDAY.isoformat(), "room_id": a.id, "include_pending": "true",
+    })
+    (only_a,) = r2.json()["rooms"]
+    assert only_a["heatmap"][0][32] == 1.0
+    assert only_a["booked_hours"] == 4.0
+
+
+def test_occupancy_report_empty_and_invalid(client, db):
+    seed_room(db, "A101")
+    r = client.get("/admin/analytics/occupancy", params={"from": MONDAY.isoformat(), "to": MONDAY.isoformat()})
+    assert r.status_code == 200
+    assert r.json()["approval_rate"] is None
+    assert r.json()["rooms"][0]["utilization"] == 0.0
+
+    r = client.get("/admin/analytics/occupancy", params={"from": MONDAY.isoformat(), "to": (MONDAY - timedelta(days=1)).isoformat()})
+    assert r.status_code == 400
+
+
+def test_occupancy_report_over_years_uses_fixed_queries(db, assert_max_queries):
+    rooms = [seed_room(db, f"R{i}") for i in range(8)]
+    rows = []
+    for d in range(3 * 365):
+        day = MONDAY + timedelta(days=d)
+        for r in rooms:
+            for h in (8, 10, 13, 15):
+                rows.append(dict(
+                    room_id=r.id, user_name="u", user_identity="i", purpose="p",
+                    category=models.BookingCategory.activity, start_time=_at(day, h), end_time=_at(day, h + 2),
+                    status=models.BookingStatus.approved, is_semester=False,
+                    created_at=datetime(2031, 1, 1), requested_at=datetime(2031, 1, 1),
+                ))
+    db.execute(models.Booking.__table__.insert(), rows)
+    db.commit()
+
+    # timing lives in benchmarks/bench_crud.py (occupancy_report)
+    with assert_max_queries(2):  # rooms + one aggregate over bookings
+        report = analytics.occupancy_report(db, MONDAY, MONDAY + timedelta(days=3 * 365 - 1))
+    assert report["days"] == 3 * 365
+    assert report["counts"]["approved"] == len(rows)
+    assert [r["booked_hours"] for r in report["rooms"]] == [3 * 365 * 8] * len(rooms)
@@ -0,0 +1,122 @@
+import pytest
+from fastapi.testclient import TestClient
+from datetime import datetime, date, timedelta
+from sqlalchemy import event
+from zoneinfo import ZoneInfo
+
+from app.main import app
+from app.database import Base, engine, SessionLocal, all_engines
+from app import models
+
+TZ = ZoneInfo("Asia/Taipei")
+DAY = date(2031, 3, 3)
+
+@pytest.fixture(autouse=True)
+def setup_db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture()
+def client():
+    return TestClient(app)
+
+@pytest.fixture()
+def db():
+    s = SessionLocal()
+    try:
+        yield s
+    finally:
+        s.close()
+
+
+def _at(d, hour, minute=0):
+    return datetime(d.year, d.month, d.day, hour, minute)
+
+
+def seed_room(db, name):
+    r = models.Room(name=name)
+    db.add(r); db.commit(); db.refresh(r)
+    return r
+
+
+def seed_booking(db, room, start, end, status=models.BookingStatus.approved):
+    db.add(models.Booking(
+        room_id=room.id, user_name="u", user_identity="i", purpose="p",
+        category=models.BookingCategory.activity, start_time=start, end_time=end, status=status,
+    ))
+    db.commit()
+
+
+def _slots(room_json):
+    return [
+        (datetime.fromisoformat(s["start_time"]).strftime("%H:%M"), datetime.fromisoformat(s["end_time"]).strftime("%H:%M"))
+        for s in room_json["free_slots"]
+    ]
+
+
+def test_free_runs_skip_bookings_and_respect_category_window(client, db):
+    a = seed_room(db, "A101")
+    seed_room(db, "B202")
+    seed_booking(db, a, _at(DAY, 9), _at(DAY, 10, 30))
+    seed_booking(db, a, _at(DAY, 13, 15), _at(DAY, 14))        # off-grid start blocks the whole 13:00 slot
+    seed_booking(db, a, _at(DAY, 15), _at(DAY, 16), models.BookingStatus.rejected)
+
+    r = client.get("/rooms/availability", params={"from": DAY.isoformat(), "category": "meeting", "duration": 60})
+    assert r.status_code == 200, r.text
+    rooms = {x["name"]: x for x in r.json()}
+    assert _slots(rooms["A101"]) == [("05:00", "09:00"), ("10:30", "13:00"), ("14:00", "17:00")]
+    assert _slots(rooms["B202"]) == [("05:00", "17:00")]
+    assert datetime.fromisoformat(rooms["A101"]["free_slots"][0]["start_time"]).utcoffset() == timedelta(hours=8)
+
+
+def test_duration_filters_short_gaps_and_overnight_booking_spans_days(client, db):
+    a = seed_room(db, "A101")
+    nxt = DAY + timedelta(days=1)
+    seed_booking(db, a, _at(DAY, 5), _at(DAY, 9))
+    seed_booking(db, a, _at(DAY, 9, 30), _at(DAY, 21, 30))     # leaves a 30 min gap at 09:00
+    seed_booking(db, a, _at(DAY, 21, 30), _at(nxt, 6))          # written outside crud, crosses midnight
+
+    r = client.get("/rooms/availability", params={"from": DAY.isoformat(), "to": nxt.isoformat(), "duration": 60})
+    assert r.status_code == 200
+    (room,) = r.json()
+    starts = [s["start_time"][:16] for s in room["free_slots"]]
+    assert starts == [f"{nxt.isoformat()}T06:00"]
+    assert room["free_slots"][0]["end_time"].startswith(f"{nxt.isoformat()}T22:00")
+
+
+def test_availability_uses_one_booking_query_for_a_semester(client, db):
+    rooms = [seed_room(db, f"R{i}") for i in range(5)]
+    for r in rooms:
+        for week in range(18):
+            d = DAY + timedelta(weeks=week)
+            seed_booking(db, r, _at(d, 10), _at(d, 12))
+
+    statements = []
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    for e in all_engines():
+        event.listen(e, "before_cursor_execute", _before)
+    try:
+        r = client.get("/rooms/availability", params={
+            "from": DAY.isoformat(), "to": (DAY + timedelta(weeks=18)).isoformat(), "duration": 120,
+        })
+    finally:
+        for e in all_engines():
+            event.remove(e, "before_cursor_execute", _before)
+    assert r.status_code == 200
+    assert len([s for s in statements if "FROM bookings" in s]) == 1
+    # every booked day splits into two runs (05-10, 12-22); the rest are whole windows
+    assert all(len(x["free_slots"]) == 18 * 2 + (18 * 7 + 1 - 18) for x in r.json())
+
+
+@pytest.mark.parametrize("params", [
+    {"duration": 45},
+    {"to": (DAY - timedelta(days=1)).isoformat()},
+    {"to": (DAY + timedelta(days=400)).isoformat()},
+])
+def test_invalid_availability_request_returns_400(client, db, params):
+    seed_room(db, "A101")
+    r = client.get("/rooms/availability", params={"from": DAY.isoformat(), **params})
+    assert r.status_code == 400
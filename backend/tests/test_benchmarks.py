@@ -0,0 +1,47 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+from benchmarks import bench_crud
+
+BACKEND = Path(__file__).resolve().parent.parent
+
+
+def test_percentile_nearest_rank():
+    values = [float(v) for v in range(1, 101)]
+    assert bench_crud.percentile(values, 50) == 50.0
+    assert bench_crud.percentile(values, 95) == 95.0
+    assert bench_crud.percentile(values, 100) == 100.0
+    assert bench_crud.percentile([], 50) == 0.0
+
+
+def test_bench_crud_smoke_run_and_baseline_compare(tmp_path):
+    # separate process: the script points DATABASE_URL at its own scratch file before importing app
+    out = tmp_path / "bench.json"
+    cmd = [sys.executable, "-m", "benchmarks.bench_crud", "--rooms", "3", "--bookings", "60",
+           "--span-days", "30", "--iterations", "3", "--warmup", "1", "--out", str(out)]
+    subprocess.run(cmd, cwd=BACKEND, check=True, capture_output=True)
+    result = json.loads(out.read_text())
+    assert set(result["results"]) == set(bench_crud.BENCHMARKS)
+    assert result["meta"]["rooms"] == 3 and result["meta"]["bookings"] > 0
+    assert result["results"]["list_bookings_page"]["queries_per_call"] == 1
+    assert result["results"]["get_rooms_weekly"]["n"] == 3
+
+    proc = subprocess.run(cmd[:-2] + ["--out", str(tmp_path / "again.json"), "--baseline", str(out)],
+                          cwd=BACKEND, capture_output=True, text=True)
+    assert proc.returncode == 0
+    assert "create_booking" in proc.stdout
+
+
+def test_loadtest_smoke_run(tmp_path):
+    out = tmp_path / "load.json"
+    cmd = [sys.executable, "-m", "benchmarks.loadtest", "--datasets", "2x20", "--span-days", "14",
+           "--concurrency", "2", "--duration", "0.3", "--scenarios", "weekly", "burst", "admin", "--out", str(out)]
+    subprocess.run(cmd, cwd=BACKEND, check=True, capture_output=True, timeout=120)
+    runs = json.loads(out.read_text())["runs"]
+    assert [(r["scenario"], r["concurrency"]) for r in runs] == [("weekly", 2), ("burst", 2), ("admin", 2)]
+    weekly = runs[0]["result"]
+    assert weekly["errors"] == 0 and weekly["requests"] > 0
+    assert set(weekly["statuses"]) <= {"200", "304"}
+    assert runs[1]["result"]["notes"]["rounds"] > 0
@@ -0,0 +1,179 @@
+import asyncio
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine
+
+from app import conflict_index, crud, crud_async, database, migrations, models, schemas
+from app.database import Base, engine, SessionLocal
+
+BACKEND = Path(__file__).resolve().parent.parent
+PROCESSES = 4
+THREADS = 8
+SLOTS = 20
+
+# every process books the same SLOTS one-hour slots in room 1, starting together
+WORKER = """
+import json, sys, time
+from datetime import datetime, timedelta
+from app import conflict_index, crud, multiworker, schemas
+from app.database import SessionLocal, engine
+
+start_at, slots = float(sys.argv[1]), int(sys.argv[2])
+if multiworker.ENABLED:
+    multiworker.install(engine)
+if conflict_index.enabled():
+    with SessionLocal() as db:
+        conflict_index.index.warm(db)
+base = datetime(2031, 3, 3, 6)
+won = []
+while time.time() < start_at:
+    time.sleep(0.001)
+for i in range(slots):
+    start = base + timedelta(days=i // 12, hours=i % 12)
+    booking_in = schemas.BookingCreate(
+        room_id=1, user_name="race", user_identity="race", purpose="race",
+        category=schemas.BookingCategory.activity, start_time=start, end_time=start + timedelta(hours=1),
+    )
+    with SessionLocal() as db:
+        if crud.create_booking(db, booking_in):
+            won.append(i)
+print(json.dumps(won))
+"""
+
+
+def _scratch_db(tmp_path) -> str:
+    path = tmp_path / "race.db"
+    e = create_engine(f"sqlite:///{path}")
+    migrations.ensure_schema(e)  # schema + default rooms (room 1 exists)
+    e.dispose()
+    return str(path)
+
+
+@pytest.mark.parametrize("env_extra", [
+    {"CONFLICT_INDEX": "off"},
+    # the index is per process; other workers' writes reach it through MULTI_WORKER
+    {"CONFLICT_INDEX": "on", "MULTI_WORKER": "true"},
+], ids=["sql", "index"])
+def test_parallel_identical_bookings_from_several_processes_have_one_winner(tmp_path, env_extra):
+    path = _scratch_db(tmp_path)
+    env = {**os.environ, **env_extra, "DATABASE_URL": f"sqlite:///{path}", "LOG_LEVEL": "WARNING"}
+    start_at = time.time() + 3  # leave time for the interpreters to import the app
+    procs = [
+        subprocess.Popen([sys.executable, "-c", WORKER, str(start_at), str(SLOTS)],
+                         cwd=BACKEND, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        for _ in range(PROCESSES)
+    ]
+    wins = []
+    for p in procs:
+        out, err = p.communicate(timeout=120)
+        assert p.returncode == 0, err
+        wins.extend(json.loads(out.strip().splitlines()[-1]))
+
+    assert sorted(wins) == list(range(SLOTS))  # every slot won exactly once
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM bookings").fetchone() == (SLOTS,)
+
+
+@pytest.mark.parametrize("mode", ["off", "on"])
+def test_parallel_identical_bookings_from_threads_have_one_winner(monkeypatch, mode):
+    # threads of one worker share the conflict index; it must show each booking before the lock is released
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    monkeypatch.setattr(conflict_index, "MODE", mode)
+    try:
+        with SessionLocal() as db:
+            room = models.Room(name="race")
+            db.add(room); db.commit()
+            room_id = room.id
+            if conflict_index.enabled():
+                conflict_index.index.warm(db)
+
+        def book(booking_in, barrier):
+            barrier.wait()
+            with SessionLocal() as db:
+                return crud.create_booking(db, booking_in) is not None
+
+        winners = []
+        with ThreadPoolExecutor(THREADS) as pool:
+            for i in range(SLOTS):
+                start = datetime(2031, 3, 3, 6) + timedelta(days=i // 12, hours=i % 12)
+                booking_in = schemas.BookingCreate(
+                    room_id=room_id, user_name="race", user_identity="race", purpose="race",
+                    category=schemas.BookingCategory.activity, start_time=start, end_time=start + timedelta(hours=1),
+                )
+                barrier = threading.Barrier(THREADS)
+                winners.append(sum(pool.map(lambda _: book(booking_in, barrier), range(THREADS))))
+        assert winners == [1] * SLOTS
+        with SessionLocal() as db:
+            assert db.query(models.Booking).count() == SLOTS
+    finally:
+        conflict_index.index.clear()
+        Base.metadata.drop_all(bind=engine)
+
+
+@pytest.mark.skipif(not database.DB_ASYNC, reason="async path only with DB_ASYNC=true")
+def test_parallel_identical_async_bookings_with_index_have_one_winner(monkeypatch):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    monkeypatch.setattr(conflict_index, "MODE", "on")
+    try:
+        with SessionLocal() as db:
+            room = models.Room(name="race")
+            db.add(room); db.commit()
+            room_id = room.id
+            conflict_index.index.warm(db)
+
+        async def book(booking_in):
+            async with database.AsyncSessionLocal() as db:
+                return await crud_async.create_booking(db, booking_in) is not None
+
+        async def race():
+            winners = []
+            for i in range(SLOTS):
+                start = datetime(2031, 3, 3, 6) + timedelta(days=i // 12, hours=i % 12)
+                booking_in = schemas.BookingCreate(
+                    room_id=room_id, user_name="race", user_identity="race", purpose="race",
+                    category=schemas.BookingCategory.activity, start_time=start, end_time=start + timedelta(hours=1),
+                )
+                winners.append(sum(await asyncio.gather(*(book(booking_in) for _ in range(THREADS)))))
+            return winners
+
+        assert asyncio.run(race()) == [1] * SLOTS
+    finally:
+        conflict_index.index.clear()
+        Base.metadata.drop_all(bind=engine)
+
+
+def test_write_lock_timeout_is_503(tmp_path):
+    path = _scratch_db(tmp_path)
+    client_code = """
+from fastapi.testclient import TestClient
+from app.main import app
+r = TestClient(app).post("/bookings", json={
+    "room_id": 1, "user_name": "u", "user_identity": "i", "purpose": "p", "category": "activity",
+    "start_time": "2031-03-03T10:00:00", "end_time": "2031-03-03T11:00:00",
+})
+print(r.status_code, r.headers.get("retry-after"))
+"""
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{path}", "SQLITE_BUSY_TIMEOUT_MS": "50",
+           "BOOKING_WRITE_LOCK_RETRIES": "1", "LOG_LEVEL": "ERROR"}
+    holder = sqlite3.connect(path, isolation_level=None)
+    holder.execute("BEGIN IMMEDIATE")  # another writer sits on the lock
+    try:
+        out = subprocess.run([sys.executable, "-c", client_code], cwd=BACKEND, env=env,
+                             capture_output=True, text=True, timeout=60)
+    finally:
+        holder.execute("ROLLBACK")
+        holder.close()
+    assert out.returncode == 0, out.stderr
+    assert out.stdout.split()[-2:] == ["503", "1"]
@@ -0,0 +1,102 @@
+import pytest
+from fastapi.testclient import TestClient
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from app.main import app
+from app.database import Base, engine, SessionLocal
+from app import models, crud
+
+TZ = ZoneInfo("Asia/Taipei")
+
+@pytest.fixture(autouse=True)
+def setup_db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture()
+def client():
+    return TestClient(app)
+
+@pytest.fixture()
+def db():
+    s = SessionLocal()
+    try:
+        yield s
+    finally:
+        s.close()
+
+
+def seed_room(db, name="R1"):
+    r = models.Room(name=name)
+    db.add(r); db.commit(); db.refresh(r)
+    return r
+
+
+def payload(room_id, start, end):
+    return {
+        "room_id": room_id, "user_name": "u", "user_identity": "i", "purpose": "p", "category": "activity",
+        "start_time": start.isoformat(), "end_time": end.isoformat(),
+    }
+
+
+def query_plan(db, stmt) -> str:
+    sql = str(stmt.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+    rows = db.connection().exec_driver_sql("EXPLAIN QUERY PLAN " + sql).fetchall()
+    return "\n".join(row[-1] for row in rows)
+
+
+def test_epoch_minute_is_utc_for_naive_local_and_aware_values():
+    utc = datetime(2031, 3, 3, 2, tzinfo=ZoneInfo("UTC"))
+    assert models.epoch_minute(datetime(2031, 3, 3, 10)) == int(utc.timestamp()) // 60
+    assert models.epoch_minute(datetime(2031, 3, 3, 10, tzinfo=TZ)) == models.epoch_minute(utc)
+    assert models.epoch_minute(datetime(2031, 3, 3, 10, 0, 1), ceil=True) == models.epoch_minute(datetime(2031, 3, 3, 10, 1))
+
+
+def test_epoch_columns_follow_orm_core_and_updates(db):
+    room = seed_room(db)
+    start = datetime(2031, 3, 3, 10)
+    b = models.Booking(room_id=room.id, user_name="u", user_identity="i", category=models.BookingCategory.activity,
+                       start_time=start.replace(tzinfo=TZ), end_time=(start + timedelta(hours=1)).replace(tzinfo=TZ))
+    db.add(b); db.commit()
+    assert (b.start_min, b.end_min) == (models.epoch_minute(start), models.epoch_minute(start) + 60)
+
+    db.execute(models.Booking.__table__.insert(), [dict(
+        room_id=room.id, user_name="u", user_identity="i", category=models.BookingCategory.activity,
+        start_time=start + timedelta(days=1), end_time=start + timedelta(days=1, minutes=30), is_semester=False,
+        created_at=start, requested_at=start,
+    )])
+    db.commit()
+    bulk = db.query(models.Booking).filter(models.Booking.id != b.id).one()
+    assert bulk.end_min - bulk.start_min == 30
+
+    b.end_time = start + timedelta(hours=3)
+    db.commit()
+    assert b.end_min == models.epoch_minute(start) + 180
+
+
+@pytest.mark.parametrize("hours, conflict", [
+    ((9, 10), False),   # ends where the booking starts
+    ((12, 13), False),  # starts where it ends
+    ((9, 11), True),    # overlaps the start
+    ((11, 13), True),   # overlaps the end
+    ((10, 11), True),   # inside
+    ((9, 13), True),    # contains it
+    ((10, 12), True),   # same slot
+])
+def test_canonical_overlap_predicate(client, db, hours, conflict):
+    room = seed_room(db)
+    day = datetime(2031, 3, 3)
+    assert client.post("/bookings", json=payload(room.id, day.replace(hour=10), day.replace(hour=12))).status_code == 200
+    r = client.post("/bookings", json=payload(room.id, day.replace(hour=hours[0]), day.replace(hour=hours[1])))
+    assert r.status_code == (409 if conflict else 200)
+
+
+def test_overlap_queries_use_the_epoch_minute_indexes(db):
+    start = datetime(2031, 3, 3, 10, tzinfo=TZ)
+    conflict_plan = query_plan(db, crud._conflict_stmt(1, start, start + timedelta(hours=1)))
+    assert "ix_bookings_room_end_start_min (room_id=? AND end_min>?)" in conflict_plan, conflict_plan
+    weekly_plan = query_plan(db, crud._weekly_bookings_stmt())
+    assert "ix_bookings_end_start_min (end_min>?)" in weekly_plan, weekly_plan
@@ -0,0 +1,137 @@
+import pytest
+from fastapi.testclient import TestClient
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from app.main import app
+from app.database import Base, engine, SessionLocal
+from app import models, crud
+
+TZ = ZoneInfo("Asia/Taipei")
+
+@pytest.fixture(autouse=True)
+def setup_db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture()
+def client():
+    return TestClient(app)
+
+@pytest.fixture()
+def db():
+    s = SessionLocal()
+    try:
+        yield s
+    finally:
+        s.close()
+
+
+def seed(db, n_days=6):
+    room = models.Room(name="分頁室")
+    db.add(room); db.commit(); db.refresh(room)
+    base = datetime(2025, 9, 1, 9, 0, tzinfo=TZ)
+    for d in range(n_days):
+        # two bookings share each start time to exercise the id tie-breaker
+        for _ in range(2):
+            st = base + timedelta(days=d)
+            db.add(models.Booking(room_id=room.id, user_name="u", user_identity="i",
+                                  category=models.BookingCategory.activity,
+                                  start_time=st, end_time=st + timedelta(hours=1)))
+    db.commit()
+    return room
+
+
+def test_keyset_pages_cover_full_listing_in_order(client, db):
+    seed(db)
+    full = [b["id"] for b in client.get("/bookings").json()]
+    assert len(full) == 12
+    seen = []
+    cursor = None
+    pages = 0
+    while True:
+        params = {"limit": 5}
+        if cursor:
+            params["cursor"] = cursor
+        r = client.get("/bookings", params=params)
+        assert r.status_code == 200, r.text
+        seen += [b["id"] for b in r.json()]
+        pages += 1
+        cursor = r.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert seen == full
+    assert pages == 3
+
+
+def test_date_range_filter(client, db):
+    seed(db)
+    r = client.get("/bookings", params={"from": "2025-09-02T00:00:00+08:00", "to": "2025-09-04T00:00:00+08:00", "limit": 50})
+    assert r.status_code == 200
+    data = r.json()
+    assert len(data) == 4
+    assert all(b["start_time"][:10] in ("2025-09-02", "2025-09-03") for b in data)
+    assert "X-Next-Cursor" not in r.headers
+
+
+def collect(client, params):
+    seen, cursor = [], None
+    while True:
+        r = client.get("/bookings", params={**params, **({"cursor": cursor} if cursor else {})})
+        assert r.status_code == 200, r.text
+        seen += r.json()
+        cursor = r.headers.get("X-Next-Cursor")
+        if not cursor:
+            return seen
+
+
+def test_pages_by_submission_time_for_one_room(client, db):
+    room = seed(db)
+    other = models.Room(name="其他室"); db.add(other); db.commit(); db.refresh(other)
+    submitted = datetime(2025, 8, 1, 12, 0, tzinfo=TZ)
+    # far-future bookings submitted first, a near-term one submitted last
+    for i, b in enumerate(db.query(models.Booking).order_by(models.Booking.start_time.desc(), models.Booking.id)):
+        b.requested_at = submitted + timedelta(minutes=i % 5)  # ties broken by id
+    db.add(models.Booking(room_id=other.id, user_name="u", user_identity="i", category=models.BookingCategory.activity,
+                          start_time=datetime(2025, 9, 1, 8, tzinfo=TZ), end_time=datetime(2025, 9, 1, 9, tzinfo=TZ),
+                          requested_at=submitted + timedelta(days=1)))
+    db.commit()
+    expected = sorted(db.query(models.Booking).filter_by(room_id=room.id), key=lambda b: (b.requested_at, b.id), reverse=True)
+
+    newest_first = collect(client, {"room_id": room.id, "order": "-requested_at", "limit": 5})
+    assert [b["id"] for b in newest_first] == [b.id for b in expected]
+    oldest_first = collect(client, {"room_id": room.id, "order": "requested_at", "limit": 5})
+    assert [b["id"] for b in oldest_first] == [b.id for b in reversed(expected)]
+    assert [b["room_id"] for b in collect(client, {"room_id": other.id, "order": "-requested_at", "limit": 5})] == [other.id]
+
+
+def test_ascending_start_order_and_unknown_order(client, db):
+    seed(db)
+    full = [b["id"] for b in client.get("/bookings").json()]
+    assert [b["id"] for b in collect(client, {"order": "start_time", "limit": 5})] == full[::-1]
+    assert client.get("/bookings", params={"order": "purpose", "limit": 5}).status_code == 422
+
+
+def test_invalid_cursor_rejected(client, db):
+    r = client.get("/bookings", params={"limit": 5, "cursor": "not-a-cursor"})
+    assert r.status_code == 400
+
+
+def query_plan(db, stmt) -> str:
+    sql = str(stmt.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+    rows = db.connection().exec_driver_sql("EXPLAIN QUERY PLAN " + sql).fetchall()
+    return "\n".join(row[-1] for row in rows)
+
+
+@pytest.mark.parametrize("order, index", [
+    ("-start_time", "ix_bookings_start_id"),
+    ("start_time", "ix_bookings_start_id"),
+    ("-requested_at", "ix_bookings_requested_id"),
+])
+def test_keyset_query_uses_composite_index(db, order, index):
+    cursor = crud.encode_cursor(datetime(2025, 9, 3, 9), 5)
+    plan = query_plan(db, crud._list_bookings_stmt(limit=10, cursor=cursor, order=order))
+    assert index in plan, plan
+    assert "TEMP B-TREE" not in plan, plan  # the index supplies the order
@@ -0,0 +1,128 @@
+import pytest
+from fastapi.testclient import TestClient
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from zoneinfo import ZoneInfo
+
+from app.main import app
+from app.database import Base, engine, SessionLocal, all_engines
+from app import models, changes
+
+TZ = ZoneInfo("Asia/Taipei")
+
+@pytest.fixture(autouse=True)
+def setup_db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture()
+def client():
+    return TestClient(app)
+
+@pytest.fixture()
+def db():
+    s = SessionLocal()
+    try:
+        yield s
+    finally:
+        s.close()
+
+
+def _at(day, hour):
+    base = (datetime.now(TZ) + timedelta(days=day)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return (base + timedelta(hours=hour)).replace(tzinfo=None)
+
+
+def seed(db, room, start, end, status=models.BookingStatus.pending):
+    b = models.Booking(
+        room_id=room.id, user_name="u", user_identity="i", purpose="p",
+        category=models.BookingCategory.activity, start_time=start, end_time=end, status=status,
+    )
+    db.add(b); db.commit(); db.refresh(b)
+    return b.id
+
+
+def test_bulk_status_updates_many_and_reports_missing(client, db):
+    room = models.Room(name="A101"); db.add(room); db.commit(); db.refresh(room)
+    ids = [seed(db, room, _at(1, h), _at(1, h + 1)) for h in (9, 10, 11)]
+
+    r = client.patch("/admin/bookings", json={"ids": ids + [9999], "status": "approved"})
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert body["updated_ids"] == ids
+    assert body["rejected_ids"] == []
+    assert body["not_found_ids"] == [9999]
+
+    db.expire_all()
+    assert {b.status for b in db.query(models.Booking)} == {models.BookingStatus.approved}
+
+
+def test_approve_rejects_overlapping_pending_in_same_room_only(client, db):
+    a = models.Room(name="A101"); b = models.Room(name="B202")
+    db.add_all([a, b]); db.commit(); db.refresh(a); db.refresh(b)
+    winner = seed(db, a, _at(1, 9), _at(1, 11))
+    overlap = seed(db, a, _at(1, 10), _at(1, 12))
+    touching = seed(db, a, _at(1, 11), _at(1, 12))          # shares only the boundary
+    other_room = seed(db, b, _at(1, 9), _at(1, 11))
+    already_approved = seed(db, a, _at(1, 8), _at(1, 10), models.BookingStatus.approved)
+
+    statements = []
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    for e in all_engines():
+        event.listen(e, "before_cursor_execute", _before)
+    try:
+        r = client.patch("/admin/bookings", json={"ids": [winner], "status": "approved", "reject_overlapping": True})
+    finally:
+        for e in all_engines():
+            event.remove(e, "before_cursor_execute", _before)
+    assert r.status_code == 200, r.text
+    assert r.json()["updated_ids"] == [winner]
+    assert r.json()["rejected_ids"] == [overlap]
+    assert sum(1 for s in statements if s.lstrip().upper().startswith("UPDATE")) == 2
+
+    db.expire_all()
+    status = {bk.id: bk.status for bk in db.query(models.Booking)}
+    assert status[winner] == models.BookingStatus.approved
+    assert status[overlap] == models.BookingStatus.rejected
+    assert status[touching] == models.BookingStatus.pending
+    assert status[other_room] == models.BookingStatus.pending
+    assert status[already_approved] == models.BookingStatus.approved
+
+
+def test_batch_approves_in_order_and_rejects_later_overlaps(client, db, monkeypatch):
+    a = models.Room(name="A101"); b = models.Room(name="B202"); c = models.Room(name="C303")
+    db.add_all([a, b, c]); db.commit()
+    later = seed(db, a, _at(1, 9), _at(1, 11))
+    first = seed(db, a, _at(1, 10), _at(1, 12))
+    after = seed(db, a, _at(1, 12), _at(1, 13))
+    elsewhere = seed(db, b, _at(1, 9), _at(1, 11))
+    seed(db, c, _at(1, 9), _at(1, 11))
+    bumped = []
+    monkeypatch.setattr(changes, "_listeners", [*changes._listeners, bumped.append])
+
+    r = client.patch("/admin/bookings", json={"ids": [first, later, after, elsewhere], "status": "approved"})
+    assert r.status_code == 200, r.text
+    assert r.json() == {"updated_ids": sorted([first, after, elsewhere]), "rejected_ids": [later], "not_found_ids": []}
+    db.expire_all()
+    assert db.get(models.Booking, later).status == models.BookingStatus.rejected
+    assert sorted(bumped) == sorted([a.id, b.id])  # only the rooms written to
+
+
+def test_reject_overlapping_is_ignored_for_other_statuses(client, db):
+    room = models.Room(name="A101"); db.add(room); db.commit(); db.refresh(room)
+    first = seed(db, room, _at(1, 9), _at(1, 11))
+    second = seed(db, room, _at(1, 10), _at(1, 12))
+
+    r = client.patch("/admin/bookings", json={"ids": [first], "status": "rejected", "reject_overlapping": True})
+    assert r.status_code == 200
+    assert r.json()["rejected_ids"] == []
+    db.expire_all()
+    assert db.get(models.Booking, second).status == models.BookingStatus.pending
+
+
+def test_bulk_status_requires_ids(client):
+    r = client.patch("/admin/bookings", json={"ids": [], "status": "approved"})
+    assert r.status_code == 422
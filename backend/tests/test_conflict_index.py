@@ -0,0 +1,141 @@
+import pytest
+from fastapi.testclient import TestClient
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from app.main import app
+from app.database import Base, engine, SessionLocal
+from app import models, conflict_index, crud, schemas
+
+TZ = ZoneInfo("Asia/Taipei")
+
+@pytest.fixture(autouse=True)
+def setup_db(monkeypatch):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    monkeypatch.setattr(conflict_index, "MODE", "check")
+    yield
+    conflict_index.index.clear()
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture()
+def client():
+    return TestClient(app)
+
+@pytest.fixture()
+def db():
+    s = SessionLocal()
+    try:
+        yield s
+    finally:
+        s.close()
+
+
+def seed_room(db, name="索引室"):
+    r = models.Room(name=name)
+    db.add(r); db.commit(); db.refresh(r)
+    return r
+
+
+def _payload(room_id, start, end):
+    return {
+        "room_id": room_id,
+        "user_name": "u",
+        "user_identity": "i",
+        "purpose": "p",
+        "category": "activity",
+        "start_time": start.isoformat(),
+        "end_time": end.isoformat(),
+    }
+
+
+def test_room_intervals_overlap_lookup():
+    ri = conflict_index.RoomIntervals()
+    base = datetime(2025, 9, 22, 8, 0)
+    ri.add(1, base, base + timedelta(hours=2))              # 08-10
+    ri.add(2, base + timedelta(hours=3), base + timedelta(hours=4))  # 11-12
+    ri.add(3, base - timedelta(hours=3), base + timedelta(hours=9))  # 05-17, long
+    assert sorted(ri.overlapping(base + timedelta(hours=2), base + timedelta(hours=3))) == [3]
+    assert sorted(ri.overlapping(base + timedelta(hours=1), base + timedelta(hours=4))) == [1, 2, 3]
+    ri.remove(3, base - timedelta(hours=3))
+    assert ri.overlapping(base + timedelta(hours=2), base + timedelta(hours=3)) == []
+    # touching intervals do not overlap
+    assert ri.overlapping(base + timedelta(hours=4), base + timedelta(hours=5)) == []
+
+
+def test_index_tracks_create_status_and_delete(client, db, caplog):
+    caplog.set_level("INFO")
+    room = seed_room(db)
+    conflict_index.index.warm(db)
+    start = (datetime.now(TZ) + timedelta(days=1)).replace(hour=9, minute=0, second=0, microsecond=0)
+    end = start + timedelta(hours=2)
+
+    r = client.post("/bookings", json=_payload(room.id, start, end))
+    assert r.status_code == 200, r.text
+    booking_id = r.json()["id"]
+    assert conflict_index.index.overlapping(room.id, start, end) == [booking_id]
+    assert client.post("/bookings", json=_payload(room.id, start, end)).status_code == 409
+
+    # rejected bookings no longer block the slot
+    assert client.patch(f"/admin/bookings/{booking_id}", json={"status": "rejected"}).status_code == 200
+    assert conflict_index.index.overlapping(room.id, start, end) == []
+    r2 = client.post("/bookings", json=_payload(room.id, start, end))
+    assert r2.status_code == 200
+
+    assert client.delete(f"/admin/bookings/{r2.json()['id']}").status_code == 200
+    assert conflict_index.index.overlapping(room.id, start, end) == []
+    assert not [rec for rec in caplog.records if "conflict_index_mismatch" in rec.message]
+
+
+def test_check_mode_reports_drift_and_trusts_sql(client, db, caplog):
+    caplog.set_level("INFO")
+    room = seed_room(db)
+    conflict_index.index.warm(db)
+    start = (datetime.now(TZ) + timedelta(days=1)).replace(hour=9, minute=0, second=0, microsecond=0)
+    end = start + timedelta(hours=1)
+    # written behind the index's back
+    db.add(models.Booking(room_id=room.id, user_name="x", user_identity="y", category=models.BookingCategory.activity,
+                          start_time=start, end_time=end))
+    db.commit()
+
+    r = client.post("/bookings", json=_payload(room.id, start, end))
+    assert r.status_code == 409
+    assert [rec for rec in caplog.records if "conflict_index_mismatch" in rec.message]
+
+
+def test_failed_commit_unstages_the_booking(db, monkeypatch):
+    room = seed_room(db)
+    conflict_index.index.warm(db)
+    start = (datetime.now(TZ) + timedelta(days=1)).replace(hour=9, minute=0, second=0, microsecond=0)
+    booking_in = schemas.BookingCreate(room_id=room.id, user_name="u", user_identity="i", purpose="p",
+                                       category=schemas.BookingCategory.activity, start_time=start, end_time=start + timedelta(hours=1))
+    with SessionLocal() as s:
+        def fail():
+            raise RuntimeError("disk full")
+        monkeypatch.setattr(s, "commit", fail)
+        with pytest.raises(RuntimeError):
+            crud.create_booking(s, booking_in)
+        # the booking was shown to the index under the lock; the room is reloaded instead of trusted
+        assert not conflict_index.index.fresh(room.id)
+        s.rollback()
+    with SessionLocal() as s:
+        assert crud.create_booking(s, booking_in) is not None
+    assert conflict_index.index.fresh(room.id)
+
+
+def test_lagging_removal_is_rechecked_against_the_db(client, db, monkeypatch):
+    monkeypatch.setattr(conflict_index, "MODE", "on")
+    room = seed_room(db)
+    conflict_index.index.warm(db)
+    start = (datetime.now(TZ) + timedelta(days=1)).replace(hour=9, minute=0, second=0, microsecond=0, tzinfo=None)
+    end = start + timedelta(hours=1)
+    booking_id = client.post("/bookings", json=_payload(room.id, start, end)).json()["id"]
+    # rejected behind the index's back: the entry stays until a reload
+    db.query(models.Booking).filter_by(id=booking_id).update({"status": models.BookingStatus.rejected})
+    db.commit()
+    assert conflict_index.index.overlapping(room.id, start, end) == [booking_id]
+    assert client.post("/bookings", json=_payload(room.id, start, end)).status_code == 200
+
+    # putting it back goes through the write lock and the index again
+    assert client.patch(f"/admin/bookings/{booking_id}", json={"status": "pending"}).status_code == 200
+    assert booking_id in conflict_index.index.overlapping(room.id, start, end)
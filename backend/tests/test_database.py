@@ -0,0 +1,52 @@
+import asyncio
+import pytest
+
+from app import database
+from app.database import engine
+
+
+def test_sqlite_profile_applied_to_pooled_connections():
+    if not database.IS_SQLITE or database.IS_SQLITE_MEMORY:
+        pytest.skip("PRAGMA profile only applies to file-backed SQLite")
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar().upper() == database.SQLITE_JOURNAL_MODE
+        assert conn.exec_driver_sql("PRAGMA busy_timeout").scalar() == database.SQLITE_BUSY_TIMEOUT_MS
+        assert conn.exec_driver_sql("PRAGMA cache_size").scalar() == database.SQLITE_CACHE_SIZE
+        # synchronous: 0=OFF 1=NORMAL 2=FULL 3=EXTRA
+        assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == ["OFF", "NORMAL", "FULL", "EXTRA"].index(database.SQLITE_SYNCHRONOUS)
+
+
+def test_startup_log_reports_effective_settings(caplog):
+    caplog.set_level("INFO", logger="math_office.database")
+    effective = database.log_database_settings()
+    if database.IS_SQLITE:
+        assert effective["busy_timeout"] == database.SQLITE_BUSY_TIMEOUT_MS
+    else:
+        assert effective == {}
+    assert any(r.message.startswith("database url=") for r in caplog.records)
+
+
+@pytest.mark.skipif(not database.DB_ASYNC, reason="async engine only exists with DB_ASYNC=true")
+def test_async_sessions_reuse_pooled_connections():
+    if not database.IS_SQLITE or database.IS_SQLITE_MEMORY:
+        pytest.skip("pool settings only apply to file-backed SQLite")
+    from sqlalchemy import event, text
+    from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+    pool = database.async_engine.pool
+    assert isinstance(pool, AsyncAdaptedQueuePool)
+    assert pool.size() == database.DB_POOL_SIZE
+    connects = []
+    listener = lambda dbapi_connection, connection_record: connects.append(1)
+
+    async def run():
+        for i in range(6):
+            if i == 1:  # one connection is pooled now
+                event.listen(database.async_engine.sync_engine, "connect", listener)
+            async with database.AsyncSessionLocal() as db:
+                assert (await db.execute(text("PRAGMA busy_timeout"))).scalar() == database.SQLITE_BUSY_TIMEOUT_MS
+        event.remove(database.async_engine.sync_engine, "connect", listener)
+        await database.async_engine.dispose()  # pooled connections belong to this event loop
+
+    asyncio.run(run())
+    assert connects == []
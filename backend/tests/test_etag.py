@@ -0,0 +1,97 @@
+import pytest
+from fastapi.testclient import TestClient
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from zoneinfo import ZoneInfo
+
+from app.main import app
+from app.database import Base, engine, SessionLocal, all_engines
+from app import models
+
+TZ = ZoneInfo("Asia/Taipei")
+
+@pytest.fixture(autouse=True)
+def setup_db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture()
+def client():
+    return TestClient(app)
+
+@pytest.fixture()
+def db():
+    s = SessionLocal()
+    try:
+        yield s
+    finally:
+        s.close()
+
+
+def seed_room(db, name="快取室"):
+    r = models.Room(name=name)
+    db.add(r); db.commit(); db.refresh(r)
+    return r
+
+
+def _booking_payload(room_id):
+    start = (datetime.now(TZ) + timedelta(days=1)).replace(hour=9, minute=0, second=0, microsecond=0)
+    return {
+        "room_id": room_id, "user_name": "u", "user_identity": "i", "purpose": "p", "category": "activity",
+        "start_time": start.isoformat(), "end_time": (start + timedelta(hours=1)).isoformat(),
+    }
+
+
+@pytest.mark.parametrize("path", ["/rooms", "/rooms/weekly", "/bookings", "/rooms/{room_id}"])
+def test_read_endpoints_answer_304_until_a_write(client, db, path):
+    room = seed_room(db)
+    url = path.format(room_id=room.id)
+    r1 = client.get(url)
+    assert r1.status_code == 200
+    etag = r1.headers["ETag"]
+
+    statements = []
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    for e in all_engines():
+        event.listen(e, "before_cursor_execute", _before)
+    try:
+        r2 = client.get(url, headers={"If-None-Match": etag})
+    finally:
+        for e in all_engines():
+            event.remove(e, "before_cursor_execute", _before)
+    assert r2.status_code == 304
+    assert r2.headers["ETag"] == etag
+    assert statements == []
+
+    assert client.post("/bookings", json=_booking_payload(room.id)).status_code == 200
+    r3 = client.get(url, headers={"If-None-Match": etag})
+    assert r3.status_code == 200
+    assert r3.headers["ETag"] != etag
+
+
+def test_every_write_path_bumps_the_version(client, db):
+    room = seed_room(db)
+    tags = [client.get("/bookings").headers["ETag"]]
+    def changed():
+        tags.append(client.get("/bookings").headers["ETag"])
+        return tags[-1] != tags[-2]
+
+    booking_id = client.post("/bookings", json=_booking_payload(room.id)).json()["id"]
+    assert changed()
+    client.patch(f"/admin/bookings/{booking_id}", json={"status": "approved"})
+    assert changed()
+    client.delete(f"/admin/bookings/{booking_id}")
+    assert changed()
+    client.post("/admin/semester_bookings", json={
+        "room_id": room.id, "category": "activity", "user_name": "u", "user_identity": "i",
+        "start_time_hm": "09:00", "end_time_hm": "10:00", "start_date": "2025-09-01", "end_date": "2025-09-15",
+    })
+    assert changed()
+    # a failed write (conflict) leaves the version alone
+    client.post("/bookings", json=_booking_payload(room.id))
+    client.post("/bookings", json=_booking_payload(room.id))
+    assert changed()
+    assert not changed()
@@ -0,0 +1,103 @@
+import csv
+import io
+import json
+import tracemalloc
+import pytest
+from fastapi.testclient import TestClient
+from datetime import datetime, timedelta
+
+from app.main import app
+from app.database import Base, engine, SessionLocal
+from app import models, export
+
+@pytest.fixture(autouse=True)
+def setup_db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture()
+def client():
+    return TestClient(app)
+
+@pytest.fixture()
+def db():
+    s = SessionLocal()
+    try:
+        yield s
+    finally:
+        s.close()
+
+
+def seed(db, n, room_name="志希 116"):
+    room = models.Room(name=room_name)
+    db.add(room); db.commit(); db.refresh(room)
+    base = datetime(2031, 3, 3, 8)
+    db.execute(models.Booking.__table__.insert(), [
+        dict(
+            room_id=room.id, user_name=f"王{i}", user_identity="教師", purpose="課程, 討論",
+            category=models.BookingCategory.activity, start_time=base + timedelta(hours=i), end_time=base + timedelta(hours=i, minutes=30),
+            status=models.BookingStatus.approved if i % 2 else models.BookingStatus.pending, is_semester=False,
+            created_at=base, requested_at=base,
+        )
+        for i in range(n)
+    ])
+    db.commit()
+    return room
+
+
+def test_csv_export_has_header_filters_and_order(client, db):
+    room = seed(db, 10)
+    r = client.get("/admin/bookings/export", params={"status": "approved"})
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/csv")
+    assert "attachment" in r.headers["content-disposition"]
+    text = r.content.decode("utf-8")
+    assert text.startswith("\ufeff")
+    rows = list(csv.DictReader(io.StringIO(text.lstrip("\ufeff"))))
+    assert [row["user_name"] for row in rows] == ["王9", "王7", "王5", "王3", "王1"]
+    assert rows[0]["room_name"] == room.name
+    assert rows[0]["purpose"] == "課程, 討論"
+    assert rows[0]["start_time"] == "2031-03-03T17:00:00+08:00"
+    assert rows[0]["status"] == "approved"
+
+
+def test_ndjson_export_with_date_range(client, db):
+    seed(db, 10)
+    r = client.get("/admin/bookings/export", params={
+        "format": "ndjson", "from": "2031-03-03T10:00:00+08:00", "to": "2031-03-03T13:00:00+08:00",
+    })
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in r.text.splitlines()]
+    assert [row["user_name"] for row in lines] == ["王4", "王3", "王2"]
+    assert set(lines[0]) == set(export.FIELDS)
+
+
+def test_export_rejects_unknown_format(client):
+    assert client.get("/admin/bookings/export", params={"format": "xlsx"}).status_code == 422
+
+
+def test_export_streams_fixed_size_batches(db):
+    seed(db, 120)
+    chunks = list(export.stream("ndjson", {}, batch_size=50))
+    assert [c.count(b"\n") for c in chunks] == [50, 50, 20]
+
+
+def _peak_export_memory(batch_size):
+    tracemalloc.start()
+    try:
+        for _ in export.stream("csv", {}, batch_size=batch_size):
+            pass
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_export_memory_does_not_grow_with_row_count(db):
+    seed(db, 500, room_name="小")
+    small = _peak_export_memory(100)
+    seed(db, 9500, room_name="大")
+    large = _peak_export_memory(100)
+    assert large < small * 2
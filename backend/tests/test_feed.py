@@ -0,0 +1,88 @@
+import asyncio
+import json
+import pytest
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from app.database import Base, engine, SessionLocal
+from app import models, schemas, crud, feed
+
+TZ = ZoneInfo("Asia/Taipei")
+
+@pytest.fixture(autouse=True)
+def setup_db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture()
+def db():
+    s = SessionLocal()
+    try:
+        yield s
+    finally:
+        s.close()
+
+
+def seed_room(db, name):
+    r = models.Room(name=name)
+    db.add(r); db.commit(); db.refresh(r)
+    return r
+
+
+def _booking_in(room_id):
+    start = (datetime.now(TZ) + timedelta(days=1)).replace(hour=9, minute=0, second=0, microsecond=0)
+    return schemas.BookingCreate(room_id=room_id, user_name="u", user_identity="i", category="activity",
+                                 start_time=start, end_time=start + timedelta(hours=1))
+
+
+def _parse(frame):
+    fields = dict(line.split(": ", 1) for line in frame.strip().splitlines() if not line.startswith(":"))
+    return fields["event"], json.loads(fields["data"])
+
+
+def test_stream_delivers_filtered_events_from_worker_threads(db):
+    watched = seed_room(db, "訂閱室")
+    other = seed_room(db, "其他室")
+    watched_id, other_id = watched.id, other.id
+
+    async def scenario():
+        async def connected():
+            return False
+        stream = feed.sse_stream(watched_id, connected, heartbeat=5)
+        assert (await anext(stream)).startswith("retry:")
+        assert feed.hub.subscriber_count() == 1
+
+        def writes():
+            with SessionLocal() as s:
+                crud.create_booking(s, _booking_in(other_id))
+                b = crud.create_booking(s, _booking_in(watched_id))
+                crud.update_booking_status(s, b.id, models.BookingStatus.approved)
+                crud.delete_booking(s, b.id)
+                return b.id
+        booking_id = await asyncio.to_thread(writes)
+        frames = [await asyncio.wait_for(anext(stream), 2) for _ in range(3)]
+        await stream.aclose()
+        return booking_id, [_parse(f) for f in frames]
+
+    booking_id, events = asyncio.run(scenario())
+    assert [e for e, _ in events] == ["created", "status_changed", "deleted"]
+    assert all(p["id"] == booking_id and p["room_id"] == watched_id for _, p in events)
+    assert events[1][1]["status"] == "approved"
+    assert feed.hub.subscriber_count() == 0
+
+
+def test_stream_heartbeats_and_stops_on_disconnect():
+    async def scenario():
+        state = {"gone": False}
+        async def is_disconnected():
+            return state["gone"]
+        stream = feed.sse_stream(None, is_disconnected, heartbeat=0.01)
+        await anext(stream)
+        assert await anext(stream) == ": keep-alive\n\n"
+        state["gone"] = True
+        return [frame async for frame in stream]
+
+    assert asyncio.run(scenario()) == []
+    assert feed.hub.subscriber_count() == 0
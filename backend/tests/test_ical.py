@@ -0,0 +1,135 @@
+import pytest
+from fastapi.testclient import TestClient
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from zoneinfo import ZoneInfo
+
+from app.main import app
+from app.database import Base, engine, SessionLocal, all_engines
+from app import models, ical
+
+TZ = ZoneInfo("Asia/Taipei")
+
+@pytest.fixture(autouse=True)
+def setup_db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture()
+def client():
+    return TestClient(app)
+
+@pytest.fixture()
+def db():
+    s = SessionLocal()
+    try:
+        yield s
+    finally:
+        s.close()
+
+
+def _day(offset, hour):
+    return (datetime.now(TZ) + timedelta(days=offset)).replace(hour=hour, minute=0, second=0, microsecond=0, tzinfo=None)
+
+
+def seed_room(db, name):
+    r = models.Room(name=name)
+    db.add(r); db.commit(); db.refresh(r)
+    return r
+
+
+def seed_booking(db, room, start, end, status=models.BookingStatus.approved, purpose="微積分, 習題課"):
+    b = models.Booking(
+        room_id=room.id, user_name="王小明", user_identity="教師", purpose=purpose,
+        category=models.BookingCategory.course, start_time=start, end_time=end, status=status,
+    )
+    db.add(b); db.commit(); db.refresh(b)
+    return b.id
+
+
+def _unfold(text):
+    return text.replace("\r\n ", "")
+
+
+def test_room_feed_contents_and_windows(client, db):
+    room = seed_room(db, "志希 116")
+    ok = seed_booking(db, room, _day(1, 9), _day(1, 11))
+    pending = seed_booking(db, room, _day(2, 9), _day(2, 10), models.BookingStatus.pending)
+    seed_booking(db, room, _day(3, 9), _day(3, 10), models.BookingStatus.rejected)
+    seed_booking(db, room, _day(-ical.ICS_LOOKBACK_DAYS - 2, 9), _day(-ical.ICS_LOOKBACK_DAYS - 2, 10))
+    seed_booking(db, room, _day(ical.ICS_LOOKAHEAD_DAYS + 2, 9), _day(ical.ICS_LOOKAHEAD_DAYS + 2, 10))
+
+    r = client.get(f"/rooms/{room.id}.ics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/calendar")
+    assert all(len(line.encode()) <= 75 for line in r.content.decode().split("\r\n"))
+    text = _unfold(r.text)
+    assert text.startswith("BEGIN:VCALENDAR\r\n") and text.endswith("END:VCALENDAR\r\n")
+    assert text.count("BEGIN:VEVENT") == 1
+    assert f"UID:booking-{ok}@" in text
+    start_utc = _day(1, 9).replace(tzinfo=TZ).astimezone(ZoneInfo("UTC")).strftime("%Y%m%dT%H%M%SZ")
+    assert f"DTSTART:{start_utc}" in text
+    assert "SUMMARY:微積分\\, 習題課（王小明）" in text
+    assert "X-WR-CALNAME:志希 116" in text
+
+    text = _unfold(client.get(f"/rooms/{room.id}.ics", params={"include_pending": "true"}).text)
+    assert text.count("BEGIN:VEVENT") == 2
+    assert f"UID:booking-{pending}@" in text and "STATUS:TENTATIVE" in text
+
+
+def test_all_rooms_feed_and_unknown_room(client, db):
+    a = seed_room(db, "A101")
+    b = seed_room(db, "B202")
+    seed_booking(db, a, _day(1, 9), _day(1, 10))
+    seed_booking(db, b, _day(1, 9), _day(1, 10))
+    text = client.get("/rooms.ics").text
+    assert text.count("BEGIN:VEVENT") == 2
+    assert "LOCATION:A101" in text and "LOCATION:B202" in text
+    assert client.get("/rooms/999.ics").status_code == 404
+
+
+def test_feed_cache_and_etag_are_scoped_to_the_room(client, db):
+    a = seed_room(db, "A101")
+    b = seed_room(db, "B202")
+    r_a = client.get(f"/rooms/{a.id}.ics")
+    r_all = client.get("/rooms.ics")
+    etag_a, etag_all = r_a.headers["ETag"], r_all.headers["ETag"]
+
+    statements = []
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    for e in all_engines():
+        event.listen(e, "before_cursor_execute", _before)
+    try:
+        assert client.get(f"/rooms/{a.id}.ics", headers={"If-None-Match": etag_a}).status_code == 304
+        assert client.get(f"/rooms/{a.id}.ics").content == r_a.content     # served from cache
+    finally:
+        for e in all_engines():
+            event.remove(e, "before_cursor_execute", _before)
+    assert statements == []
+
+    # a booking in room B leaves room A's feed valid but changes the all-rooms feed
+    start = (datetime.now(TZ) + timedelta(days=1)).replace(hour=9, minute=0, second=0, microsecond=0)
+    created = client.post("/bookings", json={
+        "room_id": b.id, "user_name": "u", "user_identity": "i", "purpose": "p", "category": "activity",
+        "start_time": start.isoformat(), "end_time": (start + timedelta(hours=1)).isoformat(),
+    })
+    assert created.status_code == 200
+    assert client.get(f"/rooms/{a.id}.ics", headers={"If-None-Match": etag_a}).status_code == 304
+    assert client.get("/rooms.ics", headers={"If-None-Match": etag_all}).status_code == 200
+
+    # status changes in room B still leave room A's feed valid
+    client.patch(f"/admin/bookings/{created.json()['id']}", json={"status": "approved"})
+    assert client.get(f"/rooms/{a.id}.ics", headers={"If-None-Match": etag_a}).status_code == 304
+    r_b = client.get(f"/rooms/{b.id}.ics")
+    assert r_b.text.count("BEGIN:VEVENT") == 1
+
+
+def test_fold_keeps_utf8_characters_whole():
+    line = "SUMMARY:" + "數學系教室借用" * 10
+    folded = ical._fold(line)
+    parts = folded.split("\r\n")
+    assert all(len(p.encode("utf-8")) <= 75 for p in parts)
+    assert "".join(p[1:] if i else p for i, p in enumerate(parts)) == line
@@ -0,0 +1,97 @@
+import json
+import logging
+import logging.handlers
+import queue
+import threading
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from app import logsetup
+
+TZ = ZoneInfo("Asia/Taipei")
+
+
+def make_record(msg, *args, level=logging.INFO):
+    return logging.LogRecord("math_office.crud", level, __file__, 1, msg, args, None)
+
+
+def test_json_formatter_turns_key_placeholders_into_fields():
+    start = datetime(2031, 3, 3, 10, tzinfo=TZ)
+    record = make_record("semester_try room=%s start=%s end=%s week_index=%d", 3, start, start.replace(hour=11), 0)
+    out = json.loads(logsetup.JsonFormatter().format(record))
+    assert out["event"] == "semester_try" and out["logger"] == "math_office.crud"
+    assert out["room"] == 3 and out["week_index"] == 0
+    assert out["start"] == "2031-03-03T10:00:00+08:00"
+    assert "message" not in out
+
+    details = ((7, "approved", start, start.replace(hour=11)),)
+    record = make_record("booking_conflict room=%s count=%d details=%s", 3, 1, details)
+    out = json.loads(logsetup.JsonFormatter().format(record))
+    assert out["details"] == [[7, "approved", "2031-03-03T10:00:00+08:00", "2031-03-03T11:00:00+08:00"]]
+
+    # an unnamed placeholder: fall back to the rendered message
+    out = json.loads(logsetup.JsonFormatter().format(make_record("database url=%s pool=%s %s", "sqlite://", "QueuePool", "x=1")))
+    assert out["event"] == "database" and out["message"] == "database url=sqlite:// pool=QueuePool x=1"
+
+
+def test_sampling_keeps_an_even_share_of_configured_events():
+    f = logsetup.SamplingFilter(logsetup.parse_sample_rates("semester_try=0.25, semester_created=0"))
+    kept = [f.filter(make_record("semester_try room=%s", i)) for i in range(8)]
+    assert kept == [False, False, False, True] * 2
+    assert not any(f.filter(make_record("semester_created booking_id=%s", i)) for i in range(5))
+    assert all(f.filter(make_record("booking_conflict room=%s", i)) for i in range(5))
+    record = make_record("semester_try room=%s", 1)
+    for _ in range(4):
+        passed = f.filter(record)
+    assert passed and record.sample_rate == 0.25
+
+
+def test_parse_sample_rates_rejects_bad_entries():
+    import pytest
+    assert logsetup.parse_sample_rates("") == {}
+    for raw in ("semester_try", "semester_try=2"):
+        with pytest.raises(ValueError):
+            logsetup.parse_sample_rates(raw)
+
+
+class _Probe:
+    """Log argument that records which thread renders it."""
+    def __init__(self):
+        self.thread = None
+
+    def __str__(self):
+        self.thread = threading.current_thread()
+        return "probe"
+
+
+def test_records_are_formatted_on_the_listener_thread_and_never_block():
+    q = queue.Queue(maxsize=1)
+    handler = logsetup.DeferredQueueHandler(q)
+    logger = logging.getLogger("math_office.test_logsetup")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.addHandler(handler)
+    lines = []
+
+    class _Collect(logging.Handler):
+        def emit(self, record):
+            lines.append(self.format(record))
+
+    target = _Collect()
+    target.setFormatter(logging.Formatter("%(message)s"))
+    try:
+        probe = _Probe()
+        logger.info("booking_created id=%s", probe)
+        assert probe.thread is None  # nothing formatted in the caller
+        dropped = logsetup.log_records_dropped.value()
+        logger.info("booking_created id=%s", 2)  # queue is full: dropped, not blocked
+        assert logsetup.log_records_dropped.value() == dropped + 1
+
+        listener = logging.handlers.QueueListener(q, target)
+        listener.start()
+        listener.stop()
+    finally:
+        logger.removeHandler(handler)
+        logger.propagate = True
+    assert lines == ["booking_created id=probe"]
+    assert probe.thread is not threading.current_thread() and probe.thread is not None
@@ -0,0 +1,130 @@
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from datetime import datetime, timedelta
+
+from app.main import app
+from app.database import Base, engine, SessionLocal
+from app import models, metrics
+
+@pytest.fixture(autouse=True)
+def setup_db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture()
+def client():
+    return TestClient(app)
+
+@pytest.fixture()
+def db():
+    s = SessionLocal()
+    try:
+        yield s
+    finally:
+        s.close()
+
+
+def scrape(client) -> dict:
+    r = client.get("/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain; version=0.0.4")
+    samples = {}
+    for line in r.text.splitlines():
+        if line and not line.startswith("#"):
+            name, _, value = line.rpartition(" ")
+            samples[name] = float(value)
+    return samples
+
+
+def delta(before, after, key):
+    return after.get(key, 0.0) - before.get(key, 0.0)
+
+
+def booking_payload(room_id, start):
+    return {
+        "room_id": room_id, "user_name": "u", "user_identity": "i", "purpose": "p", "category": "activity",
+        "start_time": start.isoformat(), "end_time": (start + timedelta(hours=1)).isoformat(),
+    }
+
+
+def test_request_counts_latency_and_db_time_by_route_template(client, db):
+    room = models.Room(name="R1")
+    db.add(room); db.commit(); db.refresh(room)
+    before = scrape(client)
+    assert client.get(f"/rooms/{room.id}").status_code == 200
+    assert client.get("/rooms/999999").status_code == 404
+    assert client.get("/no/such/path").status_code == 404
+    after = scrape(client)
+
+    route = 'route="/rooms/{room_id}"'
+    assert delta(before, after, f'http_requests_total{{method="GET",{route},status="200"}}') == 1
+    assert delta(before, after, f'http_requests_total{{method="GET",{route},status="404"}}') == 1
+    assert delta(before, after, 'http_requests_total{method="GET",route="<unmatched>",status="404"}') == 1
+    assert delta(before, after, f'http_request_duration_seconds_count{{method="GET",{route}}}') == 2
+    assert delta(before, after, f'http_request_duration_seconds_bucket{{method="GET",{route},le="+Inf"}}') == 2
+    assert delta(before, after, f"http_request_db_seconds_count{{{route}}}") == 2
+    assert delta(before, after, f"http_request_db_seconds_sum{{{route}}}") > 0
+    assert delta(before, after, f"http_request_db_statements_total{{{route}}}") >= 2
+    # the scrape itself is the only request in flight
+    assert after["http_requests_in_flight"] == 1
+
+
+def test_domain_counters(client, db):
+    room = models.Room(name="R1")
+    db.add(room); db.commit(); db.refresh(room)
+    start = datetime(2031, 3, 3, 10)  # Monday
+    before = scrape(client)
+    assert client.post("/bookings", json=booking_payload(room.id, start)).status_code == 200
+    assert client.post("/bookings", json=booking_payload(room.id, start)).status_code == 409
+    semester = {
+        "room_id": room.id, "category": "activity", "user_name": "u", "user_identity": "i", "purpose": "p",
+        "start_time_hm": "10:00", "end_time_hm": "11:00", "start_date": "2031-03-03", "end_date": "2031-03-17",
+    }
+    resp = client.post("/admin/semester_bookings", json=semester)
+    assert resp.status_code == 200 and len(resp.json()["created_ids"]) == 2
+    after = scrape(client)
+
+    assert delta(before, after, 'bookings_created_total{kind="single"}') == 1
+    assert delta(before, after, 'bookings_created_total{kind="semester"}') == 2
+    assert delta(before, after, "booking_conflicts_total") == 1
+    assert delta(before, after, 'semester_skipped_total{reason="conflict"}') == 1
+
+
+def test_histogram_rendering_is_cumulative():
+    h = metrics.Histogram("test_render_seconds", "test only", ("k",), buckets=(0.1, 1.0))
+    try:
+        for v in (0.05, 0.5, 0.5, 3.0):
+            h.observe(v, 'a"b')
+        lines = h.render()
+    finally:
+        metrics._registry.remove(h)
+    assert lines[2:] == [
+        'test_render_seconds_bucket{k="a\\"b",le="0.1"} 1',
+        'test_render_seconds_bucket{k="a\\"b",le="1.0"} 3',
+        'test_render_seconds_bucket{k="a\\"b",le="+Inf"} 4',
+        'test_render_seconds_sum{k="a\\"b"} 4.05',
+        'test_render_seconds_count{k="a\\"b"} 4',
+    ]
+
+
+def test_streams_are_counted_apart_from_request_latency():
+    seen = {}
+
+    async def sse(scope, receive, send):
+        seen["open"] = metrics.http_open_streams.value()
+        seen["in_flight"] = metrics.http_in_flight.value()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+
+    async def noop(message):
+        pass
+
+    scope = {"type": "http", "method": "GET", "path": "/bookings/stream"}
+    before = (metrics.http_requests.value("GET", "<unmatched>", "200"), metrics.http_latency.value("GET", "<unmatched>"))
+    asyncio.run(metrics.MetricsMiddleware(sse)(scope, None, noop))
+    assert seen == {"open": 1, "in_flight": 0}
+    assert metrics.http_open_streams.value() == 0
+    assert metrics.http_requests.value("GET", "<unmatched>", "200") == before[0] + 1
+    assert metrics.http_latency.value("GET", "<unmatched>") == before[1]
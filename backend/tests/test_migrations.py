@@ -0,0 +1,119 @@
+import pytest
+import importlib.util
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import create_engine, event, inspect, text
+
+from app import migrations, models
+from app.database import Base
+
+
+@pytest.fixture()
+def scratch_engine(tmp_path):
+    e = create_engine(f"sqlite:///{tmp_path / 'm.db'}")
+    yield e
+    e.dispose()
+
+
+def count_statements(engine, fn):
+    statements = []
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    event.listen(engine, "before_cursor_execute", _before)
+    try:
+        fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", _before)
+    return statements
+
+
+def test_upgrade_from_empty_matches_models(scratch_engine):
+    assert migrations.ensure_schema(scratch_engine) == "upgraded"
+    assert migrations.current_revision(scratch_engine) == migrations.head_revision()
+    with scratch_engine.connect() as conn:
+        diffs = compare_metadata(MigrationContext.configure(conn, opts={"compare_type": True}), Base.metadata)
+        rooms = conn.execute(text("SELECT name FROM rooms ORDER BY id")).scalars().all()
+    assert diffs == []
+    assert rooms[0] == "志希 116" and len(rooms) == 6
+
+
+def test_startup_check_at_head_is_one_statement(scratch_engine):
+    migrations.ensure_schema(scratch_engine)
+    result = []
+    statements = count_statements(scratch_engine, lambda: result.append(migrations.ensure_schema(scratch_engine)))
+    assert result == ["current"]
+    assert statements == ["SELECT version_num FROM alembic_version"]
+
+
+LEGACY_SCHEMA = [
+    # create_all output before is_semester existed, with the old single-column indexes
+    "CREATE TABLE rooms (id INTEGER NOT NULL, name VARCHAR NOT NULL, description VARCHAR, PRIMARY KEY (id))",
+    "CREATE UNIQUE INDEX ix_rooms_name ON rooms (name)",
+    "CREATE INDEX ix_rooms_id ON rooms (id)",
+    "CREATE TABLE bookings (id INTEGER NOT NULL, room_id INTEGER NOT NULL, user_name VARCHAR NOT NULL, "
+    "user_identity VARCHAR NOT NULL, purpose VARCHAR, category VARCHAR(8) NOT NULL, start_time DATETIME NOT NULL, "
+    "end_time DATETIME NOT NULL, status VARCHAR(8), created_at DATETIME NOT NULL, requested_at DATETIME NOT NULL, "
+    "PRIMARY KEY (id), FOREIGN KEY(room_id) REFERENCES rooms (id))",
+    "CREATE INDEX ix_bookings_id ON bookings (id)",
+    "CREATE INDEX ix_bookings_room_id ON bookings (room_id)",
+    "CREATE INDEX ix_bookings_category ON bookings (category)",
+    "CREATE INDEX ix_bookings_start_time ON bookings (start_time)",
+    "CREATE INDEX ix_bookings_end_time ON bookings (end_time)",
+    "CREATE INDEX ix_bookings_status ON bookings (status)",
+    "INSERT INTO rooms (id, name, description) VALUES (1, '116', NULL), (2, '電腦教室', '舊說明')",
+    "INSERT INTO bookings VALUES (1, 1, 'u', 'i', 'p', 'activity', '2031-03-03 10:00:00', '2031-03-03 11:00:00', "
+    "'approved', '2031-01-01 00:00:00', '2031-01-01 00:00:00')",
+]
+
+
+def test_legacy_database_is_stamped_and_upgraded(scratch_engine):
+    with scratch_engine.begin() as conn:
+        for sql in LEGACY_SCHEMA:
+            conn.execute(text(sql))
+    assert migrations.ensure_schema(scratch_engine) == "upgraded"
+    assert migrations.current_revision(scratch_engine) == migrations.head_revision()
+
+    insp = inspect(scratch_engine)
+    assert "is_semester" in {c["name"] for c in insp.get_columns("bookings")}
+    indexes = {i["name"] for i in insp.get_indexes("bookings")}
+    assert {"ix_bookings_end_start_min", "ix_bookings_room_end_start_min", "ix_bookings_start_id", "ix_bookings_is_semester"} <= indexes
+    assert not indexes & {"ix_bookings_start_time", "ix_bookings_end_time", "ix_bookings_end_start", "ix_bookings_room_end_start"}
+    with scratch_engine.connect() as conn:
+        assert conn.execute(text("SELECT id, name, description FROM rooms ORDER BY id")).all() == [
+            (1, "志希 116", None), (2, "志希樓電腦教室", None),
+        ]
+        assert conn.execute(text("SELECT id, is_semester FROM bookings")).all() == [(1, 0)]
+        # backfilled from the Asia/Taipei wall times
+        assert conn.execute(text("SELECT start_min, end_min FROM bookings")).one() == (
+            models.epoch_minute(datetime(2031, 3, 3, 10)), models.epoch_minute(datetime(2031, 3, 3, 11)),
+        )
+
+
+def test_epoch_minute_backfill_without_dialect_sql_matches_the_models(scratch_engine):
+    path = Path(migrations.SCRIPT_LOCATION) / "versions" / "0005_booking_epoch_minutes.py"
+    spec = importlib.util.spec_from_file_location("epoch_minutes_0005", path)
+    revision = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(revision)
+    migrations.ensure_schema(scratch_engine)
+    starts = [datetime(2031, 3, 3, 10), datetime(1969, 12, 31, 23, 59), datetime(2031, 3, 3, 10, 0, 30)]
+    with scratch_engine.begin() as conn:
+        for i, start in enumerate(starts, 1):
+            conn.execute(text(
+                "INSERT INTO bookings (id, room_id, user_name, user_identity, category, start_time, end_time, status, "
+                "created_at, requested_at, is_semester, start_min, end_min) "
+                "VALUES (:id, 1, 'u', 'i', 'activity', :start, :end, 'approved', :start, :start, 0, 0, 0)"
+            ), {"id": i, "start": start, "end": datetime(2031, 3, 3, 11)})
+        revision.BACKFILL_BATCH = 2  # two batches
+        with Operations.context(MigrationContext.configure(conn)):
+            revision._backfill_in_python()
+        rows = conn.execute(text("SELECT start_min, end_min FROM bookings ORDER BY id")).all()
+    assert rows == [(models.epoch_minute(s), models.epoch_minute(datetime(2031, 3, 3, 11))) for s in starts]
+
+
+def test_out_of_date_schema_without_auto_migrate_refuses_to_start(scratch_engine):
+    with pytest.raises(RuntimeError, match="alembic upgrade head"):
+        migrations.ensure_schema(scratch_engine, migrate=False)
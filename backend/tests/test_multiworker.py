@@ -0,0 +1,160 @@
+import asyncio
+import pytest
+import httpx
+from fastapi.testclient import TestClient
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, insert, text
+from zoneinfo import ZoneInfo
+
+from app.main import app
+from app.database import Base, engine, SessionLocal
+from app import models, changes, conflict_index, migrations, multiworker
+
+TZ = ZoneInfo("Asia/Taipei")
+
+@pytest.fixture(autouse=True)
+def setup_db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    multiworker.install(engine)
+    yield
+    multiworker.uninstall()
+    conflict_index.index.clear()
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture()
+def client():
+    return TestClient(app)
+
+@pytest.fixture()
+def db():
+    s = SessionLocal()
+    try:
+        yield s
+    finally:
+        s.close()
+
+
+def _day(offset, hour):
+    return (datetime.now(TZ) + timedelta(days=offset)).replace(hour=hour, minute=0, second=0, microsecond=0, tzinfo=None)
+
+
+def seed_room(db, name):
+    r = models.Room(name=name)
+    db.add(r); db.commit(); db.refresh(r)
+    return r
+
+
+def payload(room_id, start):
+    return {
+        "room_id": room_id, "user_name": "u", "user_identity": "i", "purpose": "p", "category": "activity",
+        "start_time": start.isoformat(), "end_time": (start + timedelta(hours=1)).isoformat(),
+    }
+
+
+def remote_write(room_id, start):
+    """What another worker's POST /bookings leaves in the database, without touching this process."""
+    with engine.begin() as conn:
+        conn.execute(insert(models.Booking.__table__).values(
+            room_id=room_id, user_name="other", user_identity="i", purpose="其他 worker",
+            category=models.BookingCategory.activity, status=models.BookingStatus.approved,
+            start_time=start, end_time=start + timedelta(hours=1), is_semester=False,
+        ))
+        multiworker.record(conn, {room_id}, {})
+
+
+def versions():
+    with engine.connect() as conn:
+        return dict(conn.execute(text("SELECT scope, version FROM data_version")).all())
+
+
+def test_writes_bump_the_shared_version_in_their_transaction(client, db):
+    r1, r2 = seed_room(db, "R1"), seed_room(db, "R2")
+    base = versions()[multiworker.GLOBAL]
+    assert changes.current() == base  # our own commit, nothing to sync
+
+    assert client.post("/bookings", json=payload(r1.id, _day(1, 10))).status_code == 200
+    assert client.post("/bookings", json=payload(r1.id, _day(1, 10))).status_code == 409  # rolled back, no bump
+    assert client.post("/bookings", json=payload(r2.id, _day(1, 10))).status_code == 200
+    v = versions()
+    assert v[multiworker.GLOBAL] == base + 2 == changes.current()
+    assert (v[r1.id], v[r2.id]) == (base + 1, base + 2)
+    assert v[multiworker.ALL_ROOMS] == base  # the room inserts
+
+    booking_id = client.get("/bookings").json()[0]["id"]
+    assert client.patch("/admin/bookings", json={"ids": [booking_id], "status": "rejected"}).status_code == 200
+    assert versions()[multiworker.GLOBAL] == base + 3 == changes.current()
+
+
+def test_remote_write_invalidates_weekly_and_room_feeds(client, db):
+    r1, r2 = seed_room(db, "R1"), seed_room(db, "R2")
+    weekly = client.get("/rooms/weekly")
+    feed1, feed2 = client.get(f"/rooms/{r1.id}.ics"), client.get(f"/rooms/{r2.id}.ics")
+    assert client.get("/rooms/weekly", headers={"If-None-Match": weekly.headers["etag"]}).status_code == 304
+
+    remote_write(r1.id, _day(1, 10))
+
+    again = client.get("/rooms/weekly", headers={"If-None-Match": weekly.headers["etag"]})
+    assert again.status_code == 200 and again.headers["etag"] != weekly.headers["etag"]
+    purposes = [b["purpose"] for room in again.json() for b in room["bookings"]]
+    assert purposes == ["其他 worker"]
+    assert client.get(f"/rooms/{r1.id}.ics", headers={"If-None-Match": feed1.headers["etag"]}).status_code == 200
+    # other rooms' feeds keep their tag
+    assert client.get(f"/rooms/{r2.id}.ics", headers={"If-None-Match": feed2.headers["etag"]}).status_code == 304
+
+
+def test_conflict_index_reloads_rooms_written_elsewhere(client, db, monkeypatch):
+    monkeypatch.setattr(conflict_index, "MODE", "on")
+    r1, r2 = seed_room(db, "R1"), seed_room(db, "R2")
+    conflict_index.index.warm(db)
+    remote_write(r1.id, _day(1, 10))
+
+    assert client.post("/bookings", json=payload(r1.id, _day(1, 10))).status_code == 409
+    assert conflict_index.index.fresh(r1.id)
+    assert client.post("/bookings", json=payload(r1.id, _day(1, 12))).status_code == 200
+    assert client.post("/bookings", json=payload(r2.id, _day(1, 10))).status_code == 200
+
+
+def test_sync_skips_probes_and_runs_off_the_event_loop(client, db, monkeypatch):
+    calls = []
+    def recording_sync(e):
+        try:
+            asyncio.get_running_loop()
+            calls.append("event loop")
+        except RuntimeError:
+            calls.append("worker thread")
+        return False
+    monkeypatch.setattr(multiworker, "sync_engine", recording_sync)
+    for path in ("/healthz", "/metrics", "/openapi.json"):
+        client.get(path)
+    assert calls == []
+    assert client.get("/rooms").status_code == 200
+    assert calls == ["worker thread"]
+
+
+def test_two_servers_on_one_database_agree(tmp_path):
+    from benchmarks.loadtest import start_server, stop_server
+
+    path = tmp_path / "shared.db"
+    e = create_engine(f"sqlite:///{path}")
+    migrations.ensure_schema(e)
+    e.dispose()
+    env = {"MULTI_WORKER": "true", "CONFLICT_INDEX": "on", "LOG_LEVEL": "WARNING"}
+    a, url_a = start_server(str(path), str(tmp_path / "a.log"), env_extra=env)
+    try:
+        b, url_b = start_server(str(path), str(tmp_path / "b.log"), env_extra=env)
+        try:
+            tag_a = httpx.get(f"{url_a}/rooms/weekly").headers["etag"]
+            assert httpx.get(f"{url_b}/rooms/weekly").headers["etag"] == tag_a
+
+            slot = payload(1, _day(1, 10))
+            assert httpx.post(f"{url_b}/bookings", json=slot).status_code == 200
+            assert httpx.post(f"{url_a}/bookings", json=slot).status_code == 409  # A's index saw B's write
+
+            r = httpx.get(f"{url_a}/rooms/weekly", headers={"If-None-Match": tag_a})
+            assert r.status_code == 200 and r.headers["etag"] == httpx.get(f"{url_b}/rooms/weekly").headers["etag"]
+            assert sum(len(room["bookings"]) for room in r.json()) == 1
+        finally:
+            stop_server(b)
+    finally:
+        stop_server(a)
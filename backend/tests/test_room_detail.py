@@ -0,0 +1,85 @@
+import pytest
+from fastapi.testclient import TestClient
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from zoneinfo import ZoneInfo
+
+from app.main import app
+from app.database import Base, engine, SessionLocal, all_engines
+from app import models
+
+TZ = ZoneInfo("Asia/Taipei")
+
+@pytest.fixture(autouse=True)
+def setup_db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture()
+def client():
+    return TestClient(app)
+
+@pytest.fixture()
+def db():
+    s = SessionLocal()
+    try:
+        yield s
+    finally:
+        s.close()
+
+
+def seed(db, past_days=0):
+    room = models.Room(name="詳情室")
+    db.add(room); db.commit(); db.refresh(room)
+    tomorrow = (datetime.now(TZ) + timedelta(days=1)).replace(hour=9, minute=0, second=0, microsecond=0)
+    starts = [tomorrow, tomorrow + timedelta(days=2), tomorrow + timedelta(days=60)]
+    starts += [tomorrow - timedelta(days=10 + d) for d in range(past_days)]
+    for st in starts:
+        db.add(models.Booking(room_id=room.id, user_name="u", user_identity="i",
+                              category=models.BookingCategory.activity,
+                              start_time=st, end_time=st + timedelta(hours=1)))
+    db.commit()
+    return room, tomorrow
+
+
+def test_default_window_is_upcoming_only(client, db):
+    room, tomorrow = seed(db, past_days=5)
+    r = client.get(f"/rooms/{room.id}")
+    assert r.status_code == 200, r.text
+    data = r.json()
+    assert len(data["bookings"]) == 2
+    starts = [b["start_time"] for b in data["bookings"]]
+    assert starts == sorted(starts)
+
+
+def test_explicit_range_and_limit(client, db):
+    room, tomorrow = seed(db, past_days=5)
+    params = {"from": (tomorrow - timedelta(days=30)).isoformat(), "to": (tomorrow + timedelta(days=90)).isoformat()}
+    r = client.get(f"/rooms/{room.id}", params=params)
+    assert len(r.json()["bookings"]) == 8
+    r2 = client.get(f"/rooms/{room.id}", params=params | {"limit": 3})
+    assert len(r2.json()["bookings"]) == 3
+
+
+def test_room_not_found(client):
+    assert client.get("/rooms/999").status_code == 404
+
+
+def test_query_count_flat_with_history(client, db):
+    room, _ = seed(db, past_days=40)
+    room_id = room.id
+    db.expunge_all()
+    statements = []
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    for e in all_engines():
+        event.listen(e, "before_cursor_execute", _before)
+    try:
+        r = client.get(f"/rooms/{room_id}")
+    finally:
+        for e in all_engines():
+            event.remove(e, "before_cursor_execute", _before)
+    assert r.status_code == 200
+    assert len(statements) == 2
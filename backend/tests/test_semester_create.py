@@ -1,11 +1,12 @@
 import pytest
-from datetime import date
+from datetime import date, datetime
 from fastapi.testclient import TestClient
+from sqlalchemy import event, select
 from zoneinfo import ZoneInfo
 
 from app.main import app
 from app.database import Base, engine, SessionLocal
-from app import models
+from app import models, schemas, crud
 
 TZ = ZoneInfo('Asia/Taipei')
 
@@ -80,3 +81,57 @@ def test_semester_reject_end_before_start(client, db):
     data = resp.json()
     assert data['created_ids'] == []
 
+
+
+def _semester_payload(room_id, start, end, hm=('13:00', '14:30')):
+    return schemas.SemesterBookingCreate(
+        room_id=room_id, category='activity', user_name='u', user_identity='i', purpose='p',
+        start_time_hm=hm[0], end_time_hm=hm[1], start_date=start, end_date=end,
+    )
+
+
+def test_semester_bulk_matches_per_week_path(db):
+    r1 = create_room(db, 'bulk')
+    r2 = create_room(db, 'each')
+    for r in (r1, r2):
+        # existing booking blocks the second Monday only
+        db.add(models.Booking(room_id=r.id, user_name='x', user_identity='y', category=models.BookingCategory.activity,
+                              start_time=datetime(2025, 9, 22, 14, 0, tzinfo=TZ), end_time=datetime(2025, 9, 22, 15, 0, tzinfo=TZ)))
+        # rejected bookings never block
+        db.add(models.Booking(room_id=r.id, user_name='x', user_identity='y', category=models.BookingCategory.activity,
+                              start_time=datetime(2025, 9, 29, 13, 0, tzinfo=TZ), end_time=datetime(2025, 9, 29, 14, 0, tzinfo=TZ),
+                              status=models.BookingStatus.rejected))
+    db.commit()
+    start, end = date(2025, 9, 15), date(2025, 10, 13)
+    bulk_ids, bulk_skipped = crud.create_semester_bookings(db, _semester_payload(r1.id, start, end))
+    each_ids, each_skipped = crud.create_semester_bookings(db, _semester_payload(r2.id, start, end), bulk=False)
+    assert len(bulk_ids) == len(each_ids) == 4
+    assert bulk_skipped == each_skipped == ['2025-09-22T13:00:00+08:00']
+    assert all(b.is_semester for b in db.scalars(select(models.Booking).where(models.Booking.id.in_(bulk_ids))))
+
+
+def test_semester_bulk_invalid_window_skips_all(db):
+    r = create_room(db)
+    ids, skipped = crud.create_semester_bookings(db, _semester_payload(r.id, date(2025, 9, 15), date(2025, 9, 29), hm=('04:00', '05:00')))
+    assert ids == []
+    assert len(skipped) == 3
+
+
+def test_semester_bulk_uses_one_conflict_query_and_one_commit(db):
+    r = create_room(db)
+    statements = []
+    commits = []
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement.split()[0].upper())
+    def _commit(conn):
+        commits.append(conn)
+    event.listen(engine, "before_cursor_execute", _before)
+    event.listen(engine, "commit", _commit)
+    try:
+        ids, skipped = crud.create_semester_bookings(db, _semester_payload(r.id, date(2025, 9, 1), date(2026, 6, 1)))
+    finally:
+        event.remove(engine, "before_cursor_execute", _before)
+        event.remove(engine, "commit", _commit)
+    assert len(ids) == crud.MAX_SEMESTER_WEEKS
+    assert statements.count('SELECT') == 1
+    assert len(commits) == 1
@@ -0,0 +1,103 @@
+import logging
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from datetime import datetime, timedelta
+
+from app.main import app
+from app.database import Base, engine, SessionLocal, all_engines
+from app import models, sqlprofile
+
+@pytest.fixture(autouse=True)
+def setup_db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture()
+def client():
+    return TestClient(app)
+
+@pytest.fixture()
+def db():
+    s = SessionLocal()
+    try:
+        yield s
+    finally:
+        s.close()
+
+
+def seed(db, rooms=6, per_room=3):
+    """Enough rooms and bookings that a per-row lazy load would blow any budget."""
+    created = [models.Room(name=f"R{i}") for i in range(rooms)]
+    db.add_all(created); db.commit()
+    start = datetime.now().replace(minute=0, second=0, microsecond=0) + timedelta(days=1)
+    for room in created:
+        for d in range(per_room):
+            db.add(models.Booking(
+                room_id=room.id, user_name="u", user_identity="i", purpose="p",
+                category=models.BookingCategory.activity,
+                start_time=start + timedelta(days=d), end_time=start + timedelta(days=d, hours=1),
+                status=models.BookingStatus.approved,
+            ))
+    db.commit()
+    return [r.id for r in created]
+
+
+def test_shape_collapses_literals_and_in_lists():
+    a = sqlprofile.shape("SELECT * FROM bookings WHERE id IN (?, ?, ?) LIMIT 50")
+    b = sqlprofile.shape("SELECT *\n  FROM bookings WHERE id IN (?, ?) LIMIT 10")
+    assert a == b == "SELECT * FROM bookings WHERE id IN (?...) LIMIT N"
+
+
+@pytest.mark.parametrize("url,limit", [
+    ("/rooms", 1),
+    ("/rooms/weekly", 2),
+    ("/rooms/{room_id}", 2),
+    ("/bookings", 1),
+    ("/bookings?limit=5", 1),
+    ("/rooms/availability?from=2031-01-06&to=2031-01-10&category=activity&duration=60", 2),
+    ("/rooms.ics", 2),
+    ("/admin/analytics/occupancy?from=2031-01-01&to=2031-01-31", 2),
+])
+def test_read_endpoint_query_budgets(client, db, assert_max_queries, url, limit):
+    room_ids = seed(db)
+    with assert_max_queries(limit):
+        r = client.get(url.format(room_id=room_ids[0]))
+    assert r.status_code == 200, r.text
+
+
+def _lazy_room_names(db):
+    # classic N+1: one SELECT rooms per booking through the lazy relationship
+    return [b.room.name for b in db.query(models.Booking).all()]
+
+
+def test_capture_flags_repeated_lazy_loads(db):
+    seed(db, rooms=6, per_room=1)
+    db.expunge_all()
+    with sqlprofile.capture() as profile:
+        _lazy_room_names(db)
+    assert profile.count == 7
+    [(shape, n)] = profile.repeated()
+    assert n == 6 and "FROM rooms" in shape
+    assert "probable N+1 (6x)" in profile.report()
+
+
+def test_middleware_adds_header_and_logs_n_plus_one(db, caplog):
+    seed(db, rooms=6, per_room=1)
+    demo = FastAPI()
+
+    @demo.get("/names")
+    def names():
+        with SessionLocal() as s:
+            return _lazy_room_names(s)
+
+    sqlprofile.install(all_engines())
+    client = TestClient(sqlprofile.SQLProfileMiddleware(demo))
+    with caplog.at_level(logging.WARNING, logger="math_office.sql"):
+        r = client.get("/names")
+    assert r.status_code == 200
+    assert r.headers["x-sql-profile"].startswith("count=7 ") and r.headers["x-sql-profile"].endswith("repeated=1")
+    [record] = [rec for rec in caplog.records if rec.getMessage().startswith("sql_n_plus_one")]
+    assert "route=/names" in record.getMessage() and "top_count=6" in record.getMessage()
@@ -0,0 +1,118 @@
+import json
+import pytest
+from fastapi.testclient import TestClient
+from datetime import datetime
+from sqlalchemy import event
+
+from app.main import app
+from app.database import Base, engine, SessionLocal, all_engines
+from app import models
+
+@pytest.fixture(autouse=True)
+def setup_db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture()
+def client():
+    return TestClient(app)
+
+@pytest.fixture()
+def db():
+    s = SessionLocal()
+    try:
+        yield s
+    finally:
+        s.close()
+
+
+def seed_rooms(db, *names):
+    rooms = [models.Room(name=n) for n in names]
+    db.add_all(rooms); db.commit()
+    for r in rooms:
+        db.refresh(r)
+    return rooms
+
+
+CSV = """\ufeffroom,category,user_name,user_identity,purpose,start_date,end_date,start_time_hm,end_time_hm
+志希 116,course,王老師,教師,微積分,2031-03-03,2031-03-24,09:00,11:00
+志希 116,course,李老師,教師,線性代數,2031-03-10,2031-03-17,10:00,12:00
+大智 204,meeting,系辦,職員,系務會議,2031-03-05,,14:00,15:00
+不存在,course,x,y,z,2031-03-03,,09:00,10:00
+志希 116,meeting,系辦,職員,太晚,2031-03-06,,17:00,18:00
+""".encode("utf-8")
+
+
+def _post(client, data, filename="timetable.csv", **params):
+    return client.post("/admin/timetable_import", params=params, files={"file": (filename, data)})
+
+
+def test_dry_run_reports_rows_without_writing(client, db):
+    seed_rooms(db, "志希 116", "大智 204")
+    r = _post(client, CSV, dry_run="true")
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert body["dry_run"] is True
+    statuses = [row["status"] for row in body["rows"]]
+    assert statuses == ["accepted", "conflict", "accepted", "invalid", "invalid"]
+    first, second = body["rows"][0], body["rows"][1]
+    assert first["occurrences"] == 4 and len(first["accepted"]) == 4
+    # both weeks overlap row 1's 09:00-11:00 in the same room
+    assert [c["row"] for c in second["conflicts"]] == [1, 1]
+    assert second["accepted"] == []
+    assert "找不到教室" in body["rows"][3]["errors"][0]
+    assert body["rows"][4]["errors"] == ["不在允許的時間範圍"]
+    assert body["accepted"] == 5 and body["invalid_rows"] == 2
+    assert db.query(models.Booking).count() == 0
+
+
+def test_import_inserts_in_one_transaction_and_checks_existing(client, db):
+    room, other = seed_rooms(db, "志希 116", "大智 204")
+    existing = models.Booking(
+        room_id=room.id, user_name="u", user_identity="i", purpose="p",
+        category=models.BookingCategory.activity,
+        start_time=datetime(2031, 3, 17, 10), end_time=datetime(2031, 3, 17, 11),
+        status=models.BookingStatus.approved,
+    )
+    db.add(existing); db.commit(); db.refresh(existing)
+
+    entries = [
+        {"room_id": room.id, "user_name": "王", "user_identity": "教師", "start_date": "2031-03-03",
+         "end_date": "2031-03-24", "start_time_hm": "09:00", "end_time_hm": "10:30"},
+        {"room": "大智 204", "category": "activity", "user_name": "社團", "user_identity": "學生",
+         "start_date": "2031-03-04", "start_time_hm": "18:00", "end_time_hm": "20:00"},
+    ]
+    statements = []
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    for e in all_engines():
+        event.listen(e, "before_cursor_execute", _before)
+    try:
+        r = _post(client, json.dumps({"entries": entries}).encode(), filename="timetable.json")
+    finally:
+        for e in all_engines():
+            event.remove(e, "before_cursor_execute", _before)
+    assert r.status_code == 200, r.text
+    row1, row2 = r.json()["rows"]
+    assert row1["status"] == "partial"
+    assert row1["conflicts"] == [{"start_time": "2031-03-17T09:00:00+08:00", "booking_id": existing.id, "row": None}]
+    assert len(row1["created_ids"]) == 3
+    assert row2["status"] == "accepted" and len(row2["created_ids"]) == 1
+    assert sum(1 for s in statements if s.lstrip().upper().startswith("SELECT") and "FROM bookings" in s) == 1
+
+    db.expire_all()
+    created = db.query(models.Booking).filter(models.Booking.id.in_(row1["created_ids"] + row2["created_ids"])).all()
+    assert {b.is_semester for b in created if b.room_id == room.id} == {True}
+    assert [b.is_semester for b in created if b.room_id == other.id] == [False]
+
+
+@pytest.mark.parametrize("data,filename", [
+    (b"", "t.csv"),
+    (b"[1, 2]", "t.json"),
+    (b"{not json", "t.json"),
+    ("\xff".encode("latin-1"), "t.csv"),
+])
+def test_unreadable_uploads_return_400(client, data, filename):
+    assert _post(client, data, filename=filename).status_code == 400
@@ -1,11 +1,13 @@
 import pytest
 from fastapi.testclient import TestClient
 from datetime import datetime, timedelta
+from pydantic import TypeAdapter
+from sqlalchemy import event
 from zoneinfo import ZoneInfo
 
 from app.main import app
-from app.database import Base, engine, SessionLocal
-from app import models
+from app.database import Base, engine, SessionLocal, all_engines
+from app import models, cache, crud, schemas
 
 TZ = ZoneInfo("Asia/Taipei")
 
@@ -81,6 +83,18 @@ def test_weekly_rooms_filters_to_next_7_days(client, db):
     assert "T" in st_iso
 
 
+def test_weekly_rooms_sends_local_offset_without_touching_rows(db):
+    room = create_room(db, "時區室")
+    start = (datetime.now(TZ) + timedelta(days=1)).replace(hour=9, minute=0, second=0, microsecond=0, tzinfo=None)
+    create_booking(db, room.id, start, start + timedelta(hours=1))
+    rooms = crud.get_rooms_weekly(db)
+    booking = next(r for r in rooms if r.id == room.id).bookings[0]
+    assert booking.start_time.tzinfo is None  # stored value, not rewritten per row
+    body = TypeAdapter(list[schemas.WeeklyRoom]).validate_python(rooms, from_attributes=True)
+    out = next(r for r in body if r.id == room.id).model_dump(mode="json")["bookings"][0]
+    assert out["start_time"] == start.isoformat() + "+08:00"
+
+
 def test_weekly_rooms_excludes_past_only(client, db):
     room = create_room(db, "過去室")
     now = datetime.now(TZ)
@@ -103,3 +117,72 @@ def test_weekly_rooms_includes_crossing_now(client, db):
     data = resp.json()
     target = next(r for r in data if r["name"] == "跨越室")
     assert len(target["bookings"]) == 1
+
+
+def _count_queries(fn):
+    statements = []
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    for e in all_engines():
+        event.listen(e, "before_cursor_execute", _before)
+    try:
+        result = fn()
+    finally:
+        for e in all_engines():
+            event.remove(e, "before_cursor_execute", _before)
+    return result, statements
+
+
+def test_weekly_rooms_query_count_is_constant(client, db):
+    now = datetime.now(TZ)
+    counts = []
+    for n_rooms, n_past in ((1, 0), (5, 20), (12, 60)):
+        Base.metadata.drop_all(bind=engine)
+        Base.metadata.create_all(bind=engine)
+        for i in range(n_rooms):
+            room = create_room(db, f"R{n_rooms}-{i}")
+            create_booking(db, room.id, now + timedelta(hours=1), now + timedelta(hours=2))
+            for k in range(n_past // n_rooms):
+                st = now - timedelta(days=10 + k)
+                create_booking(db, room.id, st, st + timedelta(hours=1))
+        db.expunge_all()
+        cache.weekly.invalidate()
+        resp, statements = _count_queries(lambda: client.get("/rooms/weekly"))
+        assert resp.status_code == 200
+        data = resp.json()
+        assert len(data) == n_rooms
+        assert all(len(r["bookings"]) == 1 for r in data)
+        counts.append(len(statements))
+    assert len(set(counts)) == 1, counts
+    assert counts[0] <= 2
+
+
+def test_weekly_rooms_served_from_cache_until_a_write(client, db):
+    room = create_room(db, "快取週")
+    first = client.get("/rooms/weekly")
+    stats = cache.weekly.stats()
+    resp, statements = _count_queries(lambda: client.get("/rooms/weekly"))
+    assert resp.status_code == 200
+    assert resp.json() == first.json()
+    assert statements == []
+    assert cache.weekly.stats()["hits"] == stats["hits"] + 1
+
+    start = (datetime.now(TZ) + timedelta(days=1)).replace(hour=9, minute=0, second=0, microsecond=0)
+    r = client.post("/bookings", json={
+        "room_id": room.id, "user_name": "u", "user_identity": "i", "category": "activity",
+        "start_time": start.isoformat(), "end_time": (start + timedelta(hours=1)).isoformat(),
+    })
+    assert r.status_code == 200
+    after = client.get("/rooms/weekly").json()
+    assert len(next(x for x in after if x["name"] == "快取週")["bookings"]) == 1
+    assert cache.weekly.stats()["misses"] == stats["misses"] + 1
+
+
+def test_weekly_cache_rolls_with_local_day(client, db, monkeypatch):
+    from app import main
+    create_room(db, "跨日室")
+    client.get("/rooms/weekly")
+    misses = cache.weekly.stats()["misses"]
+    monkeypatch.setattr(main, "_today_tag", lambda: "29991231")
+    client.get("/rooms/weekly")
+    assert cache.weekly.stats()["misses"] == misses + 1
@@ -31,6 +31,13 @@ export async function fetchRooms() {
   return r.json();
 }
 
+export async function fetchAvailability(params = {}) {
+  const query = new URLSearchParams(params).toString();
+  const r = await fetch(`${API_BASE}/rooms/availability?${query}`, { cache: 'no-cache' });
+  if(!r.ok) throw new Error((await r.json()).detail || 'Error');
+  return r.json();
+}
+
 export async function fetchRoom(id) {
   const r = await fetch(`${API_BASE}/rooms/${id}`);
   if(!r.ok) throw new Error('Room not found');
@@ -43,6 +50,14 @@ export async function fetchBookings(params = {}) {
   return r.json();
 }
 
+// Keyset-paged listing: returns { items, nextCursor } (nextCursor null on the last page)
+export async function fetchBookingsPage(params = {}) {
+  const query = new URLSearchParams(params).toString();
+  const r = await fetch(`${API_BASE}/bookings${query?`?${query}`:''}`);
+  if(!r.ok) throw new Error((await r.json()).detail || 'Error');
+  return { items: await r.json(), nextCursor: r.headers.get('X-Next-Cursor') };
+}
+
 export async function createBooking(data) {
   const r = await fetch(`${API_BASE}/bookings`, {
     method: 'POST',
@@ -63,6 +78,16 @@ export async function adminUpdateBooking(id, status) {
   return r.json();
 }
 
+export async function adminBulkUpdateBookings(ids, status, rejectOverlapping = false) {
+  const r = await fetch(`${API_BASE}/admin/bookings`, {
+    method: 'PATCH',
+    headers: authHeaders({ 'Content-Type': 'application/json' }),
+    body: JSON.stringify({ ids, status, reject_overlapping: rejectOverlapping })
+  });
+  if(!r.ok) throw new Error((await r.json()).detail || 'Error');
+  return r.json();
+}
+
 export async function adminDeleteBooking(id) {
   const r = await fetch(`${API_BASE}/admin/bookings/${id}`, { method: 'DELETE', headers: authHeaders() });
   if(!r.ok) throw new Error((await r.json()).detail || 'Error');
@@ -74,7 +99,8 @@ export async function fetchWeeklyRooms() {
   console.log('[weekly] fetch start', { url });
   let r;
   try {
-    r = await fetch(url, { headers: { 'Cache-Control': 'no-cache' } });
+    // revalidate with the stored ETag instead of bypassing the cache; unchanged data comes back as 304
+    r = await fetch(url, { cache: 'no-cache' });
   } catch (e) {
     console.error('[weekly] network error', e);
     throw e;
@@ -104,3 +130,14 @@ export async function createSemesterBookings(data) {
   if(!r.ok) throw new Error((await r.json()).detail || 'Error');
   return r.json();
 }
+
+// Live booking changes (Server-Sent Events). onEvent(type, booking) with type
+// created | status_changed | deleted. Returns a function that closes the stream.
+export function subscribeBookingEvents(onEvent, roomId = null) {
+  const url = `${API_BASE}/bookings/stream${roomId != null ? `?room_id=${roomId}` : ''}`;
+  const es = new EventSource(url);
+  for (const type of ['created', 'status_changed', 'deleted']) {
+    es.addEventListener(type, ev => onEvent(type, JSON.parse(ev.data)));
+  }
+  return () => es.close();
+}